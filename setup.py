@@ -33,6 +33,7 @@ setuptools.setup(
     package_data={'':['*.txt']},
     packages=setuptools.find_packages(where='src'),
     install_requires=requirements,
+    entry_points={'console_scripts': ['bmiptools-run=bmiptools.run_pipeline:main']},
     include_package_data=True,
     python_requires='>=3.8',
 )
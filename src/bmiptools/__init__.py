@@ -58,6 +58,9 @@ __global_setting_path__ = __bmiptools_files_folder_path__+os.sep+r'global_settin
 # __temporary_files_folder_path__ = ut.manage_path(r'setting/temporary_files')
 __temporary_files_folder_path__ = ut.manage_path( __lib_path__+os.sep+os.path.normpath(r'setting/temporary_files'))
 
+# Path to the folder where the indices of the folders containing the stacks are cached
+__folder_index_cache_path__ = ut.manage_path(__temporary_files_folder_path__+os.sep+r'folder_indices')
+
 
 #################
 #####   CONFIGURE
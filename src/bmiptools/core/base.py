@@ -17,6 +17,7 @@ the global setting of the library..
 
 import os
 import joblib
+import numpy as np
 import warnings
 from tqdm import tqdm
 
@@ -39,6 +40,10 @@ class CoreBasic:
     """
     Basic class inherited by all the classes of bmiptools.
     """
+    _precision = np.dtype(np.float64)                  # used by the objects created without global setting
+    _force_serial = False                              # set in the workers of the 'parallelize_pipeline' mode
+    _force_precision = None                            # set by the command-line runner to override the setting
+    _task_recorder = None                              # set by the pipeline while its performances are recorded
 
     def __init__(self):
 
@@ -60,10 +65,21 @@ class CoreBasic:
         self._use_multiprocessing_type = multiprocessing_type[self._global_setting_dict['multiprocessing_type']]
         self._cpu_buffer = self._global_setting_dict['cpu_buffer']
         self.configure_multiprocessing()
+        if CoreBasic._force_serial:
+
+            self._use_multiprocessing = False
 
         # gpu optimization
         self._use_gpu = self._global_setting_dict['use_gpu']
 
+        # floating point precision
+        self._precision = np.dtype(self._global_setting_dict.get('precision','float64'))
+        if CoreBasic._force_precision is not None:
+
+            self._precision = np.dtype(CoreBasic._force_precision)
+
+        assert self._precision in [np.float32,np.float64], 'Precision can be only \'float32\' or \'float64\'.'
+
     # verbosity controlled i/o methods
     def write(self,x,**kwargs):
         """
@@ -122,4 +138,37 @@ class CoreBasic:
 
             self._use_multiprocessing = False
             warnings.warn('No multiprocessing possible due to an insufficient number of CPUs. Consider to change the'
-                          '\'cpu_buffer\' global variable of the library. Execution continues in normal mode.')
\ No newline at end of file
+                          '\'cpu_buffer\' global variable of the library. Execution continues in normal mode.')
+
+    def parallel(self,tasks,**kwargs):
+        """
+        Execute some tasks with joblib on the available CPUs. When the performances of a pipeline are recorded (see the
+        'setup_performance_report' method of the Pipeline class), the execution of the tasks is recorded too.
+
+        :param tasks: (iterable) tasks, created with joblib 'delayed' (i.e. delayed(function)(*args,**kwargs)).
+        :param kwargs: additional keyword arguments of joblib.Parallel (e.g. 'prefer' or 'require').
+        :return: (list) outputs of the tasks.
+        """
+        parallel = joblib.Parallel(n_jobs=self._n_available_cpu,**kwargs)
+        if CoreBasic._task_recorder is None:
+
+            return parallel(tasks)
+
+        return CoreBasic._task_recorder.record_tasks(parallel,tasks)
+
+    # precision methods
+    def _to_precision(self,x):
+        """
+        Convert an array to the floating point precision of the library (see the 'precision' global setting). When the
+        precision is 'float32' the array is converted to single precision (without copy if it is already a float32
+        array), so that the computations involving it do not promote the data to double precision. When the precision
+        is 'float64' the array is returned unchanged, and the usual numpy type promotion takes place.
+
+        :param x: (ndarray) array to convert.
+        :return: (ndarray) the converted array.
+        """
+        if self._precision == np.float32:
+
+            return np.asarray(x).astype(np.float32,copy=False)
+
+        return x
@@ -0,0 +1,789 @@
+# Title: 'io_utils.py'
+# Date: 18/10/26
+#
+# Scope: This file contain various I/O core functions.
+
+"""
+Utility functions related to the storage of stacks on disk.
+"""
+
+
+#################
+#####   LIBRARIES
+#################
+
+
+import numpy as np
+import os
+import re
+import json
+import hashlib
+import zlib
+import bz2
+import lzma
+import itertools
+import h5py
+import tifffile
+from joblib import Parallel,delayed
+
+import bmiptools.core.utils as ut
+
+
+##############
+#####   GLOBAL
+##############
+
+
+CHUNKED_STORE_HEADER = 'stack_header.json'
+CHUNKED_STORE_COMPRESSORS = {None: (lambda b,level: b, lambda b: b),
+                             'zlib': (lambda b,level: zlib.compress(b,level), zlib.decompress),
+                             'bz2': (lambda b,level: bz2.compress(b,level), bz2.decompress),
+                             'lzma': (lambda b,level: lzma.compress(b,preset=level), lzma.decompress)}
+TIFF_COMPRESSIONS = {None: None,
+                     'zlib': 'zlib',
+                     'deflate': 'zlib',
+                     'zstd': 'zstd',
+                     'lzw': 'lzw'}
+HDF5_EXTENSIONS = ('.h5','.hdf5')
+HDF5_DATASET_NAME = 'data'
+FOLDER_INDEX_VERSION = 1
+FINGERPRINT_DIGEST_SIZE = 16
+
+
+#################
+#####   FUNCTIONS
+#################
+
+
+### Ranges
+
+
+def range_to_slice(axis_range,axis_length):
+    """
+    Convert a range written with the numpy-like convention used in bmiptools (e.g. [20,None] to indicate x[20:]) into
+    the start and stop indices of the range along an axis of given length.
+
+    :param axis_range: (list of two int or None) range to convert. If None, the whole axis is considered.
+    :param axis_length: (int) length of the axis.
+    :return: (int, int) the start and stop indices of the range.
+    """
+    if axis_range is None:
+
+        return 0,axis_length
+
+    start,stop,_ = slice(axis_range[0],axis_range[1]).indices(axis_length)
+    return start,max(start,stop)
+
+def region_slices(shape,z_range=None,y_range=None,x_range=None):
+    """
+    Convert the ranges (numpy-like convention) along the z, y and x axis of a region of a stack in the tuple of slices
+    which can be used to index the region in the numpy array containing the stack.
+
+    :param shape: (tuple) shape of the stack (ZYX(C) convention).
+    :param z_range: (list of two int or None) range along the z axis. If None, the whole axis is considered.
+    :param y_range: (list of two int or None) range along the y axis. If None, the whole axis is considered.
+    :param x_range: (list of two int or None) range along the x axis. If None, the whole axis is considered.
+    :return: (tuple of slice) the slices indexing the region.
+    """
+    return tuple(slice(*range_to_slice(axis_range,shape[ax])) for ax,axis_range in enumerate([z_range,y_range,x_range]))
+
+def region_shape(shape,z_range=None,y_range=None,x_range=None,z_step=1):
+    """
+    Compute the shape of a region of a stack, given the ranges (numpy-like convention) along the z, y and x axis.
+
+    :param shape: (tuple) shape of the stack (ZYX(C) convention).
+    :param z_range: (list of two int or None) range along the z axis. If None, the whole axis is considered.
+    :param y_range: (list of two int or None) range along the y axis. If None, the whole axis is considered.
+    :param x_range: (list of two int or None) range along the x axis. If None, the whole axis is considered.
+    :param z_step: (int) only one slice every 'z_step' slices of the region is considered.
+    :return: (tuple) shape of the region.
+    """
+    roi = [range_to_slice(axis_range,shape[ax]) for ax,axis_range in enumerate([z_range,y_range,x_range])]
+    return (len(range(roi[0][0],roi[0][1],z_step)),)+tuple(stop-start for start,stop in roi[1:])+tuple(shape[3:])
+
+
+### Pyramids
+
+
+def bin_array(arr,factors):
+    """
+    Downsample an array by averaging non-overlapping blocks of pixels (binning). The trailing pixels along an axis not
+    filling a whole block are discarded. Integer arrays are rounded, so that the binned array has the same data type of
+    the input array.
+
+    :param arr: (ndarray) array to bin.
+    :param factors: (tuple of int) binning factor along each of the first axes of the array (the remaining axes, e.g.
+                    the channels, are not binned).
+    :return: (ndarray) the binned array.
+    """
+    factors = tuple(factors)+(1,)*(arr.ndim-len(factors))
+    binned_shape = [max(1,arr.shape[ax]//factors[ax]) for ax in range(arr.ndim)]
+    factors = [min(factors[ax],arr.shape[ax]) for ax in range(arr.ndim)]
+    cropped = arr[tuple(slice(0,binned_shape[ax]*factors[ax]) for ax in range(arr.ndim))]
+    blocks_shape = [n for ax in range(arr.ndim) for n in (binned_shape[ax],factors[ax])]
+    binned = cropped.reshape(blocks_shape).mean(axis=tuple(range(1,2*arr.ndim,2)))
+    if np.issubdtype(arr.dtype,np.integer):
+
+        binned = np.rint(binned)
+
+    return binned.astype(arr.dtype)
+
+def pyramid_level_shape(shape,level,z_binning=False):
+    """
+    Compute the shape of a level of a multi-resolution pyramid (see 'bin_array').
+
+    :param shape: (tuple) shape of the full resolution stack, organized according to the ZYX(C) convention.
+    :param level: (int) level of the pyramid (0 is the full resolution stack).
+    :param z_binning: (boolean) if True the stack is binned also along the z axis.
+    :return: (tuple) the shape of the level.
+    """
+    shape = list(shape)
+    for _ in range(level):
+
+        shape[1:3] = [max(1,n//2) for n in shape[1:3]]
+        if z_binning:
+
+            shape[0] = max(1,shape[0]//2)
+
+    return tuple(shape)
+
+
+### Chunked store
+
+
+def is_chunked_store(path):
+    """
+    Check if a path points to a chunked store.
+
+    :param path: (str) path to check.
+    :return: (bool) True if the path is the folder of a chunked store.
+    """
+    return os.path.isfile(path+os.sep+CHUNKED_STORE_HEADER)
+
+def _chunk_file_name(chunk_index):
+
+    return 'chunk__{}.{}.{}'.format(*chunk_index)
+
+def _chunk_grid(shape,chunk_shape,z_range=(0,None),y_range=(0,None),x_range=(0,None)):
+    """
+    Return the indices of the chunks intersecting a given region of the stack.
+    """
+    ranges = [z_range,y_range,x_range]
+    grid = []
+    for ax in range(3):
+
+        start,stop = ranges[ax][0],ranges[ax][1]
+        if stop is None:
+
+            stop = shape[ax]
+
+        grid.append(range(start//chunk_shape[ax],int(np.ceil(stop/chunk_shape[ax]))))
+
+    return list(itertools.product(*grid))
+
+class ChunkedStoreWriter:
+    """
+    Write a chunked store (see 'write_chunked_store') incrementally, slab by slab along the z axis. Only the slices not
+    yet filling a whole row of chunks along z are kept in memory, so that stacks (or pyramid levels) larger than the
+    RAM can be written while they are produced. The header file is written by 'close', after the last slab.
+    """
+
+    def __init__(self,path,shape,dtype,chunk_shape=(16,256,256),compression='zlib',compression_level=1,
+                 metadata=None,n_jobs=1):
+        """
+        :param path: (str) path of the folder of the chunked store (eventually created).
+        :param shape: (tuple) shape of the stack to write, organized according to the ZYX(C) convention.
+        :param dtype: data type of the stack.
+        :param chunk_shape: (tuple of 3 int) shape of the chunks along the z, y and x axis.
+        :param compression: (str or None) compression used for the chunks. It can be 'zlib', 'bz2', 'lzma' or None.
+        :param compression_level: (int) compression level used.
+        :param metadata: (dict or None) stack metadata to save in the header file.
+        :param n_jobs: (int) number of chunks compressed and written in parallel (by threads).
+        """
+        assert compression in CHUNKED_STORE_COMPRESSORS, '{} is not a supported compression. Supported ' \
+               'compressions are {}'.format(compression,ut.list_to_string(list(CHUNKED_STORE_COMPRESSORS.keys())))
+
+        self.path = ut.manage_path(path)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_shape = [int(c) for c in chunk_shape]
+        self.compression = compression
+        self.compression_level = compression_level
+        self.metadata = metadata
+        self.n_jobs = n_jobs
+        self._compress = CHUNKED_STORE_COMPRESSORS[compression][0]
+        self._buffer = []                               # slices waiting for a whole row of chunks along z
+        self._n_buffered = 0
+        self._n_written = 0                             # slices already written in the chunks
+
+    def write(self,slab):
+        """
+        Append a slab of consecutive slices to the stack.
+
+        :param slab: (ndarray) slices to append, organized according to the ZYX(C) convention.
+        """
+        assert self._n_written+self._n_buffered+slab.shape[0] <= self.shape[0], 'Too many slices written in the ' \
+                                                                               'chunked store.'
+
+        self._buffer.append(np.asarray(slab,dtype=self.dtype))
+        self._n_buffered = self._n_buffered+slab.shape[0]
+        if self._n_buffered >= self.chunk_shape[0]:
+
+            buffered = np.concatenate(self._buffer,axis=0)
+            n_to_write = buffered.shape[0]//self.chunk_shape[0]*self.chunk_shape[0]
+            self._write_chunk_rows(buffered[:n_to_write])
+            self._buffer = [buffered[n_to_write:]]
+            self._n_buffered = buffered.shape[0]-n_to_write
+
+    def close(self):
+        """
+        Write the remaining slices and the header file of the chunked store.
+        """
+        if self._n_buffered > 0:
+
+            self._write_chunk_rows(np.concatenate(self._buffer,axis=0))
+            self._buffer = []
+            self._n_buffered = 0
+
+        assert self._n_written == self.shape[0], 'Only {} of {} slices written in the chunked store ' \
+                                                 '{}.'.format(self._n_written,self.shape[0],self.path)
+
+        header = {'shape': list(self.shape),
+                  'dtype': self.dtype.str,
+                  'chunk_shape': self.chunk_shape,
+                  'compression': self.compression,
+                  'compression_level': self.compression_level,
+                  'metadata': self.metadata}
+        with open(self.path+os.sep+CHUNKED_STORE_HEADER,'w') as jsonfile:
+
+            dumped = json.dumps(header,cls=ut.ExifreadEncoder)
+            dumped = json.loads(dumped)
+            json.dump(dumped,jsonfile,indent=4)
+
+    def _write_chunk_rows(self,slab):
+        """
+        Core method. Write the chunks of a slab starting at the beginning of a row of chunks along z.
+        """
+        z_offset = self._n_written//self.chunk_shape[0]
+        def write_chunk(chunk_index):
+
+            chunk = slab[tuple(slice(chunk_index[ax]*self.chunk_shape[ax],(chunk_index[ax]+1)*self.chunk_shape[ax])
+                               for ax in range(3))]
+            chunk_index = (chunk_index[0]+z_offset,)+tuple(chunk_index[1:])
+            with open(self.path+os.sep+_chunk_file_name(chunk_index),'wb') as chunk_file:
+
+                chunk_file.write(self._compress(np.ascontiguousarray(chunk).tobytes(),self.compression_level))
+
+        Parallel(n_jobs=self.n_jobs,prefer='threads')(delayed(write_chunk)(chunk_index)
+                                                      for chunk_index in _chunk_grid(slab.shape,self.chunk_shape))
+        self._n_written = self._n_written+slab.shape[0]
+
+def write_chunked_store(path,data,chunk_shape=(16,256,256),compression='zlib',compression_level=1,metadata=None,
+                        n_jobs=1,pyramid_levels=0,pyramid_z_binning=False):
+    """
+    Write a stack in a chunked store, i.e. a folder containing the stack divided in compressed ZYX chunks plus a json
+    header file (named as specified in 'CHUNKED_STORE_HEADER') where shape, data type, chunking, compression and
+    metadata of the stack are stored. The channels of the stack (if any) are never split among different chunks. The
+    stack is read slab by slab (one row of chunks along z at a time), so 'data' can be a memory-mapped array. When
+    pyramid levels are requested, each slab is binned (see 'bin_array') as soon as it is read, and the levels are
+    written in the folders 'level_<n>' of the chunked store in the same pass.
+
+    :param path: (str) path of the folder of the chunked store (eventually created).
+    :param data: (ndarray) the stack to save, organized according to the ZYX(C) convention.
+    :param chunk_shape: (tuple of 3 int) shape of the chunks along the z, y and x axis.
+    :param compression: (str or None) compression used for the chunks. It can be 'zlib', 'bz2', 'lzma' or None.
+    :param compression_level: (int) compression level used.
+    :param metadata: (dict or None) stack metadata to save in the header file.
+    :param n_jobs: (int) number of chunks compressed and written in parallel (by threads).
+    :param pyramid_levels: (int) number of levels (2x, 4x, 8x... binning in yx) of the multi-resolution pyramid.
+    :param pyramid_z_binning: (boolean) if True the pyramid levels are binned also along the z axis.
+    """
+    z_factor = 2 if pyramid_z_binning else 1
+    writers = [ChunkedStoreWriter(path,data.shape,data.dtype,chunk_shape,compression,compression_level,metadata,
+                                  n_jobs)]
+    for level in range(1,pyramid_levels+1):
+
+        writers.append(ChunkedStoreWriter(path+os.sep+'level_{}'.format(level),
+                                          pyramid_level_shape(data.shape,level,pyramid_z_binning),data.dtype,
+                                          chunk_shape,compression,compression_level,None,n_jobs))
+
+    carries = [None]*(pyramid_levels+1)                 # slice of each level waiting to be binned along z
+    n_binned = [0]*(pyramid_levels+1)                   # slices written in each level
+    slab_size = max(1,int(chunk_shape[0]))
+    for z in range(0,data.shape[0],slab_size):
+
+        slab = np.asarray(data[z:z+slab_size,...])
+        writers[0].write(slab)
+        for level in range(1,pyramid_levels+1):
+
+            if carries[level] is not None:
+
+                slab = np.concatenate([carries[level],slab],axis=0)
+                carries[level] = None
+
+            n_binnable = slab.shape[0]//z_factor*z_factor
+            if n_binnable < slab.shape[0]:
+
+                carries[level] = slab[n_binnable:]
+                slab = slab[:n_binnable]
+
+            if slab.shape[0] == 0:
+
+                break
+
+            slab = bin_array(slab,(z_factor,2,2))
+            writers[level].write(slab)
+            n_binned[level] = n_binned[level]+slab.shape[0]
+
+    # a level with a single slice is not binned along z (see 'pyramid_level_shape'), i.e. the carry is used
+    for level in range(1,pyramid_levels+1):
+
+        if n_binned[level] == 0:
+
+            slab = bin_array(carries[level],(1,2,2))
+            writers[level].write(slab)
+            if level < pyramid_levels:
+
+                carries[level+1] = slab
+
+    for writer in writers:
+
+        writer.close()
+
+def read_chunked_store_header(path):
+    """
+    Read the header of a chunked store.
+
+    :param path: (str) path of the folder of the chunked store.
+    :return: (dict) the header of the chunked store.
+    """
+    with open(path+os.sep+CHUNKED_STORE_HEADER,'r') as jsonfile:
+
+        return json.load(jsonfile)
+
+def read_chunked_store(path,z_range=None,y_range=None,x_range=None,out=None,n_jobs=1,z_step=1):
+    """
+    Read a stack (or a region of it) from a chunked store. Only the chunks intersecting the region (and containing at
+    least one of the slices read, when z_step > 1) are read.
+
+    :param path: (str) path of the folder of the chunked store.
+    :param z_range: (list of two int or None) range along the z axis of the region to read, using the numpy-like
+                    convention (e.g. [20,None] to indicate x[20:]). If None, the whole axis is read.
+    :param y_range: (list of two int or None) range along the y axis of the region to read.
+    :param x_range: (list of two int or None) range along the x axis of the region to read.
+    :param out: (ndarray or None) array (having the shape of the region) in which the region is read. If None a new
+                array is allocated.
+    :param n_jobs: (int) number of chunks read and decompressed in parallel (by threads).
+    :param z_step: (int) only one slice every 'z_step' slices of the region is read.
+    :return: (ndarray, dict) the region read and the header of the chunked store.
+    """
+    header = read_chunked_store_header(path)
+    shape = header['shape']
+    chunk_shape = header['chunk_shape']
+    dtype = np.dtype(header['dtype'])
+    decompress = CHUNKED_STORE_COMPRESSORS[header['compression']][1]
+    roi = [range_to_slice(axis_range,shape[ax]) for ax,axis_range in enumerate([z_range,y_range,x_range])]
+    roi_shape = region_shape(shape,z_range,y_range,x_range,z_step)
+    if out is None:
+
+        out = np.empty(roi_shape,dtype=dtype)
+
+    def first_slice_read(chunk_index):
+
+        # first slice read (i.e. in the region and on the z_step grid) at or after the beginning of the chunk
+        z_start = max(chunk_index[0]*chunk_shape[0],roi[0][0])
+        return roi[0][0]+int(np.ceil((z_start-roi[0][0])/z_step))*z_step
+
+    def read_chunk(chunk_index):
+
+        chunk_start = [chunk_index[ax]*chunk_shape[ax] for ax in range(3)]
+        chunk_stop = [min(chunk_start[ax]+chunk_shape[ax],shape[ax]) for ax in range(3)]
+        with open(path+os.sep+_chunk_file_name(chunk_index),'rb') as chunk_file:
+
+            chunk = np.frombuffer(decompress(chunk_file.read()),dtype=dtype)
+
+        chunk = chunk.reshape(tuple(chunk_stop[ax]-chunk_start[ax] for ax in range(3))+tuple(shape[3:]))
+        start = [first_slice_read(chunk_index)]+[max(chunk_start[ax],roi[ax][0]) for ax in range(1,3)]
+        stop = [min(chunk_stop[ax],roi[ax][1]) for ax in range(3)]
+        out_region = (slice((start[0]-roi[0][0])//z_step,(stop[0]-roi[0][0]+z_step-1)//z_step),)
+        chunk_region = (slice(start[0]-chunk_start[0],stop[0]-chunk_start[0],z_step),)
+        out[out_region+tuple(slice(start[ax]-roi[ax][0],stop[ax]-roi[ax][0]) for ax in range(1,3))] = \
+            chunk[chunk_region+tuple(slice(start[ax]-chunk_start[ax],stop[ax]-chunk_start[ax]) for ax in range(1,3))]
+
+    if min(roi_shape[:3]) > 0:
+
+        chunks_to_read = [chunk_index for chunk_index in _chunk_grid(shape,chunk_shape,*roi)
+                          if first_slice_read(chunk_index) < min((chunk_index[0]+1)*chunk_shape[0],roi[0][1])]
+        Parallel(n_jobs=n_jobs,prefer='threads')(delayed(read_chunk)(chunk_index) for chunk_index in chunks_to_read)
+
+    return out,header
+
+
+### TIFF
+
+
+def read_tiff_page_region(path,page,y_range=None,x_range=None):
+    """
+    Read a region of a page of a TIFF file. Uncompressed pages are memory-mapped, so that only the rows of the region
+    are actually read from the disk, while the other pages are decoded and immediately cropped.
+
+    :param path: (str) path of the TIFF file.
+    :param page: (tifffile.TiffPage) page of the opened TIFF file.
+    :param y_range: (list of two int or None) range along the y axis of the region to read, using the numpy-like
+                    convention (e.g. [20,None] to indicate x[20:]). If None, the whole axis is read.
+    :param x_range: (list of two int or None) range along the x axis of the region to read.
+    :return: (ndarray) the region read.
+    """
+    y_start,y_stop = range_to_slice(y_range,page.shape[0])
+    x_start,x_stop = range_to_slice(x_range,page.shape[1])
+    if page.is_memmappable and page.planarconfig == 1:
+
+        dtype = np.dtype(page.dtype)
+        mapped_page = np.memmap(path,dtype=dtype.newbyteorder(page.parent.byteorder),mode='r',
+                                offset=page.dataoffsets[0],shape=page.shape)
+        return mapped_page[y_start:y_stop,x_start:x_stop].astype(dtype.newbyteorder('='))
+
+    return page.asarray(maxworkers=1)[y_start:y_stop,x_start:x_stop]
+
+def write_tiff(path,data,compression='zlib',bigtiff=True,n_jobs=1,progress_callback=None,pyramid_levels=0):
+    """
+    Write a stack (or a single slice) in a multipage TIFF file, one page per slice, with lossless compression. The
+    pages are written in order, while the strips of each page are compressed in parallel by a pool of threads. The
+    pages are written as separate series, as done by imageio, so that the file can be read page by page with
+    any reader. When pyramid levels are requested, each page is followed by its yx-binned versions (2x, 4x, 8x...),
+    stored as reduced-resolution sub-pages (SubIFDs) of the page, each one computed from the previous level. The
+    sub-pages are ignored by the readers not supporting them.
+
+    :param path: (str) path of the TIFF file.
+    :param data: (ndarray) the stack to save, organized according to the ZYX(C) convention.
+    :param compression: (str or None) lossless compression used. It can be 'zlib' (or 'deflate'), 'zstd', 'lzw' or
+                        None. Compressions different from 'zlib' need the 'imagecodecs' package.
+    :param bigtiff: (boolean) if True the file is written in the BigTIFF format, which allows files larger than 4 GB.
+    :param n_jobs: (int) number of threads used to compress each page.
+    :param progress_callback: (callable or None) function called with the index of each page after it is written.
+    :param pyramid_levels: (int) number of reduced-resolution levels written for each page.
+    """
+    assert compression in TIFF_COMPRESSIONS, '{} is not a supported compression. Supported compressions are ' \
+           '{}'.format(compression,ut.list_to_string(list(TIFF_COMPRESSIONS.keys())))
+
+    photometric = 'minisblack'
+    if len(data.shape) == 4 and data.shape[-1] in [3,4]:
+
+        photometric = 'rgb'
+
+    planarconfig = None
+    if len(data.shape) == 4:
+
+        planarconfig = 'contig'
+
+    with tifffile.TiffWriter(path,bigtiff=bigtiff) as tif:
+
+        for n,page in enumerate(data):
+
+            page = np.ascontiguousarray(page)
+            tif.write(page,photometric=photometric,planarconfig=planarconfig,
+                      compression=TIFF_COMPRESSIONS[compression],maxworkers=n_jobs,subifds=pyramid_levels or None)
+            for _ in range(pyramid_levels):
+
+                page = bin_array(page,(2,2))
+                tif.write(page,photometric=photometric,planarconfig=planarconfig,subfiletype=1,
+                          compression=TIFF_COMPRESSIONS[compression],maxworkers=n_jobs)
+
+            if progress_callback is not None:
+
+                progress_callback(n)
+
+
+### HDF5
+
+
+def is_hdf5(path):
+    """
+    Check if a path points to a HDF5 file (according to its extension).
+
+    :param path: (str) path to check.
+    :return: (bool) True if the path has one of the extensions in 'HDF5_EXTENSIONS'.
+    """
+    return os.path.splitext(path)[1].lower() in HDF5_EXTENSIONS
+
+def write_hdf5(path,data,chunk_shape=None,compression='gzip',compression_level=None,metadata=None,
+               dataset_name=HDF5_DATASET_NAME):
+    """
+    Write a stack in a HDF5 file. The stack is saved in a chunked (and eventually compressed) dataset, while the
+    metadata are saved as attributes of the dataset (one attribute for each key of the metadata dictionary, containing
+    the json serialization of the corresponding value).
+
+    :param path: (str) path of the HDF5 file.
+    :param data: (ndarray) the stack to save, organized according to the ZYX(C) convention.
+    :param chunk_shape: (tuple of 3 int or None) shape of the chunks along the z, y and x axis. If None, each slice is a
+                        chunk.
+    :param compression: (str or None) compression used for the chunks. It can be 'gzip' (or 'zlib'), 'lzf' or None.
+    :param compression_level: (int or None) compression level used (only for 'gzip').
+    :param metadata: (dict or None) stack metadata to save as attributes of the dataset.
+    :param dataset_name: (str) name of the dataset containing the stack.
+    """
+    if compression == 'zlib':
+
+        compression = 'gzip'
+
+    if chunk_shape is None:
+
+        chunk_shape = (1,)+tuple(data.shape[1:3])
+
+    chunk_shape = tuple(min(int(c),s) for c,s in zip(chunk_shape,data.shape))+tuple(data.shape[3:])
+    with h5py.File(path,'w') as h5file:
+
+        dataset = h5file.create_dataset(dataset_name,shape=data.shape,dtype=data.dtype,chunks=chunk_shape,
+                                        compression=compression,compression_opts=compression_level)
+        for z in range(0,data.shape[0],chunk_shape[0]):
+
+            dataset[z:z+chunk_shape[0],...] = data[z:z+chunk_shape[0],...]
+
+        if metadata is not None:
+
+            for key,value in metadata.items():
+
+                dataset.attrs[key] = json.dumps(value,cls=ut.ExifreadEncoder)
+
+def read_hdf5_header(path,dataset_name=HDF5_DATASET_NAME):
+    """
+    Read shape, data type, chunking, compression and metadata of a stack saved in a HDF5 file (see 'write_hdf5').
+
+    :param path: (str) path of the HDF5 file.
+    :param dataset_name: (str) name of the dataset containing the stack.
+    :return: (dict) the header of the stack, organized as the header of a chunked store.
+    """
+    with h5py.File(path,'r') as h5file:
+
+        dataset = h5file[dataset_name]
+        metadata = None
+        if len(dataset.attrs) > 0:
+
+            metadata = {key: json.loads(value) for key,value in dataset.attrs.items()}
+
+        return {'shape': list(dataset.shape),
+                'dtype': dataset.dtype.str,
+                'chunk_shape': dataset.chunks,
+                'compression': dataset.compression,
+                'compression_level': dataset.compression_opts,
+                'metadata': metadata}
+
+def read_hdf5(path,slice_list=None,y_range=None,x_range=None,out=None,dataset_name=HDF5_DATASET_NAME):
+    """
+    Read a stack (or some slices of it, or a region of them) from a HDF5 file. Only the chunks intersecting the
+    slices and the region requested are read.
+
+    :param path: (str) path of the HDF5 file.
+    :param slice_list: (list of int or None) list of the slices to read. If None the whole stack is read.
+    :param y_range: (list of two int or None) range along the y axis of the region to read, using the numpy-like
+                    convention (e.g. [20,None] to indicate x[20:]). If None, the whole axis is read.
+    :param x_range: (list of two int or None) range along the x axis of the region to read.
+    :param out: (ndarray or None) array in which the slices are read. If None a new array is allocated.
+    :param dataset_name: (str) name of the dataset containing the stack.
+    :return: (ndarray, dict) the slices read and the header of the stack.
+    """
+    header = read_hdf5_header(path,dataset_name)
+    with h5py.File(path,'r') as h5file:
+
+        dataset = h5file[dataset_name]
+        if slice_list is None:
+
+            slice_list = range(dataset.shape[0])
+
+        yx_region = region_slices(dataset.shape,None,y_range,x_range)[1:]
+        if out is None:
+
+            out = np.empty((len(slice_list),)+region_shape(dataset.shape,None,y_range,x_range)[1:],
+                           dtype=dataset.dtype)
+
+        for n,z in enumerate(slice_list):
+
+            dataset.read_direct(out,source_sel=(z,)+yx_region,dest_sel=np.s_[n,...])
+
+    return out,header
+
+
+### Fingerprint
+
+
+def slice_digest(slice):
+    """
+    Compute the digest of the content of a slice (BLAKE2b hash of its bytes).
+
+    :param slice: (ndarray) the slice.
+    :return: (bytes) the digest of the slice.
+    """
+    return hashlib.blake2b(np.ascontiguousarray(slice),digest_size=FINGERPRINT_DIGEST_SIZE).digest()
+
+def combine_digests(shape,dtype,slice_digests):
+    """
+    Combine the digests of the slices of a stack in the fingerprint of the stack (root of a two level Merkle tree,
+    whose leaves are the slices). Since the fingerprint depends only on the digests of the slices, when some slices
+    change only their digests have to be recomputed.
+
+    :param shape: (tuple) shape of the stack.
+    :param dtype: data type of the stack.
+    :param slice_digests: (list of bytes) digests of the slices of the stack (see 'slice_digest').
+    :return: (str) the fingerprint of the stack, as hexadecimal string.
+    """
+    root = hashlib.blake2b(digest_size=FINGERPRINT_DIGEST_SIZE)
+    root.update(json.dumps({'shape': [int(n) for n in shape],'dtype': np.dtype(dtype).str}).encode())
+    for digest in slice_digests:
+
+        root.update(digest)
+
+    return root.hexdigest()
+
+
+### Folder index
+
+
+def natural_sort_key(name):
+    """
+    Key for the natural sorting of strings, where the numbers contained in a string are compared according to their
+    value (e.g. 'slice_2' comes before 'slice_10').
+
+    :param name: (str) string to sort.
+    :return: (tuple) the sorting key.
+    """
+    return tuple(int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)',name))
+
+def _slice_sort_key(name):
+    """
+    Key for the sorting of the slices saved according to the FIB-SEM name convention used at mpikg, where the slice
+    number follows the word 'slice' (e.g. 'name__slice_0012.tif'). Names without slice number are sorted naturally
+    after the other ones.
+    """
+    match = re.search(r'slice_?(\d+)',name)
+    if match is None:
+
+        return (1,natural_sort_key(name))
+
+    return (0,int(match.group(1)),natural_sort_key(name))
+
+def _first_slice_info(path):
+    """
+    Read shape and data type of the image in a file, without decoding it (only for TIFF files).
+    """
+    try:
+
+        with tifffile.TiffFile(path) as tif:
+
+            return {'shape': list(tif.pages[0].shape),'dtype': np.dtype(tif.pages[0].dtype).str}
+
+    except Exception:
+
+        return None
+
+def _scan_folder(path,extension,image_type,folder_mtime):
+    """
+    Index a folder with 'os.scandir' (see 'index_folder').
+    """
+    files = []
+    with os.scandir(path) as entries:
+
+        for entry in entries:
+
+            if entry.name.startswith('.') or not entry.name.endswith('.'+extension) or not entry.is_file():
+
+                continue
+
+            entry_stat = entry.stat()
+            files.append([entry.name,entry_stat.st_size,entry_stat.st_mtime_ns])
+
+    sort_key = _slice_sort_key if image_type == 'FIB-SEM' else natural_sort_key
+    files.sort(key=lambda file: sort_key(file[0]))
+    first_slice = None
+    if len(files) > 0:
+
+        first_slice = _first_slice_info(path+os.sep+files[0][0])
+
+    return {'version': FOLDER_INDEX_VERSION,
+            'folder': path,
+            'folder_mtime': folder_mtime,
+            'extension': extension,
+            'image_type': image_type,
+            'files': files,
+            'first_slice': first_slice}
+
+def _is_index_valid(index,path,extension,image_type,folder_mtime):
+    """
+    Check if a cached folder index still describes a folder: the folder content has not changed (its modification
+    time is the same) and the first slice has not been overwritten.
+    """
+    if index.get('version') != FOLDER_INDEX_VERSION or index.get('folder') != path or \
+            index.get('extension') != extension or index.get('image_type') != image_type or \
+            index.get('folder_mtime') != folder_mtime:
+
+        return False
+
+    if len(index['files']) > 0:
+
+        name,size,mtime = index['files'][0]
+        try:
+
+            first_stat = os.stat(path+os.sep+name)
+
+        except OSError:
+
+            return False
+
+        if first_stat.st_size != size or first_stat.st_mtime_ns != mtime:
+
+            return False
+
+    return True
+
+def index_folder(path,extension,image_type='FIB-SEM',cache_folder=None):
+    """
+    Index the images contained in a folder. The folder is listed with 'os.scandir', and the images (i.e. the files
+    with the given extension) are sorted by slice number for FIB-SEM images (see the name convention used in
+    'bmiptools.stack.Stack') and naturally otherwise (see 'natural_sort_key'). The index contains name, size and
+    modification time of the images, and shape and data type of the first image (None if they cannot be read without
+    decoding the image). When a cache folder is given, the index is saved in a small json file in the cache folder and
+    reused as long as the folder is unchanged, so that the folder is not listed again.
+
+    :param path: (str) path of the folder.
+    :param extension: (str) extension of the images.
+    :param image_type: (str) type of the images ('FIB-SEM' or any other string for natural sorting).
+    :param cache_folder: (str or None) folder where the index files are cached. If None, no cache is used.
+    :return: (dict) the folder index, with keys 'files' (list of [name,size,modification time in ns] of the images,
+             in slice order) and 'first_slice' (dictionary with 'shape' and 'dtype' of the first image, or None).
+    """
+    path = os.path.abspath(path)
+    folder_mtime = os.stat(path).st_mtime_ns
+    index_path = None
+    if cache_folder is not None:
+
+        index_hash = hashlib.sha1('{}|{}|{}'.format(path,extension,image_type).encode()).hexdigest()[:16]
+        index_path = cache_folder+os.sep+'folder_index__{}.json'.format(index_hash)
+        if os.path.isfile(index_path):
+
+            try:
+
+                with open(index_path,'r') as jsonfile:
+
+                    index = json.load(jsonfile)
+
+                if _is_index_valid(index,path,extension,image_type,folder_mtime):
+
+                    return index
+
+            except (OSError,ValueError,KeyError,TypeError):
+
+                pass
+
+    index = _scan_folder(path,extension,image_type,folder_mtime)
+    if index_path is not None:
+
+        try:
+
+            with open(index_path,'w') as jsonfile:
+
+                json.dump(index,jsonfile)
+
+        except OSError:
+
+            pass
+
+    return index
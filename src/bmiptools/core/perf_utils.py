@@ -0,0 +1,268 @@
+# Title: 'perf_utils.py'
+# Date: 18/10/26
+#
+# Scope: This file contain the core functions used to measure the performances of a pipeline.
+
+"""
+Utility functions and classes used to measure the time and the memory spent in each step of a pipeline, and to record a
+timeline of the steps (together with the activity of the workers executing the tasks of the plugins) in the Chrome trace
+format, which can be opened with chrome://tracing or https://ui.perfetto.dev.
+"""
+
+
+#################
+#####   LIBRARIES
+#################
+
+
+import os
+import json
+import time
+import threading
+
+
+#################
+#####   FUNCTIONS
+#################
+
+
+def current_rss():
+    """
+    Return the current resident set size (i.e. the amount of RAM used now) of the current process.
+
+    :return: (int or None) resident set size in bytes, None when it cannot be measured on the current platform (it is
+             read from /proc, hence it is available only on Linux).
+    """
+    try:
+
+        with open('/proc/self/statm','r') as file:
+
+            return int(file.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+
+    except (OSError,ValueError,AttributeError):
+
+        return None
+
+
+###############
+#####   CLASSES
+###############
+
+
+class _RSSSampler():
+    """
+    Thread sampling periodically the resident set size of the current process, in order to measure the largest amount
+    of RAM used during a time interval. Allocations lasting less than the sampling interval may be missed.
+    """
+    def __init__(self,interval=0.01):
+        """
+        :param interval: (float) time (in seconds) between two consecutive samples.
+        """
+        self.interval = interval
+        self.start_rss = current_rss()
+        self.max_rss = self.start_rss
+        self._stop_event = threading.Event()
+        self._thread = None
+        if self.start_rss is not None:
+
+            self._thread = threading.Thread(target=self._sample,daemon=True)
+            self._thread.start()
+
+    def _sample(self):
+
+        while not self._stop_event.wait(self.interval):
+
+            self.max_rss = max(self.max_rss,current_rss())
+
+    def stop(self):
+        """
+        Stop the sampling.
+
+        :return: (int or None) increase of the resident set size (in bytes) at its largest value during the sampling,
+                 with respect to its value when the sampling started. None when the resident set size cannot be
+                 measured on the current platform.
+        """
+        if self._thread is None:
+
+            return None
+
+        self._stop_event.set()
+        self._thread.join()
+        self.max_rss = max(self.max_rss,current_rss())
+        return self.max_rss-self.start_rss
+
+
+class _TimedCall():
+    """
+    Wrapper of a function executed by a joblib worker, which returns together with the function output the process,
+    the thread and the time interval of the execution.
+    """
+    def __init__(self,func):
+
+        self.func = func
+
+    def __call__(self,*args,**kwargs):
+
+        start = time.time()
+        output = self.func(*args,**kwargs)
+        return output,(getattr(self.func,'__name__','task'),os.getpid(),threading.get_ident(),start,time.time())
+
+
+class PerformanceRecorder():
+    """
+    Class recording wall time, CPU time, peak RAM usage and throughput of the steps of a pipeline. The peak RAM usage of
+    a step is the largest increase of the resident set size of the process during the step (sampled by a thread, see
+    '_RSSSampler'), and does not include the memory used by other worker processes. When the trace is enabled, the steps
+    and the tasks given to 'record_tasks' (see the 'parallel' method of the CoreBasic class) are recorded as events of a
+    timeline in the Chrome trace format.
+    """
+    __version__ = '0.1'
+
+    def __init__(self,trace=False):
+        """
+        :param trace: (bool) if True the timeline of the steps and of the tasks of the plugins is recorded.
+        """
+        self.trace = trace
+        self.steps = []
+        self.trace_events = []
+
+    def start(self):
+        """
+        Start the recording.
+        """
+        if self.trace:
+
+            self._add_process_name(os.getpid(),'pipeline')
+
+    def record_tasks(self,parallel,tasks):
+        """
+        Execute some joblib tasks recording, when the trace is enabled, the time interval of their execution and the
+        process and thread executing them.
+
+        :param parallel: (joblib.Parallel) object used to execute the tasks.
+        :param tasks: (iterable) tasks, created with joblib 'delayed' (i.e. delayed(function)(*args,**kwargs)).
+        :return: (list) outputs of the tasks.
+        """
+        if not self.trace:
+
+            return parallel(tasks)
+
+        start = time.time()
+        outputs = parallel((_TimedCall(func),args,kwargs) for func,args,kwargs in tasks)
+        self._add_trace_event('joblib (n_jobs={})'.format(parallel.n_jobs),'joblib',start,time.time(),os.getpid(),
+                              threading.get_ident())
+        results = []
+        for output,(name,pid,tid,task_start,task_end) in outputs:
+
+            self._add_trace_event(name,'joblib_task',task_start,task_end,pid,tid)
+            results.append(output)
+
+        return results
+
+    def start_step(self,stack):
+        """
+        Take the measurements at the beginning of a step.
+
+        :param stack: (bmiptools.stack.Stack) stack on which the step is executed.
+        :return: (dict) the measurements at the beginning of the step (to be passed to 'end_step').
+        """
+        n_slices,n_bytes = 0,0
+        if stack.data is not None:
+
+            n_slices,n_bytes = stack.data.shape[0],stack.data.nbytes
+
+        return {'n_slices': n_slices,'n_bytes': n_bytes,'rss_sampler': _RSSSampler(),'start': time.time(),
+                'wall_start': time.perf_counter(),'cpu_start': time.process_time()}
+
+    def end_step(self,step_start,name,kind):
+        """
+        Take the measurements at the end of a step and record the step.
+
+        :param step_start: (dict) measurements at the beginning of the step (see 'start_step').
+        :param name: (str) name of the step.
+        :param kind: (str) kind of step (e.g. 'fit' or 'transform').
+        """
+        wall_time = time.perf_counter()-step_start['wall_start']
+        cpu_time = time.process_time()-step_start['cpu_start']
+        peak_rss_increase = step_start['rss_sampler'].stop()
+        step = {'name': name,
+                'kind': kind,
+                'wall_time_s': wall_time,
+                'cpu_time_s': cpu_time,
+                'peak_rss_increase_bytes': peak_rss_increase,
+                'n_slices': step_start['n_slices'],
+                'n_bytes': step_start['n_bytes'],
+                'slices_per_s': step_start['n_slices']/wall_time if wall_time > 0 else None,
+                'MB_per_s': step_start['n_bytes']/10**6/wall_time if wall_time > 0 else None}
+        self.steps.append(step)
+        if self.trace:
+
+            self._add_trace_event(name,kind,step_start['start'],step_start['start']+wall_time,os.getpid(),
+                                  threading.get_ident(),{key: step[key] for key in ['cpu_time_s',
+                                                                                    'peak_rss_increase_bytes',
+                                                                                    'slices_per_s','MB_per_s']})
+
+    def report(self):
+        """
+        Return the performance report.
+
+        :return: (dict) dictionary containing the list of the recorded steps ('steps'), the total wall time
+                 ('total_wall_time_s') and the name of the slowest step ('slowest_step').
+        """
+        slowest_step = None
+        if len(self.steps) > 0:
+
+            slowest_step = max(self.steps,key=lambda step: step['wall_time_s'])['name']
+
+        return {'steps': self.steps,
+                'total_wall_time_s': sum([step['wall_time_s'] for step in self.steps]),
+                'slowest_step': slowest_step}
+
+    def save_report(self,path):
+        """
+        Save the performance report in a json file.
+
+        :param path: (str) path of the json file.
+        """
+        with open(path,'w') as jfile:
+
+            json.dump(self.report(),jfile,indent=4)
+
+    def save_trace(self,path):
+        """
+        Save the recorded timeline in a json file in the Chrome trace format.
+
+        :param path: (str) path of the json file.
+        """
+        with open(path,'w') as jfile:
+
+            json.dump({'traceEvents': self.trace_events,'displayTimeUnit': 'ms'},jfile)
+
+    def _add_trace_event(self,name,category,start,end,pid,tid,args=None):
+        """
+        Core method. Add a complete event (i.e. an event with a duration) to the timeline.
+
+        :param name: (str) name of the event.
+        :param category: (str) category of the event.
+        :param start: (float) starting time (in seconds, since the epoch).
+        :param end: (float) ending time (in seconds, since the epoch).
+        :param pid: (int) process in which the event took place.
+        :param tid: (int) thread in which the event took place.
+        :param args: (dict or None) additional information shown with the event.
+        """
+        event = {'name': name,'cat': category,'ph': 'X','ts': start*10**6,'dur': (end-start)*10**6,'pid': pid,
+                 'tid': tid}
+        if args is not None:
+
+            event['args'] = args
+
+        self.trace_events.append(event)
+
+    def _add_process_name(self,pid,name):
+        """
+        Core method. Add to the timeline the name of a process.
+
+        :param pid: (int) process id.
+        :param name: (str) name of the process.
+        """
+        self.trace_events.append({'name': 'process_name','ph': 'M','pid': pid,'args': {'name': name}})
@@ -169,6 +169,25 @@ def standard_number(number,n_digits=4):
 
     return res
 
+def printable_size(size_in_bytes):
+    """
+    Write a memory size in a human readable form.
+
+    :param size_in_bytes: (int) memory size in bytes.
+    :return: (str) the memory size written with the most suited unit of measure (from B to TB).
+    """
+    order_list = np.array([0, 3, 6, 9, 12])
+    order_name = ['B', 'kB', 'MB', 'GB', 'TB']
+    if size_in_bytes < 1:
+
+        return '0 B'
+
+    order = np.floor(np.log10(size_in_bytes))
+    pos = np.where(order - order_list >= 0)
+    pos = pos[0][-1]
+    val = np.around(size_in_bytes / 10 ** order_list[pos], 2)
+    return '{} {}'.format(val, order_name[pos])
+
 def set_in_a_nested_dict(adict, key, value):
     """
     Set the value of a given final key in a nested dictionary. Note that for duplicate key names in the nested
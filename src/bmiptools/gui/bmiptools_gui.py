@@ -311,14 +311,16 @@ class StackSave:
 
         saving_path = FileEdit(value='',name='saving path',mode='d')
         saving_name = LineEdit(value='',name='saving name')
-        mode = ComboBox(value='slice_by_slice',choices=['slice_by_slice','all_stack'],name='mode')
+        mode = ComboBox(value='slice_by_slice',choices=['slice_by_slice','all_stack','bigtiff','chunked','hdf5'],name='mode')
         data_type = ComboBox(value='uint8', choices=['uint8','float32'],name='data type')
         extension = LineEdit(value='tiff',name='extension')
         standard_saving = CheckBox(value=True,name='standard saving')
         save_metadata = CheckBox(value=True,name='save metadata')
+        pyramid_levels = LiteralEvalLineEdit(value=0,name='pyramid levels')
+        pyramid_z_binning = CheckBox(value=False,name='pyramid z binning')
         self.b_ok = PushButton(name='Ok')
         self.gui = Container(widgets=[saving_path,saving_name,mode,data_type,extension,standard_saving,
-                                      save_metadata,self.b_ok])
+                                      save_metadata,pyramid_levels,pyramid_z_binning,self.b_ok])
 
     # def _connect_gui_functions(self):
     #
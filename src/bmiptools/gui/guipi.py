@@ -0,0 +1,279 @@
+# Title: 'guipi.py'
+# Date: 18/10/26
+#
+# Scope: Store the information needed for the automatic gui creation without depending on the gui backend.
+
+"""
+GuiPI class, used by the plugins (and the Stack class) to describe their parameters for the automatic GUI creation. The
+module does not import magicgui, which is imported only when a widget is created, so that the library can be used on
+machines without a display (e.g. with the command-line runner 'bmiptools.run_pipeline').
+"""
+
+
+#################
+#####   LIBRARIES
+#################
+
+
+import numpy as np
+
+
+###############
+#####   CLASSES
+###############
+
+
+# basic class for the storage of useful information for the automatic gui creation in bmip_tool
+class GuiPI:
+    """
+    Basic class for the storage of useful information for the automatic GUI creation in bmip_tool
+    """
+
+    def __init__(self,p_type=None,min=None,max=None,options=None,description=None,name=None,filemode=None,visible=True):
+        """
+        GuiPI, i.e. Gui Parameter Information, is an object which store information about the parameters relevant for
+        the automatic gui construction.
+
+        * int;
+        * bool;
+        * float;
+        * str;
+        * path;
+        * list <- a python list
+        * options <- list of objects among which the user can choose;
+        * range int <- from A to B with a step of C with A,B,C integer;
+        * range float <- from A to B with a step of C with A,B,C float;
+        * span int <- from A to B in C steps with A,B,C integer;
+        * span float <- from A to B in C steps with A,B,C float;
+        * math <- mathematical object, e.g. vector,matrix,ecc... + python slicing notation, e.g. [-500,None] to indicate x[-500:];
+        * table <- list-of-list expressing tabular data, e.g. [[key1, value1],[key2,value2],...].
+
+
+        :param p_type: type of parameter. If chosen according to the list above a reasonable behaviour is expected;
+        :param min: minimum value for the parameter;
+        :param max: maximum value for the parameter;
+        :param options: list containing the possible options among which the user can choose;
+        :param description: text containing a brief description of the parameter;
+        :param name: name of the parameter.
+        :param filemode: mode for the FileDialogMode used when p_type = 'path', otherwise is ignored. It can be:
+
+                                    * 'r' returns one existing file.
+                                    * 'rm' return one or more existing files.
+                                    * 'w' return one file name that does not have to exist.
+                                    * 'd' returns one existing directory.
+
+        :param visible: if the widget will be visible or not in the final gui.
+        """
+        self.p_type = p_type
+        self.min = min
+        self.max = max
+        self.options = options
+        self.description = description
+        self.name = name
+        self.filemode = filemode
+        self.visible = visible
+
+        self._check()
+
+    def _check(self):
+        """
+        Check, initialize with standard values, and (eventually) correct the GuiPI object when created.
+        """
+        if self.p_type == int:
+
+            self._max_is_none = self.max is None
+            if self.max is None:
+
+                self.max = np.iinfo(np.uint16).max
+
+            self._min_is_none = self.min is None
+            if self.min is None:
+
+                self.min = np.iinfo(np.uint16).min
+
+        if self.p_type is float:
+
+            self._max_is_none = self.max is None
+            if self.max is None:
+
+                self.max = np.finfo(np.float32).max
+
+            self._min_is_none = self.min is None
+            if self.min is None:
+
+                self.min = np.finfo(np.float32).min
+
+        if self.options != None:
+
+            self.p_type = 'options'
+
+        if self.p_type == 'path' and not self.filemode in ['r','rm','w','d']:
+
+            self.filemode = 'r'
+
+    @staticmethod
+    def _standard_set_value(wdg, val):
+        """
+        Default method to initialize the state of a widget
+
+        :param wdg: widget to initialize;
+        :param val: value to set.
+        """
+        wdg.value = val
+        return wdg
+
+    @staticmethod
+    def _standard_get_value(wdg):
+        """
+        Default method to read the state of a widget
+
+        :param wdg: widget to read.
+        """
+        return wdg.value
+
+    def widget(self,name=None):
+        """
+        Methods returning the widget, setter and reader method according to the convention chosen by GuiPI.
+
+        :param name: (str) optional, the name of the plugin (also the text typically displayed in the widget);
+        :return: the widget, the corresponding setter and reader methods.
+        """
+        # magicgui is imported only when a widget is actually needed
+        from magicgui.widgets import create_widget,SpinBox,FloatSpinBox,ComboBox,CheckBox,LineEdit,Slider,\
+            FloatSlider,FileEdit,RangeEdit,LiteralEvalLineEdit,Table
+        from bmiptools.gui.gui_basic import FloatRangeText,FloatRangeText_set_value,FloatRangeText_get_value,\
+            IntSpace,IntSpace_set_value,IntSpace_get_value,FloatSpaceText,FloatSpaceText_set_value,\
+            FloatSpaceText_get_value
+
+        plugin_name = name
+        if plugin_name is None:
+
+            plugin_name = self.name
+
+        if self.p_type == int:
+
+            if not self._min_is_none and not self._max_is_none:
+
+                widget = Slider(min=self.min, max=self.max, tracking=True, readout=True,
+                                name=plugin_name, tooltip=self.description)
+                setter = self._standard_set_value
+                reader = self._standard_get_value
+
+            else:
+
+                widget = SpinBox(value=self.min, min=self.min, max=self.max, name=plugin_name,
+                                 tooltip=self.description)
+                setter = self._standard_set_value
+                reader = self._standard_get_value
+
+        elif self.p_type == bool:
+
+            widget = CheckBox(text=plugin_name,tooltip=self.description,name=plugin_name)
+            setter = self._standard_set_value
+            reader = self._standard_get_value
+
+        elif self.p_type == float:
+
+            if not self._min_is_none and not self._max_is_none:
+
+                widget = FloatSlider(min=self.min, max=self.max, tracking=True, readout=True, step=0.0000001,
+                                     name=plugin_name, tooltip=self.description)
+                setter = self._standard_set_value
+                reader = self._standard_get_value
+
+            else:
+
+                widget = FloatSpinBox(value=self.min, min=self.min, max=self.max,step=0.0000001, name=plugin_name,
+                                      tooltip=self.description)
+                setter = self._standard_set_value
+                reader = self._standard_get_value
+
+        elif self.p_type == str:
+
+            widget = LineEdit(name=plugin_name, tooltip=self.description)
+            setter = self._standard_set_value
+            reader = self._standard_get_value
+
+        elif self.p_type == 'path':
+
+            widget = FileEdit(name=plugin_name, tooltip=self.description, mode=self.filemode)
+            setter = lambda wdg, val: wdg
+            reader = lambda wdg: str(wdg.value)
+
+        elif self.p_type == list:
+
+            widget = LiteralEvalLineEdit(value=[],name=plugin_name, tooltip=self.description)
+            setter = self._standard_set_value
+            reader = self._standard_get_value
+
+        elif self.p_type == 'options':
+
+            widget = ComboBox(value=self.options[0], choices=self.options, name=plugin_name,
+                              tooltip=self.description)
+            setter = self._standard_set_value
+            reader = self._standard_get_value
+
+        elif self.p_type == 'range int':
+
+            widget = RangeEdit(name=plugin_name, tooltip=self.description)
+            setter = lambda wdg, val: self._standard_set_value(wdg,range(val[0],val[1],val[2]))
+            reader = lambda wdg: [self._standard_get_value(wdg).start,
+                                  self._standard_get_value(wdg).stop,
+                                  self._standard_get_value(wdg).step]
+
+        elif self.p_type == 'range float':
+
+            widget = FloatRangeText()
+            widget.name = plugin_name
+            widget.tooltip = self.description
+            setter = FloatRangeText_set_value
+            reader = FloatRangeText_get_value
+
+        elif self.p_type == 'span int':
+
+            widget = IntSpace()
+            widget.name = plugin_name
+            widget.tooltip = self.description
+            setter = IntSpace_set_value
+            reader = IntSpace_get_value
+
+        elif self.p_type == 'span float':
+
+            widget = FloatSpaceText()
+            widget.name = plugin_name
+            widget.tooltip = self.description
+            setter = FloatSpaceText_set_value
+            reader = FloatSpaceText_get_value
+
+        elif self.p_type == 'math':
+
+            def _custom_set_value(wdg,val):
+
+                if type(val) == str:
+
+                    good_val = '\'{}\''.format(val)
+                    return self._standard_set_value(wdg,good_val)
+
+                else:
+
+                    return self._standard_set_value(wdg,val)
+
+            widget = LiteralEvalLineEdit(value=[],name=plugin_name, tooltip=self.description)
+            setter = _custom_set_value
+            reader = self._standard_get_value
+
+        elif self.p_type == 'table':
+
+            widget = Table(name=plugin_name, tooltip=self.description)
+            setter = self._standard_set_value
+            reader = self._standard_get_value
+
+        else:
+
+            widget = create_widget(self.p_type)
+            widget.name = plugin_name
+            widget.tooltip = self.description
+            setter = self._standard_set_value
+            reader = self._standard_get_value
+
+        return widget,setter,reader
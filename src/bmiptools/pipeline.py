@@ -36,9 +36,13 @@ import dill
 import glob
 import copy
 import imageio
+import hashlib
+import shutil
+from joblib import Parallel,delayed
 
 import bmiptools
 import bmiptools.core.utils as ut
+import bmiptools.core.perf_utils as pu
 from bmiptools.setting.installed_plugins import PLUGINS    # Import the installed plugins
 from bmiptools.core.base import CoreBasic
 from bmiptools.stack import Stack
@@ -87,6 +91,10 @@ class Pipeline(CoreBasic):
         super(Pipeline,self).__init__()
 
         self.save_preview = False
+        self.use_cache = False
+        self._fit_states = {}                   # plugin states before and after the last fit (see '_step_state')
+        self.save_performance_report = True
+        self.save_performance_trace = False
         self.gui_mode = gui_mode
         if operations_list is not None:
 
@@ -321,7 +329,47 @@ class Pipeline(CoreBasic):
             img = (256*(img-np.min(img))/(np.max(img)-np.min(img))).astype(np.uint8)
             imageio.imsave(uri=preview_slice_path, im=img)
 
-    def apply(self,stack,fit_enable_list=None):
+    def setup_cache(self,max_cache_size=None):
+        """
+        Enable the on-disk cache of the pipeline steps, stored in the folder 'cache' of the pipeline folder. The result
+        of each step (and the state of its plugin) is stored with a key computed from the fingerprint of the input stack
+        and, for each step up to the current one, from the class, the version and the transformation dictionary of the
+        plugin. When the pipeline is applied again, the steps found in the cache are skipped and the application
+        restarts from the first step which changed (e.g. after a crash or after a change of the parameters of the last
+        plugins). The cache is used only when the pipeline is not applied in streaming mode.
+
+        :param max_cache_size: (int or None) maximum size (in bytes) of the cache. When it is exceeded, the least
+                               recently used steps are deleted. If None, the cache is disabled.
+        """
+        if max_cache_size is not None:
+
+            self.use_cache = True
+            self._max_cache_size = max_cache_size
+            self._cache_folder = ut.manage_path(self.pipeline_folder_path+os.sep+'cache')
+            self._evict_from_cache()
+
+        else:
+
+            self.use_cache = False
+
+    def setup_performance_report(self,save_report=True,save_trace=False):
+        """
+        Set up the performance report of the pipeline application. For each fit and transformation step, wall time, CPU
+        time of the main process, largest increase of the RAM used by the process during the step (peak RSS increase,
+        sampled periodically, available only on Linux) and throughput (slices/s and MB/s of the input stack) are
+        recorded. The report is saved in the pipeline folder, in the file 'pipeline_report__***.json', and is available
+        in the 'performance_report' attribute of the class after the pipeline application.
+
+        :param save_report: (bool) if True the performance report is saved after each pipeline application.
+        :param save_trace: (bool) if True also the timeline of the steps, including the tasks executed in parallel by
+                           the plugins (see the 'parallel' method of the CoreBasic class), is saved in the pipeline
+                           folder in the Chrome trace format (file 'pipeline_trace__***.json', which can be opened with
+                           chrome://tracing or https://ui.perfetto.dev).
+        """
+        self.save_performance_report = save_report
+        self.save_performance_trace = save_trace
+
+    def apply(self,stack,fit_enable_list=None,slab_size=None):
         """
         Apply the pipeline to a given stack. The stack is transformed inplace.
 
@@ -331,13 +379,56 @@ class Pipeline(CoreBasic):
                                 'fit_enable' attribute of each plugin, controlling if a plugin is fitted or not during
                                 pipeline application to a stack. If None the pipeline is fitted according to the current
                                 'fit_enable' variables of the plugins.
+        :param slab_size: (int or None) if not None, the pipeline is applied in streaming mode: consecutive plugins
+                          working slice by slice (see the '_is_slice_local' method of the plugins) are applied one
+                          after the other on each slab of 'slab_size' slices, before moving to the next slab, so that
+                          no intermediate result of the size of the whole stack is created. Plugins needing the whole
+                          stack (and the fits of the auto-optimized plugins) act as barriers, i.e. they are applied to
+                          the whole stack. In this mode the previews are saved only after each group of plugins
+                          applied slab by slab (with the name of the last plugin of the group) and after each barrier.
         """
         if self.save_preview:
 
             self._preview_save(stack,'original')
 
-        for n,operation_name in enumerate(self.true_operations_list):
+        self._performance_recorder = pu.PerformanceRecorder(trace=self.save_performance_trace)
+        self._performance_recorder.start()
+        previous_task_recorder = CoreBasic._task_recorder
+        CoreBasic._task_recorder = self._performance_recorder
+        try:
+
+            if slab_size is not None:
+
+                self._apply_streaming(stack,fit_enable_list,slab_size)
+
+            else:
+
+                self._apply_step_by_step(stack,fit_enable_list)
 
+        finally:
+
+            CoreBasic._task_recorder = previous_task_recorder
+
+        self._save_performance_report()
+        stack.add_metadata('image_processing_metadata',{'tool': 'bmiptools _{}'.format(bmiptools.__version__),
+                                                        'info': self.pipeline_dict})
+
+    def _apply_step_by_step(self,stack,fit_enable_list):
+        """
+        Core method. Apply the pipeline one step after the other, each step on the whole stack (eventually skipping the
+        steps found in the cache).
+
+        :param stack: (Stack) stack to transform.
+        :param fit_enable_list: (list of boolean) see the 'apply' method.
+        """
+        n_start = 0
+        if self.use_cache:
+
+            n_start,cache_key = self._resume_from_cache(stack,fit_enable_list)
+
+        for n,operation_name in enumerate(self.true_operations_list[n_start:],n_start):
+
+            step_start = self._performance_recorder.start_step(stack)
             if 'fit_' in operation_name:
 
                 self.write('{}/{} | fitting {}\n'.format(n+1,len(self.true_operations_list),operation_name[4:]),end='\r')
@@ -346,11 +437,20 @@ class Pipeline(CoreBasic):
 
                     plugin.fit_enable = fit_enable_list[n]
 
+                if self.use_cache:
+
+                    pre_fit_state = self._step_state(operation_name,fit_enable_list,n)
+                    cache_key = self._cache_key(cache_key,operation_name,pre_fit_state)
+
                 if hasattr(plugin,'auto_optimize') and plugin.auto_optimize:
 
                     plugin.fit(stack)
                     plugin.fit_enable = False
 
+                if self.use_cache:
+
+                    self._fit_states[operation_name] = (pre_fit_state,self._plugin_state(plugin))
+
                 # update the pipeline dictionary with the parameters found during fit
                 self.pipeline_dict['pipeline_setting'][operation_name[4:]] = plugin.get_transformation_dictionary()
 
@@ -358,6 +458,10 @@ class Pipeline(CoreBasic):
 
                 self.write('{}/{} | applying {}\n'.format(n+1,len(self.true_operations_list),operation_name),end='\r')
                 plugin = self.pipeline[operation_name]
+                if self.use_cache:
+
+                    cache_key = self._cache_key(cache_key,operation_name,self._step_state(operation_name))
+
                 plugin.transform(stack)
                 if self.save_preview:
 
@@ -365,8 +469,656 @@ class Pipeline(CoreBasic):
 
                         self._preview_save(stack,'post__'+operation_name)
 
-        stack.add_metadata('image_processing_metadata',{'tool': 'bmiptools _{}'.format(bmiptools.__version__),
-                                                        'info': self.pipeline_dict})
+            self._performance_recorder.end_step(step_start,operation_name,
+                                                'fit' if 'fit_' in operation_name else 'transform')
+            if self.use_cache:
+
+                self._store_in_cache(cache_key,operation_name,stack)
+
+    def _save_performance_report(self):
+        """
+        Core method. Save the performance report (and eventually the timeline) of the last pipeline application in the
+        pipeline folder.
+        """
+        self.performance_report = self._performance_recorder.report()
+        if self.save_performance_report:
+
+            self._performance_recorder.save_report(self.pipeline_folder_path+os.sep+
+                                                   'pipeline_report__{}.json'.format(self.pipeline_name))
+
+        if self.save_performance_trace:
+
+            self._performance_recorder.save_trace(self.pipeline_folder_path+os.sep+
+                                                  'pipeline_trace__{}.json'.format(self.pipeline_name))
+
+        if self.performance_report['slowest_step'] is not None:
+
+            self.write('Slowest step: {} ({:.2f} s of {:.2f} s).'.format(
+                       self.performance_report['slowest_step'],
+                       max([step['wall_time_s'] for step in self.performance_report['steps']]),
+                       self.performance_report['total_wall_time_s']))
+
+    @staticmethod
+    def _plugin_state(plugin):
+        """
+        Core method. Describe the current state of a plugin (used to compute the cache keys).
+
+        :param plugin: plugin to describe.
+        :return: (dict) the transformation dictionary (dumped in a json string) and the 'fit_enable' attribute.
+        """
+        return {'transformation_dictionary': json.dumps(plugin.get_transformation_dictionary(),cls=ut.NumpyEncoder,
+                                                        sort_keys=True),
+                'fit_enable': plugin.fit_enable}
+
+    def _step_state(self,operation_name,fit_enable_list=None,n=None):
+        """
+        Core method. Return the state of the plugin used to compute the cache key of a step. A fit changes the plugin
+        (e.g. the optimized parameters and 'fit_enable'): when the plugin is still in the state reached with its last
+        fit, the key of the fit step is computed from the state the plugin had before that fit, so that applying the
+        same pipeline again finds the fit in the cache.
+
+        :param operation_name: (str) name of the operation of the step (as in 'true_operations_list').
+        :param fit_enable_list: (list of boolean or None) see the 'apply' method.
+        :param n: (int or None) position of the step in 'true_operations_list'.
+        :return: (dict) the state of the plugin (see '_plugin_state').
+        """
+        plugin = self.pipeline[operation_name[4:] if 'fit_' in operation_name else operation_name]
+        plugin_state = self._plugin_state(plugin)
+        if 'fit_' in operation_name:
+
+            requested_fit_enable = None
+            if fit_enable_list is not None:
+
+                requested_fit_enable = fit_enable_list[n]
+
+            if operation_name in self._fit_states:
+
+                pre_fit_state,post_fit_state = self._fit_states[operation_name]
+                unchanged_since_fit = plugin_state['transformation_dictionary'] == \
+                                      post_fit_state['transformation_dictionary']
+                if unchanged_since_fit and (requested_fit_enable is not None or
+                                            plugin_state['fit_enable'] == post_fit_state['fit_enable']):
+
+                    plugin_state = dict(pre_fit_state)
+
+            if requested_fit_enable is not None:
+
+                plugin_state['fit_enable'] = requested_fit_enable
+
+        return plugin_state
+
+    def _cache_key(self,previous_key,operation_name,plugin_state):
+        """
+        Core method. Compute the cache key of a step of the pipeline, from the key of the previous step (or the
+        fingerprint of the input stack, for the first step) and the state of the plugin of the step.
+
+        :param previous_key: (str) key of the previous step or fingerprint of the input stack.
+        :param operation_name: (str) name of the operation of the step (as in 'true_operations_list').
+        :param plugin_state: (dict) state of the plugin of the step (see '_step_state').
+        :return: (str) the key of the step.
+        """
+        plugin = self.pipeline[operation_name[4:] if 'fit_' in operation_name else operation_name]
+        step_description = {'previous_key': previous_key,
+                            'fit': 'fit_' in operation_name,
+                            'plugin': plugin.__class__.__name__,
+                            'plugin_version': getattr(plugin,'__version__',None),
+                            'transformation_dictionary': plugin_state['transformation_dictionary'],
+                            'fit_enable': plugin_state['fit_enable'],
+                            'precision': self._precision.name}
+        dumped = json.dumps(step_description,cls=ut.NumpyEncoder,sort_keys=True)
+        return hashlib.sha1(dumped.encode()).hexdigest()
+
+    def _resume_from_cache(self,stack,fit_enable_list):
+        """
+        Core method. Skip the first steps of the pipeline found in the cache: the plugins of the skipped steps are
+        restored in the state they had after the step, and the stack is replaced with the result of the last skipped
+        step.
+
+        :param stack: (Stack) stack to transform.
+        :param fit_enable_list: (list of boolean) see the 'apply' method.
+        :return: (int, str) index of the first step to execute and key of the last step skipped (or fingerprint of the
+                 input stack if no step is skipped).
+        """
+        cache_key = stack.fingerprint()
+        n_start = 0
+        last_entry_with_data = None
+        for n,operation_name in enumerate(self.true_operations_list):
+
+            plugin_name = operation_name[4:] if 'fit_' in operation_name else operation_name
+            if 'fit_' in operation_name and fit_enable_list is not None:
+
+                self.pipeline[plugin_name].fit_enable = fit_enable_list[n]
+
+            step_state = self._step_state(operation_name,fit_enable_list,n)
+            step_key = self._cache_key(cache_key,operation_name,step_state)
+            state_path = self._cache_folder+os.sep+step_key+os.sep+'state.dill'
+            if not os.path.exists(state_path):
+
+                break
+
+            with open(state_path,'rb') as dfile:
+
+                state = dill.load(dfile)
+
+            os.utime(state_path)                                # mark the step as recently used
+            self.pipeline[plugin_name] = state['plugin']
+            if 'fit_' in operation_name:
+
+                self._fit_states[operation_name] = (step_state,self._plugin_state(state['plugin']))
+
+            self.pipeline_dict['pipeline_setting'][plugin_name] = state['plugin'].get_transformation_dictionary()
+            if not 'fit_' in operation_name:
+
+                last_entry_with_data = (self._cache_folder+os.sep+step_key,state['temporary_library_metadata'])
+
+            cache_key = step_key
+            n_start = n+1
+
+        if last_entry_with_data is not None:
+
+            entry_folder,temporary_library_metadata = last_entry_with_data
+            mmap_mode = 'r' if stack.memory_map else None
+            stack.from_array(np.load(entry_folder+os.sep+'data.npy',mmap_mode=mmap_mode),copy=False)
+            stack.temporary_library_metadata = temporary_library_metadata
+
+        if n_start > 0:
+
+            self.write('{} steps of {} found in the cache.'.format(n_start,len(self.true_operations_list)))
+
+        return n_start,cache_key
+
+    def _store_in_cache(self,cache_key,operation_name,stack):
+        """
+        Core method. Store in the cache the state of the plugin after a step of the pipeline and, for the application
+        steps, the resulting stack. Plugins which cannot be serialized via dill are not cached. The least recently used
+        steps are then deleted if the size of the cache exceeds the maximum size.
+
+        :param cache_key: (str) key of the step.
+        :param operation_name: (str) name of the operation of the step (as in 'true_operations_list').
+        :param stack: (Stack) stack after the step.
+        """
+        plugin = self.pipeline[operation_name[4:] if 'fit_' in operation_name else operation_name]
+        if not dill.pickles(plugin):
+
+            warnings.warn('Step \'{}\' not cached: the plugin cannot be serialized via dill.'.format(operation_name))
+            return None
+
+        entry_folder = ut.manage_path(self._cache_folder+os.sep+cache_key)
+        if not 'fit_' in operation_name:
+
+            np.save(entry_folder+os.sep+'data.npy',stack.data)
+
+        # the state is written last: an entry without state (e.g. after a crash) is ignored
+        with open(entry_folder+os.sep+'state.dill','wb') as dfile:
+
+            dill.dump({'plugin': plugin,'temporary_library_metadata': stack.temporary_library_metadata},dfile)
+
+        self._evict_from_cache()
+
+    def _evict_from_cache(self):
+        """
+        Core method. Delete the least recently used steps of the cache until its size does not exceed the maximum size.
+        """
+        entries = []
+        for entry in os.scandir(self._cache_folder):
+
+            if entry.is_dir():
+
+                entry_size = sum([f.stat().st_size for f in os.scandir(entry.path) if f.is_file()])
+                state_path = entry.path+os.sep+'state.dill'
+                last_access = os.path.getmtime(state_path) if os.path.exists(state_path) else 0
+                entries.append((last_access,entry_size,entry.path))
+
+        cache_size = sum([entry_size for _,entry_size,_ in entries])
+        for _,entry_size,entry_path in sorted(entries):
+
+            if cache_size <= self._max_cache_size:
+
+                break
+
+            shutil.rmtree(entry_path)
+            cache_size = cache_size - entry_size
+
+    def _apply_streaming(self,stack,fit_enable_list,slab_size):
+        """
+        Core method. Apply the pipeline in streaming mode (see the 'slab_size' option of the 'apply' method).
+
+        :param stack: (Stack) stack to transform.
+        :param fit_enable_list: (list of boolean) see the 'apply' method.
+        :param slab_size: (int) number of slices of each slab.
+        """
+        fused_operations = []
+        for n,operation_name in enumerate(self.true_operations_list):
+
+            if 'fit_' in operation_name:
+
+                plugin = self.pipeline[operation_name[4:]]
+                if fit_enable_list is not None:
+
+                    plugin.fit_enable = fit_enable_list[n]
+
+                if hasattr(plugin,'auto_optimize') and plugin.auto_optimize:
+
+                    self._apply_slab_by_slab(stack,fused_operations,slab_size)
+                    fused_operations = []
+                    self.write('{}/{} | fitting {}\n'.format(n+1,len(self.true_operations_list),operation_name[4:]),
+                               end='\r')
+                    step_start = self._performance_recorder.start_step(stack)
+                    plugin.fit(stack)
+                    plugin.fit_enable = False
+                    self._performance_recorder.end_step(step_start,operation_name,'fit')
+
+                # update the pipeline dictionary with the parameters found during fit
+                self.pipeline_dict['pipeline_setting'][operation_name[4:]] = plugin.get_transformation_dictionary()
+
+            elif self.pipeline[operation_name]._is_slice_local():
+
+                fused_operations.append(operation_name)
+
+            else:
+
+                self._apply_slab_by_slab(stack,fused_operations,slab_size)
+                fused_operations = []
+                self.write('{}/{} | applying {}\n'.format(n+1,len(self.true_operations_list),operation_name),end='\r')
+                step_start = self._performance_recorder.start_step(stack)
+                self.pipeline[operation_name].transform(stack)
+                self._performance_recorder.end_step(step_start,operation_name,'transform')
+                if self.save_preview and operation_name.split('_')[0] not in self._preview_plugin_to_exclude:
+
+                    self._preview_save(stack,'post__'+operation_name)
+
+        self._apply_slab_by_slab(stack,fused_operations,slab_size)
+
+    def _apply_slab_by_slab(self,stack,operations,slab_size):
+        """
+        Core method. Apply a sequence of slice-local plugins slab by slab. When the result has the shape and the data
+        type of the stack, it is written in place in the stack, otherwise it is collected in a new array which then
+        replaces the stack data. The temporary library metadata produced by the plugins on each slab (e.g. the
+        statistics of the 'Standardizer') are merged in the ones of the stack.
+
+        :param stack: (Stack) stack to transform.
+        :param operations: (list of str) names of the plugins to apply, in order.
+        :param slab_size: (int) number of slices of each slab.
+        """
+        if len(operations) == 0:
+
+            return None
+
+        self.write('applying {} slab by slab ({} slices per slab)'.format(ut.list_to_string(operations),slab_size))
+        step_start = self._performance_recorder.start_step(stack)
+        output = None
+        slabs_metadata = []
+        for slab in stack.slabs(slab_size=slab_size):
+
+            slab_stack = slab.stack
+            slab_stack.memory_map = False                # each slab fits in RAM by construction
+            for operation_name in operations:
+
+                self.pipeline[operation_name].transform(slab_stack)
+
+            if output is None:
+
+                output = stack
+                if slab_stack.data.shape[1:] != stack.data.shape[1:] or slab_stack.data.dtype != stack.data.dtype:
+
+                    output = Stack(memory_map=stack.memory_map)
+
+            output.write_slab(slab,slab_stack)
+            slabs_metadata.append(slab_stack.temporary_library_metadata)
+
+        if output is not stack:
+
+            stack.from_array(output.data,copy=False)
+            output = None
+
+        for key in slabs_metadata[0]:
+
+            if not slabs_metadata[0][key] is stack.temporary_library_metadata.get(key):
+
+                stack.temporary_library_metadata[key] = self._merge_slabs_metadata([slab_metadata[key] for slab_metadata
+                                                                                    in slabs_metadata])
+
+        self._performance_recorder.end_step(step_start,' + '.join(operations),'transform (slab by slab)')
+        if self.save_preview and operations[-1].split('_')[0] not in self._preview_plugin_to_exclude:
+
+            self._preview_save(stack,'post__'+operations[-1])
+
+    @staticmethod
+    def _merge_slabs_metadata(values):
+        """
+        Core method. Merge the temporary library metadata produced by a plugin on each slab of a stack: statistics are
+        combined in the statistics of the whole stack, while for the other values the one of the first slab is kept.
+
+        :param values: (list) values produced on each slab, ordered along the z axis.
+        :return: the value for the whole stack.
+        """
+        if isinstance(values[0],dict):
+
+            if 'slices_means' in values[0]:
+
+                return Stack._combine_statistics(values)
+
+            return {key: Pipeline._merge_slabs_metadata([value[key] for value in values]) for key in values[0]}
+
+        return values[0]
+
+    def apply_batch(self,stack_paths,saving_folder_path,loading_setting=None,saving_setting=None,slab_size=None,
+                    fit_each_stack=False):
+        """
+        Apply the pipeline to a batch of stacks, each of them loaded from its path, transformed with an independent copy
+        of the pipeline and saved in the saving folder with the name of the original stack (stacks with the same name
+        are saved as '<name>__<n>', with n the position of the stack in the batch, see 'batch_stack_names'). When
+        multiprocessing is enabled with the 'parallelize_pipeline' type (see the 'multiprocessing_type' global setting),
+        several stacks are processed at once in worker processes, where the plugins run serially to avoid the
+        oversubscription of the CPUs. Otherwise the stacks are processed one after the other. Unless 'fit_each_stack' is
+        True, only the application steps of the pipeline are executed, i.e. plugins fitted before are used with their
+        fitted parameters.
+
+        :param stack_paths: (list of str) paths of the stacks to process.
+        :param saving_folder_path: (str) path of the folder where the transformed stacks are saved.
+        :param loading_setting: (dict or None) keyword arguments of the Stack class initialization used to load the
+                                stacks (e.g. {'from_folder': False}).
+        :param saving_setting: (dict or None) keyword arguments of the 'save' method of the Stack class used to save the
+                               transformed stacks (except 'saving_path' and 'saving_name').
+        :param slab_size: (int or None) if not None, the pipeline is applied to each stack in streaming mode with slabs
+                          of 'slab_size' slices (see the 'apply' method).
+        :param fit_each_stack: (bool) if True also the fit steps of the pipeline are executed, i.e. the plugins are
+                               fitted independently on each stack (also when the pipeline has been loaded, or the fit
+                               has been disabled by a previous application of the pipeline).
+        :return: (list of str) names of the saved stacks, in the same order of the input paths.
+        """
+        saving_folder_path = ut.manage_path(saving_folder_path)
+        if loading_setting is None:
+
+            loading_setting = {}
+
+        if saving_setting is None:
+
+            saving_setting = {}
+
+        stack_names = self.batch_stack_names(stack_paths,loading_setting)
+        if self._use_multiprocessing and self._use_multiprocessing_type == 'parallelize_pipeline' \
+                and len(stack_paths) > 1:
+
+            n_workers = min(self._n_available_cpu,len(stack_paths))
+            self.write('Applying the pipeline to {} stacks with {} workers...'.format(len(stack_paths),n_workers))
+            saved_stacks = Parallel(n_jobs=n_workers)(delayed(self._apply_to_stack_path)(self,stack_path,
+                                                                                         saving_folder_path,
+                                                                                         loading_setting,
+                                                                                         saving_setting,True,
+                                                                                         slab_size,fit_each_stack,
+                                                                                         stack_name)
+                                                      for stack_path,stack_name in zip(stack_paths,stack_names))
+
+        else:
+
+            saved_stacks = []
+            for n,stack_path in enumerate(stack_paths):
+
+                self.write('{}/{} | applying the pipeline to {}'.format(n+1,len(stack_paths),stack_path))
+                saved_stacks.append(self._apply_to_stack_path(self,stack_path,saving_folder_path,loading_setting,
+                                                              saving_setting,False,slab_size,fit_each_stack,
+                                                              stack_names[n]))
+
+        self.write('...batch terminated!')
+        return saved_stacks
+
+    @staticmethod
+    def batch_stack_names(stack_paths,loading_setting=None):
+        """
+        Return the names with which the stacks of a batch are saved, i.e. the name given in the loading setting or the
+        name of the file (or folder) of the stack. Since stacks with the same name would overwrite each other, a
+        duplicated name is followed by the position of the stack in the batch (i.e. '<name>__<n>').
+
+        :param stack_paths: (list of str) paths of the stacks.
+        :param loading_setting: (dict or None) keyword arguments of the Stack class initialization.
+        :return: (list of str) names of the stacks, in the same order of the paths.
+        """
+        stack_names = []
+        for stack_path in stack_paths:
+
+            stack_name = None
+            if loading_setting is not None:
+
+                stack_name = loading_setting.get('name')
+
+            if stack_name is None:
+
+                stack_name = os.path.splitext(os.path.basename(os.path.normpath(stack_path)))[0]
+
+            stack_names.append(stack_name)
+
+        duplicated_names = set([name for name in stack_names if stack_names.count(name) > 1])
+        if len(duplicated_names) > 0:
+
+            warnings.warn('Stacks with the same name in the batch ({}): they are saved with their position in the '
+                          'batch appended to the name.'.format(ut.list_to_string(sorted(duplicated_names))))
+            stack_names = [name+'__{}'.format(n) if name in duplicated_names else name
+                           for n,name in enumerate(stack_names)]
+
+        return stack_names
+
+    @staticmethod
+    def _apply_to_stack_path(pipeline,stack_path,saving_folder_path,loading_setting,saving_setting,force_serial,
+                             slab_size=None,fit_each_stack=False,stack_name=None):
+        """
+        Core method. Load a stack, apply to it a copy of the pipeline and save the result.
+
+        :param pipeline: (Pipeline) pipeline to apply.
+        :param stack_path: (str) path of the stack to process.
+        :param saving_folder_path: (str) path of the folder where the transformed stack is saved.
+        :param loading_setting: (dict) keyword arguments of the Stack class initialization.
+        :param saving_setting: (dict) keyword arguments of the 'save' method of the Stack class.
+        :param force_serial: (bool) if True all the objects used to process the stack run serially.
+        :param slab_size: (int or None) slab size of the streaming mode (see the 'apply' method).
+        :param fit_each_stack: (bool) if True also the fit steps of the pipeline are executed on the stack (with the
+                               fit of all the plugins enabled).
+        :param stack_name: (str or None) name of the saved stack. If None, the name of the stack (or of its file) is
+                           used.
+        :return: (str) name of the saved stack.
+        """
+        CoreBasic._force_serial = force_serial
+        try:
+
+            stack = Stack(path=stack_path,**loading_setting)
+            stack_pipeline = copy.deepcopy(pipeline)
+            fit_enable_list = None
+            if fit_each_stack:
+
+                # the fit steps are removed from 'true_operations_list' when a pipeline is loaded (see 'load')
+                stack_pipeline.true_operations_list = list(pipeline.pipeline_dict['true_operations_list'])
+                fit_enable_list = [True]*len(stack_pipeline.true_operations_list)
+
+            else:
+
+                stack_pipeline.true_operations_list = [op for op in pipeline.true_operations_list if not 'fit_' in op]
+
+            stack_pipeline.save_preview = False
+            stack_pipeline.save_performance_report = False
+            stack_pipeline.save_performance_trace = False
+            if force_serial:
+
+                stack_pipeline._use_multiprocessing = False
+                for plugin in stack_pipeline.pipeline.values():
+
+                    plugin._use_multiprocessing = False
+                    if hasattr(plugin,'force_serial'):
+
+                        plugin.force_serial = True
+
+            stack_pipeline.apply(stack,fit_enable_list=fit_enable_list,slab_size=slab_size)
+            if stack_name is None:
+
+                stack_name = Pipeline.batch_stack_names([stack_path],loading_setting)[0]
+
+            stack.save(saving_folder_path,stack_name,**saving_setting)
+
+        finally:
+
+            CoreBasic._force_serial = False
+
+        return stack_name
+
+    def plan_memory(self,shape,dtype,operations_list=None,ram_budget=None,memory_map=False):
+        """
+        Predict the peak memory needed by each step of the pipeline when applied to a stack of given shape and data
+        type, by using the memory footprint declared by each plugin (i.e. accounting for the temporaries created during
+        the transformation). Fit operations are not included in the estimate. When a RAM budget is given, the slab size
+        (i.e. the number of slices processed together) and the number of workers processing slabs in parallel are
+        recommended for the streaming mode (see the 'apply' method). Only the steps working slice by slice (see the
+        '_is_slice_local' method of the plugins) scale with the slab size, and during these steps the whole stack stays
+        in RAM (unless it is memory-mapped). The steps needing the whole stack must fit in the budget on their own,
+        otherwise the plan is infeasible.
+
+        :param shape: (tuple) shape of the stack, in the ZYX(C) convention.
+        :param dtype: data type of the stack.
+        :param operations_list: (list or None) list of operations written as in the initialization of the class. If
+                                None, the operations of the pipeline are used, and when the pipeline is initialized the
+                                estimate is refined with the plugins parameters (e.g. the crop ranges). Otherwise, the
+                                plugins are assumed to have their default parameters.
+        :param ram_budget: (int or None) RAM available (in bytes) for the pipeline application.
+        :param memory_map: (bool) if True the stack is assumed to be memory-mapped, i.e. not resident in RAM.
+        :return: (dict) dictionary containing the estimate for each step ('steps'), the name of the step with the
+                 largest peak ('largest_peak_step') and its peak in bytes ('peak_bytes'), the largest peak per slice
+                 of the steps working slice by slice ('peak_bytes_per_slice') and, when a budget is given, if the plan
+                 is 'feasible' and the recommended 'slab_size' and 'n_workers'.
+        """
+        plugins_dict = {}
+        if operations_list is None:
+
+            true_operations_list = self.true_operations_list
+            if hasattr(self,'pipeline'):
+
+                plugins_dict = self.pipeline
+
+        else:
+
+            _,true_operations_list = self._read_operations_list(operations_list)
+
+        steps = []
+        step_shape = tuple(shape)
+        step_dtype = np.dtype(dtype)
+        for operation_name in true_operations_list:
+
+            if 'fit_' in operation_name:
+
+                continue
+
+            plugin_class = PLUGINS[operation_name.split('_')[0]]
+            plugin = plugins_dict.get(operation_name)
+            output_shape,output_dtype,peak_bytes = plugin_class._memory_footprint(step_shape,step_dtype,
+                                                                                  self._precision,plugin)
+            if plugin is None:
+
+                plugin = self._default_plugin(plugin_class)
+
+            slice_local = plugin is not None and plugin._is_slice_local()
+            resident_bytes = 0
+            if not memory_map:
+
+                resident_bytes = int(np.prod(step_shape))*step_dtype.itemsize
+
+            steps.append({'operation': operation_name,
+                          'input_shape': step_shape,
+                          'input_dtype': step_dtype.name,
+                          'output_shape': output_shape,
+                          'output_dtype': np.dtype(output_dtype).name,
+                          'peak_bytes': int(peak_bytes),
+                          'slice_local': slice_local,
+                          'resident_bytes': resident_bytes if slice_local else 0,
+                          'peak_bytes_per_slice': int(np.ceil(peak_bytes/max(step_shape[0],1)))})
+            self.write('{} | peak memory {}{}'.format(operation_name,ut.printable_size(peak_bytes),
+                                                      '' if slice_local else ' (whole stack)'))
+            step_shape = output_shape
+            step_dtype = np.dtype(output_dtype)
+
+        memory_plan = {'steps': steps,'largest_peak_step': None,'peak_bytes': 0,'peak_bytes_per_slice': 0}
+        if len(steps) > 0:
+
+            largest_step = max(steps,key=lambda step: step['peak_bytes'])
+            memory_plan['largest_peak_step'] = largest_step['operation']
+            memory_plan['peak_bytes'] = largest_step['peak_bytes']
+            memory_plan['peak_bytes_per_slice'] = max([step['peak_bytes_per_slice'] for step in steps
+                                                       if step['slice_local']],default=0)
+            self.write('Largest peak memory: {} ({})'.format(ut.printable_size(largest_step['peak_bytes']),
+                                                             largest_step['operation']))
+
+        if ram_budget is not None:
+
+            memory_plan.update(self._recommend_slabs(steps,ram_budget))
+
+        return memory_plan
+
+    @staticmethod
+    def _default_plugin(plugin_class):
+        """
+        Core method. Initialize a plugin with its default parameters (used to estimate its behaviour).
+
+        :param plugin_class: class of the plugin.
+        :return: the plugin, or None if it cannot be initialized with the default parameters.
+        """
+        try:
+
+            return plugin_class(copy.deepcopy(plugin_class.empty_transformation_dictionary))
+
+        except Exception:
+
+            return None
+
+    def _recommend_slabs(self,steps,ram_budget):
+        """
+        Core method. Recommend slab size and number of workers for a given RAM budget. The steps needing the whole
+        stack must fit in the budget on their own. For the steps working slice by slice, the budget left by the
+        resident stack is shared among the slabs processed at the same time: all the available CPUs are used (one
+        worker if multiprocessing is not enabled) with the largest slab fitting in the budget, and the number of workers
+        is reduced only when not even one slice per worker fits in the budget.
+
+        :param steps: (list of dict) steps of the memory plan (see 'plan_memory').
+        :param ram_budget: (int) RAM available (in bytes).
+        :return: (dict) dictionary with 'feasible' (False if the pipeline cannot be applied within the budget), and the
+                 recommended 'slab_size' and 'n_workers' (both 0 if the plan is not feasible).
+        """
+        for step in steps:
+
+            if not step['slice_local'] and step['peak_bytes'] > ram_budget:
+
+                warnings.warn('The step {} needs the whole stack, with a peak memory of {} exceeding the RAM budget of '
+                              '{}: the pipeline cannot be applied within the budget.'
+                              .format(step['operation'],ut.printable_size(step['peak_bytes']),
+                                      ut.printable_size(ram_budget)))
+                return {'feasible': False,'slab_size': 0,'n_workers': 0}
+
+        local_steps = [step for step in steps if step['slice_local'] and step['peak_bytes_per_slice'] > 0]
+        if len(local_steps) == 0:
+
+            n_slices = steps[0]['input_shape'][0] if len(steps) > 0 else 0
+            self.write('No step works slice by slice: the whole stack is processed at once.')
+            return {'feasible': True,'slab_size': n_slices,'n_workers': 1}
+
+        # largest number of slices which can be processed at the same time in every step
+        n_slices = max([step['input_shape'][0] for step in local_steps])
+        max_slices_in_flight = min([(ram_budget-step['resident_bytes'])//step['peak_bytes_per_slice']
+                                    for step in local_steps])
+        if max_slices_in_flight < 1:
+
+            warnings.warn('Not even a single slice can be processed within the given RAM budget of {} (the stack '
+                          'resident in RAM is counted in the budget).'.format(ut.printable_size(ram_budget)))
+            return {'feasible': False,'slab_size': 0,'n_workers': 0}
+
+        n_workers = 1
+        if self._use_multiprocessing:
+
+            n_workers = max(1,min(self._n_available_cpu,n_slices))
+
+        slab_size = int(max_slices_in_flight // n_workers)
+        if slab_size < 1:
+
+            n_workers = int(max_slices_in_flight)
+            slab_size = 1
+
+        slab_size = min(slab_size,int(np.ceil(n_slices/n_workers)))
+        self.write('Recommended slab size: {} slices, number of workers: {}'.format(slab_size,n_workers))
+        return {'feasible': True,'slab_size': slab_size,'n_workers': n_workers}
 
     def _make_pipeline_dillable(self,pipeline):
         """
@@ -468,7 +1220,7 @@ class Pipeline(CoreBasic):
 
             warnings.warn('Pipeline generated with \'bmiptools\' {}, while you are using \'bmiptools\' {}. '
                           'Possible compatibility issues due to the version mismatch can be found in the '
-                          '\'bmiptools\' manual '.format(loaded['version'],bmiptools.__version__))
+                          '\'bmiptools\' manual '.format(loaded['bmiptools_version'],bmiptools.__version__))
 
         self.plugins_list = self.pipeline_dict['plugins_list']
         self.pipeline_name = self.pipeline_dict['pipeline_name']
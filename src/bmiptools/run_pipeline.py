@@ -0,0 +1,298 @@
+# Title: 'run_pipeline.py'
+# Date: 18/10/26
+#
+# Scope: Apply a saved pipeline to a batch of stacks from the command line, without GUI.
+
+"""
+Command-line runner ('bmiptools-run') applying a saved pipeline to a batch of stacks, without importing the GUI. One
+status line is printed for each stack, and the exit code tells if all the stacks have been processed.
+"""
+
+
+#################
+#####   LIBRARIES
+#################
+
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+import numpy as np
+from joblib import Parallel,delayed
+
+import bmiptools
+import bmiptools.core.utils as ut
+from bmiptools.core.base import CoreBasic
+from bmiptools.pipeline import Pipeline
+
+
+#################
+#####   VARIABLES
+#################
+
+
+EXIT_SUCCESS = 0                                        # all the stacks have been processed
+EXIT_STACK_FAILURE = 1                                  # at least one stack has not been processed
+EXIT_USAGE_ERROR = 2                                    # wrong arguments or pipeline not loadable (as argparse)
+SAVING_MODES = ['all_stack','bigtiff','slice_by_slice','chunked','hdf5']
+
+
+#################
+#####   FUNCTIONS
+#################
+
+
+def _positive_int(x):
+
+    value = int(x)
+    if value < 1:
+
+        raise argparse.ArgumentTypeError('{} is not a positive integer.'.format(x))
+
+    return value
+
+
+def _parse_arguments(argv):
+    """
+    Read the command-line arguments.
+
+    :param argv: (list of str or None) command-line arguments. If None, sys.argv is used.
+    :return: (argparse.Namespace) the arguments.
+    """
+    parser = argparse.ArgumentParser(prog='bmiptools-run',
+                                     description='Apply a saved bmiptools pipeline (\'.dill\' file, or \'.json\' '
+                                                 'file to fit the pipeline on each stack) to a batch of stacks, without '
+                                                 'GUI. Exit code: {} if all the stacks are processed, {} if some stacks '
+                                                 'failed, {} for wrong arguments or if the pipeline cannot be '
+                                                 'loaded.'.format(EXIT_SUCCESS,EXIT_STACK_FAILURE,EXIT_USAGE_ERROR))
+    parser.add_argument('pipeline',help='path of the pipeline (\'.dill\' or \'.json\' file).')
+    parser.add_argument('stacks',nargs='+',help='paths of the stacks to process (files or folders of slices).')
+    parser.add_argument('-o','--output',required=True,help='folder where the transformed stacks are saved.')
+    parser.add_argument('--pipeline-folder',default=None,help='folder where the pipeline files are written (e.g. the '
+                                                              'json of an initialized template). Default: the output '
+                                                              'folder.')
+    parser.add_argument('--fit-each-stack',action='store_true',help='fit the plugins on each stack also for \'.dill\' '
+                                                                    'pipelines (always done for \'.json\' ones).')
+    parser.add_argument('--workers',type=_positive_int,default=None,help='number of CPUs used (1 to run serially). '
+                                                                          'Default: from the global setting.')
+    parser.add_argument('--multiprocessing-type',choices=['parallelize_pipeline','parallelize_plugin'],default=None,
+                        help='process several stacks at once, or one stack at once with parallel plugins. Default: '
+                             'from the global setting.')
+    parser.add_argument('--slab-size',type=_positive_int,default=None,help='apply the pipeline in streaming mode with '
+                                                                            'slabs of this number of slices.')
+    parser.add_argument('--precision',choices=['float32','float64'],default=None,help='floating point precision. '
+                                                                                      'Default: from the global '
+                                                                                      'setting.')
+    parser.add_argument('--memory-map',action='store_true',help='keep the stacks in memory-mapped files.')
+    parser.add_argument('--loading-extension',default='tiff',help='extension of the slices loaded from folders.')
+    parser.add_argument('--saving-mode',choices=SAVING_MODES,default='all_stack',help='saving mode of the stacks (see '
+                                                                                       'Stack.save).')
+    parser.add_argument('--extension',default='tiff',help='extension of the saved stacks.')
+    parser.add_argument('--data-type',default=None,help='data type of the saved stacks (e.g. uint8 or float32).')
+    parser.add_argument('--standard-saving',action='store_true',help='rescale the saved stacks for generic image '
+                                                                     'readers.')
+    parser.add_argument('--summary',default=None,help='path of a json file where the status of each stack is saved.')
+    parser.add_argument('--quiet',action='store_true',help='print only the status of the stacks.')
+    return parser.parse_args(argv)
+
+
+def load_pipeline(pipeline_path,pipeline_folder_path):
+    """
+    Load a pipeline without any user interaction.
+
+    :param pipeline_path: (str) path of the pipeline. It can be a '.dill' file (i.e. a saved pipeline, see
+                          'Pipeline.save'), or a '.json' file (i.e. a pipeline template, initialized with the
+                          parameters written in it).
+    :param pipeline_folder_path: (str) folder where the pipeline files are written.
+    :return: (Pipeline) the loaded pipeline.
+    """
+    pipeline_extension = os.path.splitext(pipeline_path)[1].lower()
+    assert pipeline_extension in ['.dill','.json'], 'The pipeline can be only a \'.dill\' or a \'.json\' file.'
+    pipeline = Pipeline(gui_mode=True)
+    if pipeline_extension == '.dill':
+
+        undillable_folder_path = os.path.dirname(os.path.abspath(pipeline_path))+os.sep+'undillable'
+        if not os.path.isdir(undillable_folder_path):
+
+            undillable_folder_path = None
+
+        pipeline.load(pipeline_path,undillable_folder_path)
+
+    else:
+
+        pipeline.load_pipeline_template_from_json(pipeline_path,pipeline_folder_path)
+        pipeline.initialize()
+
+    pipeline.pipeline_folder_path = ut.manage_path(pipeline_folder_path)
+    return pipeline
+
+
+def configure_pipeline(pipeline,n_workers=None,multiprocessing_type=None,precision=None,verbosity=None):
+    """
+    Override the global setting in the pipeline and in its plugins.
+
+    :param pipeline: (Pipeline) pipeline to configure.
+    :param n_workers: (int or None) number of CPUs used. With 1 the multiprocessing is disabled. If None the global
+                      setting is kept.
+    :param multiprocessing_type: (str or None) 'parallelize_pipeline' or 'parallelize_plugin'. If None the global
+                                 setting is kept.
+    :param precision: (str or None) 'float32' or 'float64'. If None the global setting is kept.
+    :param verbosity: (int or None) verbosity level. If None the global setting is kept.
+    """
+    for obj in [pipeline]+list(pipeline.pipeline.values()):
+
+        if n_workers is not None:
+
+            obj._n_available_cpu = n_workers
+            obj._use_multiprocessing = n_workers > 1
+
+        if multiprocessing_type is not None:
+
+            obj._use_multiprocessing_type = multiprocessing_type
+
+        if precision is not None:
+
+            obj._precision = np.dtype(precision)
+
+        if verbosity is not None:
+
+            obj.verbosity = verbosity
+
+
+def _process_stack(pipeline,stack_path,stack_name,output_folder_path,loading_setting,saving_setting,force_serial,
+                   slab_size,fit_each_stack,precision):
+    """
+    Core function. Process a single stack and return its status, without raising exceptions.
+
+    :param pipeline: (Pipeline) pipeline to apply.
+    :param stack_path: (str) path of the stack.
+    :param stack_name: (str) name of the saved stack (see 'Pipeline.batch_stack_names').
+    :param output_folder_path: (str) folder where the transformed stack is saved.
+    :param loading_setting: (dict) keyword arguments of the Stack class initialization.
+    :param saving_setting: (dict) keyword arguments of the 'save' method of the Stack class.
+    :param force_serial: (bool) if True the stack is processed serially (i.e. in a worker).
+    :param slab_size: (int or None) slab size of the streaming mode.
+    :param fit_each_stack: (bool) if True the plugins are fitted on the stack.
+    :param precision: (str or None) floating point precision of the objects created in the worker.
+    :return: (dict) status of the stack.
+    """
+    CoreBasic._force_precision = precision
+    status = {'stack_path': stack_path,'status': 'OK','saved_path': None,'error': None,'traceback': None}
+    start = time.perf_counter()
+    try:
+
+        loading_setting = dict(loading_setting,from_folder=os.path.isdir(stack_path))
+        stack_name = Pipeline._apply_to_stack_path(pipeline,stack_path,output_folder_path,loading_setting,
+                                                   saving_setting,force_serial,slab_size,fit_each_stack,stack_name)
+        status['saved_path'] = os.path.normpath(output_folder_path+os.sep+stack_name)
+
+    except Exception as e:
+
+        status['status'] = 'FAILED'
+        status['error'] = '{}: {}'.format(type(e).__name__,e)
+        status['traceback'] = traceback.format_exc()
+
+    status['wall_time_s'] = time.perf_counter()-start
+    return status
+
+
+def _print_status(status):
+
+    if status['status'] == 'OK':
+
+        print('[OK] {} -> {} ({:.1f} s)'.format(status['stack_path'],status['saved_path'],status['wall_time_s']),
+              flush=True)
+
+    else:
+
+        print('[FAILED] {} ({:.1f} s): {}'.format(status['stack_path'],status['wall_time_s'],status['error']),
+              flush=True)
+        print(status['traceback'],file=sys.stderr,flush=True)
+
+
+def main(argv=None):
+    """
+    Command-line entry point ('bmiptools-run'). Load the pipeline, apply it to each stack and print one status line per
+    stack.
+
+    :param argv: (list of str or None) command-line arguments. If None, sys.argv is used.
+    :return: (int) exit code.
+    """
+    args = _parse_arguments(argv)
+    pipeline_folder_path = args.pipeline_folder
+    if pipeline_folder_path is None:
+
+        pipeline_folder_path = args.output
+
+    CoreBasic._force_precision = args.precision
+    try:
+
+        try:
+
+            pipeline = load_pipeline(args.pipeline,pipeline_folder_path)
+
+        except Exception as e:
+
+            print('Error: the pipeline {} cannot be loaded ({}: {}).'.format(args.pipeline,type(e).__name__,e),
+                  file=sys.stderr)
+            return EXIT_USAGE_ERROR
+
+        configure_pipeline(pipeline,args.workers,args.multiprocessing_type,args.precision,0 if args.quiet else None)
+        fit_each_stack = args.fit_each_stack or args.pipeline.lower().endswith('.json')
+        output_folder_path = ut.manage_path(args.output)
+        loading_setting = {'memory_map': args.memory_map,'loading_extension': args.loading_extension}
+        saving_setting = {'mode': args.saving_mode,'extension': args.extension,'data_type': args.data_type,
+                          'standard_saving': args.standard_saving}
+        stack_names = Pipeline.batch_stack_names(args.stacks)
+        if pipeline._use_multiprocessing and pipeline._use_multiprocessing_type == 'parallelize_pipeline' \
+                and len(args.stacks) > 1:
+
+            n_workers = min(pipeline._n_available_cpu,len(args.stacks))
+            statuses = Parallel(n_jobs=n_workers)(delayed(_process_stack)(pipeline,stack_path,stack_name,
+                                                                          output_folder_path,loading_setting,
+                                                                          saving_setting,True,args.slab_size,
+                                                                          fit_each_stack,args.precision)
+                                                  for stack_path,stack_name in zip(args.stacks,stack_names))
+            for status in statuses:
+
+                _print_status(status)
+
+        else:
+
+            statuses = []
+            for stack_path,stack_name in zip(args.stacks,stack_names):
+
+                statuses.append(_process_stack(pipeline,stack_path,stack_name,output_folder_path,loading_setting,
+                                               saving_setting,False,args.slab_size,fit_each_stack,args.precision))
+                _print_status(statuses[-1])
+
+    finally:
+
+        CoreBasic._force_precision = None
+
+    n_failed = len([status for status in statuses if status['status'] != 'OK'])
+    exit_code = EXIT_SUCCESS if n_failed == 0 else EXIT_STACK_FAILURE
+    print('{}/{} stacks processed, {} failed.'.format(len(statuses)-n_failed,len(statuses),n_failed),flush=True)
+    if args.summary is not None:
+
+        with open(args.summary,'w') as jfile:
+
+            json.dump({'pipeline': args.pipeline,
+                       'bmiptools_version': bmiptools.__version__,
+                       'exit_code': exit_code,
+                       'stacks': statuses},jfile,indent=4)
+
+    return exit_code
+
+
+############
+#####   MAIN
+############
+
+
+if __name__ == '__main__':
+
+    sys.exit(main())
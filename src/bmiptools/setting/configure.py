@@ -69,6 +69,17 @@ def set_use_gpu(gpu, path=bmiptools.__global_setting_path__):
     """
     ut.set_option_in_global_setting('use_gpu',gpu, path=path)
 
+def set_precision(precision, path=bmiptools.__global_setting_path__):
+    """
+    Set the floating point precision in 'global_setting.txt'.
+
+    :param precision: (str) 'float32' to keep the intermediate results of the plugins (and the stacks) in single
+                      precision, 'float64' to use the default numpy type promotion (i.e. double precision).
+    :param path: path to the 'global_setting.txt' file.
+    """
+    assert precision in ['float32','float64'], 'Precision can be only \'float32\' or \'float64\'.'
+    ut.set_option_in_global_setting('precision',precision, path=path)
+
 
 #################################
 #####   LOCAL PLUGIN INSTALLATION
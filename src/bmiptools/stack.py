@@ -19,12 +19,18 @@ I/O methods of bmiptools.
 import numpy as np
 import imageio
 import re
-import itertools
-import random
 import os
 import json
-import glob
+import io
+import copy
+import functools
+import itertools
+import uuid
+import queue
+import threading
+import warnings
 import exifread
+import tifffile
 from pathlib import Path
 from exifread.utils import Ratio
 from PIL.TiffTags import TAGS
@@ -32,8 +38,9 @@ from joblib import Parallel,delayed
 
 import bmiptools
 import bmiptools.core.utils as ut
+import bmiptools.core.io_utils as iout
 from bmiptools.core.base import CoreBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 ###############
@@ -44,11 +51,30 @@ from bmiptools.gui.gui_basic import GuiPI
 # TODO: _LOADING_FORMAT vs _loading_extension...can they be the same variable?
 
 
+@functools.lru_cache(maxsize=None)
+def _image_metadata_key(tag_name):
+    """
+    Convert the name of a TIFF tag (e.g. 'ImageWidth') in the snake-case key used in the image metadata dictionary
+    (e.g. 'image_width'). The conversion is cached, since the same tags are found in every slice.
+
+    :param tag_name: (str) name of the TIFF tag.
+    :return: (str) the key used in the image metadata dictionary.
+    """
+    tmp = _ACRONYM_PATTERN.sub(lambda pat: pat.group(0).lower(),tag_name)
+    key = _UPPERCASE_PATTERN.sub(lambda pat: '_' + pat.group(1).lower(),tmp)
+    if key[0] == '_': key = key[1:]
+    return key
+
+
 ############
 ##### GLOBAL
 ############
 
 
+_ACRONYM_PATTERN = re.compile(r'([A-Z]){4}')
+_UPPERCASE_PATTERN = re.compile(r'([A-Z])')
+
+
 #############
 ##### CLASSES
 #############
@@ -128,7 +154,71 @@ class ExperimentalMetadataInspector():
         """
         return x.replace('.','',1).replace('+','').replace('-','').replace('e','',1).isdigit()
 
-    def read_metadata(self,raw_experimental_setting):
+    def _index_lines(self,raw_experimental_setting):
+        """
+        Clean the raw metadata lines and index them in a single pass.
+
+        :param raw_experimental_setting: list of raw metadata lines.
+        :return: the list of cleaned lines and a dictionary associating to each line the position of its first
+                 occurrence.
+        """
+        lines = list(map(self.clean_line, raw_experimental_setting))
+        line_index = {}
+        for n,line in enumerate(lines):
+
+            line_index.setdefault(line,n)
+
+        return lines,line_index
+
+    def _interpret_metadata(self,metadata):
+        """
+        Interpret the line containing the value of a metadata.
+
+        :param metadata: (str) line containing the metadata value.
+        :return: the name, the value and the unit of measure of the metadata.
+        """
+        if metadata.find(' = ') == -1:
+
+            name = 'Value interpretation failed: whole content saved in \'value\' field.'
+            value = metadata
+            uom = None
+
+        else:
+
+            name, pre_val = metadata.split(' = ')
+            pre_val = pre_val.lstrip()
+            pre_val = pre_val.rstrip()
+            if np.sum([self.isnumeric(b) for b in pre_val.split(' ')]) > 0:
+
+                tmp = pre_val.split(' ')
+                value = tmp[0]
+                if self.isnumeric(value):
+
+                    value = float(value)
+                    if ut.isfloat(value):
+
+                        value = value
+
+                rest = None
+                if len(tmp) > 1:
+
+                    rest = tmp[1]
+                    for i in range(2, len(tmp)):
+
+                        rest = rest + tmp[i]
+
+                    rest = rest.lstrip()
+
+                uom = rest
+
+            else:
+
+                value = pre_val
+                uom = None
+
+        return name, value, uom
+
+    def read_metadata(self,raw_experimental_setting,reference_experimental_setting=None,reference_index=None):
         """
         Given a list of raw metadata, it produces a dictionary where all the information about the metadata are stored.
         The dictionary produced is organized as follow
@@ -156,70 +246,141 @@ class ExperimentalMetadataInspector():
         whole raw metadata line is saved in the final dictionary, but if reading fail nothing is saved.
 
         :param raw_experimental_setting: list of raw metadata as obtained by splitting on new line escape character of the exifread library
+        :param reference_experimental_setting: (optional) list of raw metadata of a reference image (e.g. the first
+                                               slice of a stack). If given, only the metadata whose raw line differs
+                                               from the one of the reference image are interpreted and returned.
+        :param reference_index: (optional) the reference metadata already indexed with '_index_lines' (i.e. the tuple
+                                of their cleaned lines and of their index). It can be given instead of
+                                'reference_experimental_setting', so that the reference is indexed only once when the
+                                metadata of many images are compared with it (also from several threads).
 
         :return: The experimental metadata.
         """
-        raw_experimental_setting = list(map(self.clean_line, raw_experimental_setting))
+        lines,line_index = self._index_lines(raw_experimental_setting)
+        if reference_index is None and reference_experimental_setting is not None:
+
+            reference_index = self._index_lines(reference_experimental_setting)
+
+        reference_lines,reference_line_index = None,None
+        if reference_index is not None:
+
+            reference_lines,reference_line_index = reference_index
+
         experimental_setting = {}
         for tag in self.TAGS:
 
-            try:
+            tag_pos = line_index.get(tag)
+            if tag_pos is None:
+
+                continue
+
+            if not tag in self.available_TAGS:
 
-                tag_pos = raw_experimental_setting.index(tag)
                 self.available_TAGS.append(tag)
-                try:
 
-                    metadata = raw_experimental_setting[tag_pos + 1]
+            try:
 
-                except:
+                metadata = lines[tag_pos + 1]
 
-                    metadata = 'Nothing found'
+            except IndexError:
 
-                if metadata.find(' = ') == -1:
+                metadata = 'Nothing found'
 
-                    name = 'Value interpretation failed: whole content saved in \'value\' field.'
-                    value = metadata
+            if reference_line_index is not None and tag in reference_line_index:
 
-                else:
+                reference_pos = reference_line_index[tag]+1
+                if reference_pos < len(reference_lines) and reference_lines[reference_pos] == metadata:
+
+                    continue
+
+            try:
+
+                name, value, uom = self._interpret_metadata(metadata)
 
-                    name, pre_val = metadata.split(' = ')
-                    pre_val = pre_val.lstrip()
-                    pre_val = pre_val.rstrip()
-                    if np.sum([self.isnumeric(b) for b in pre_val.split(' ')]) > 0:
+            except:
+
+                continue
 
-                        tmp = pre_val.split(' ')
-                        value = tmp[0]
-                        if self.isnumeric(value):
+            experimental_setting.update({tag: {'name': name, 'value': value, 'uom': uom}})
 
-                            value = float(value)
-                            if ut.isfloat(value):
+        return experimental_setting
 
-                                value = value
+class _ConvertedStackData():
+    """
+    Core class. Read-only array-like wrapper of the data of a stack, converting (and eventually rescaling) them to a
+    given data type only when a part of them is requested. Used to save a stack in a different data type: the writers
+    read the data slice by slice (or chunk by chunk), so that no converted copy of the whole stack is ever created.
+    """
 
-                        rest = None
-                        if len(tmp) > 1:
+    def __init__(self,data,data_type,minimum=None,maximum=None,scaling_factor=None):
+        """
+        :param data: (ndarray) data to convert.
+        :param data_type: data type of the converted data.
+        :param minimum: (float or None) value mapped to 0 when the data are rescaled. If None, no rescaling is done.
+        :param maximum: (float or None) value mapped to 'scaling_factor' when the data are rescaled.
+        :param scaling_factor: (float or None) factor used to rescale the data.
+        """
+        self.data = data
+        self.dtype = np.dtype(data_type)
+        self.shape = data.shape
+        self.ndim = data.ndim
+        self.minimum = minimum
+        self.maximum = maximum
+        self.scaling_factor = scaling_factor
 
-                            rest = tmp[1]
-                            for i in range(2, len(tmp)):
+    def __len__(self):
 
-                                rest = rest + tmp[i]
+        return self.shape[0]
 
-                            rest = rest.lstrip()
+    def __getitem__(self,item):
 
-                        uom = rest
+        block = self.data[item]
+        if self.minimum is not None:
 
-                    else:
+            block = (block-self.minimum)/(self.maximum-self.minimum)
+            block = block*self.scaling_factor
 
-                        value = pre_val
-                        uom = None
+        return np.asarray(block).astype(self.dtype)
 
-                experimental_setting.update({tag: {'name': name, 'value': value, 'uom': uom}})
+    def __iter__(self):
 
-            except:
+        for z in range(len(self)):
 
-                continue
+            yield self[z]
 
-        return experimental_setting
+    def __array__(self,dtype=None):
+
+        return self[...] if dtype is None else self[...].astype(dtype)
+
+class StackSlab():
+    """
+    Class representing a z-slab (or a tile of it) of a stack, as produced by 'Stack.slabs'. It contains a stack with
+    the slab plus its halo, and the information needed to write the result of the processing of the slab back in an
+    output stack without the halo (see 'Stack.write_slab').
+    """
+    __version__ = '0.1'
+
+    def __init__(self,stack,region,inner_region,full_shape):
+        """
+        :param stack: (bmiptools.stack.Stack) stack containing the slab and its halo.
+        :param region: (tuple of 3 slice) position of the slab (without halo) in the full stack.
+        :param inner_region: (tuple of 3 slice) position of the slab (without halo) in 'stack'.
+        :param full_shape: (tuple) shape of the full stack.
+        """
+        self.stack = stack
+        self.region = region
+        self.inner_region = inner_region
+        self.full_shape = tuple(full_shape)
+
+    def trim(self,arr):
+        """
+        Remove the halo from an array having the shape of the slab plus its halo (e.g. the result of the processing of
+        the slab).
+
+        :param arr: (ndarray) array to trim.
+        :return: (ndarray) the part of the array corresponding to the slab without halo.
+        """
+        return arr[self.inner_region]
 
 class Stack(CoreBasic):
     """
@@ -243,6 +404,12 @@ class Stack(CoreBasic):
     - _experimental_setting_tag_numbers: list of numbers containing the tag number of a TIFF file where the experimental
       metadata are stored (e.g. see https://www.awaresystems.be/imaging/tiff/tifftags.html).
 
+    - _experimental_setting_tag_names: names given by the exifread library to the tags in
+      '_experimental_setting_tag_numbers'.
+
+    - _FOLDER_READ_AHEAD: maximum number of files read in advance (and waiting to be decoded) per decoding thread, when
+      a stack is loaded from a folder with multiprocessing enabled.
+
     """
     __version__ = '0.2'
     _FILE_FORMAT = 'TIF'
@@ -250,34 +417,69 @@ class Stack(CoreBasic):
     _CHANNEL_INTERPRETATION = 'ZYX(C)'
     _path_experimental_metadata_list = 'experimental_setting_metadata_tag_list.txt'
     _experimental_setting_tag_numbers = [34118]
+    _experimental_setting_tag_names = ['Image Tag {}'.format(hex(tag_number)) for tag_number in
+                                       _experimental_setting_tag_numbers]
+    _FOLDER_READ_AHEAD = 2
     _guipi_dictionary = {'path': GuiPI('path'),
                          'load_stack': GuiPI(bool,visible=False),
                          'from_folder': GuiPI(bool),
                          'load_metadata': GuiPI(bool),
                          'image_type': GuiPI('options',options=['FIB-SEM','others']),
                          'name': GuiPI(str),
-                         'loading_extension': GuiPI(str)}
+                         'loading_extension': GuiPI(str),
+                         'memory_map': GuiPI(bool),
+                         'grayscale_check_once': GuiPI(bool),
+                         'deduplicate_metadata': GuiPI(bool),
+                         'z_step': GuiPI(int,min=1),
+                         'fingerprint_on_loading': GuiPI(bool)}
     def __init__(self,path=None,load_stack=True,from_folder=True,load_metadata=True,image_type='FIB-SEM',
-                 name=None,loading_extension='tiff'):
+                 name=None,loading_extension='tiff',memory_map=False,grayscale_check_once=False,
+                 deduplicate_metadata=False,z_step=1,fingerprint_on_loading=False):
         """
         Stack initialization. A stack object can be initialized loading an actual file or left empty.
 
         :param path: (string) path to the stack to load. If 'None' an empty stack object is created.
         :param load_stack: (boolean) if True the stack at the path specified in the 'path' field will be loaded.
         :param from_folder: (boolean) if True the stack is assumed to be split in its slices in a folder whose path
-                            is specified in the 'path' field.
+                            is specified in the 'path' field. Chunked stores (see 'save') are recognized automatically.
         :param load_metadata: (boolean) if True also the metadata in the file, whose path is specified in the 'path'
                               field, will be loaded.
         :param image_type: NOT USED
         :param name: (string, optional) name of the stack.
         :param loading_extension: (string) extension of the file which are loaded.
+        :param memory_map: (boolean) if True the stack data are not kept in RAM but in a memory-mapped file, so that
+                           only the parts of the stack actually accessed are read from the disk. When the file loaded
+                           is memory-mappable (i.e. a '.npy' file or an uncompressed TIFF) it is mapped directly,
+                           otherwise its content is decoded in a temporary file in the bmiptools temporary folder.
+        :param grayscale_check_once: (boolean) if True, when a stack is loaded from a folder, only the first slice is
+                                     checked to decide if a multichannel image is actually a grayscale image, and the
+                                     result is used for all the slices. If False the check is done for each slice.
+        :param deduplicate_metadata: (boolean) if True, when a stack is loaded from a folder, the metadata of the first
+                                     slice are fully parsed, while for the other slices only the metadata which differ
+                                     from the ones of the first slice are parsed and stored in the metadata dictionary
+                                     of the stack (the full metadata of a slice are returned by 'slice_metadata').
+        :param z_step: (int) only one slice every 'z_step' slices of the stack at the path specified in the 'path' field
+                       is loaded. A stack loaded with z_step > 1 is a light version of the full stack, which can be used
+                       to fit a pipeline whose plugins use only a fraction of the slices (e.g. with 'fit_step' > 1).
+        :param fingerprint_on_loading: (boolean) if True, when a stack is loaded from a folder, the digest of each
+                                       slice is computed just after the slice is decoded, so that the fingerprint of
+                                       the stack (see 'fingerprint') is then obtained without reading the data again.
         """
         super(Stack,self).__init__()
         self._emi = ExperimentalMetadataInspector(bmiptools.__bmiptools_files_folder_path__+os.sep+Stack._path_experimental_metadata_list)
         self.name = name
         self.path = path
         self._loading_extension = loading_extension
+        self._from_folder = from_folder
         self.temporary_library_metadata = {}          # used to store useful information during transformation if needed
+        self.memory_map = memory_map
+        self.grayscale_check_once = grayscale_check_once
+        self._last_slice_is_grayscale = False          # result of the grayscale check on the last slice loaded
+        self.deduplicate_metadata = deduplicate_metadata
+        self.fingerprint_on_loading = fingerprint_on_loading
+        self._reference_experimental_index = None       # indexed metadata of the reference slice (see '_load_metadata')
+        self._reference_image_metadata = {}
+        self._memmap_path = None                      # path of the temporary memory-mapped file owned by the stack
 
         # stack main attributes
         self.data = None
@@ -289,27 +491,25 @@ class Stack(CoreBasic):
         self.data_type = None
         self.image_type = image_type
 
-        # statistics
-        self.stack_mean = 0
-        self.stack_std = 0
-        self.slices_means = 0
-        self.slices_stds = 0
-        self.min_stack = 0
-        self.max_stack = 0
-        self.min_slices = 0
-        self.max_slices = 0
+        # statistics (computed lazily, see '_compute_statistics') and slice digests (see 'fingerprint')
+        self._statistics = None
+        self._slice_digests = None
 
         # loading (eventually)
         self.load_metadata = load_metadata
         if path is not None:
 
-            if load_stack and not from_folder:
+            if load_stack and iout.is_chunked_store(path):
+
+                self.load_chunked_store(path,z_step=z_step)
+
+            elif load_stack and not from_folder:
 
-                self.load_stack(path)
+                self.load_stack(path,z_step=z_step)
 
             elif load_stack and from_folder:
 
-                self.load_stack_from_folder(path)
+                self.load_stack_from_folder(path,z_step=z_step)
 
             elif load_metadata:
 
@@ -344,35 +544,42 @@ class Stack(CoreBasic):
 
             return 0
 
+    def __getstate__(self):
+
+        # copies of the stack (e.g. the ones sent to the joblib workers) do not own the temporary memory-mapped file,
+        # so that it is not deleted when they are garbage collected.
+        state = self.__dict__.copy()
+        state['_memmap_path'] = None
+        return state
+
+    def __del__(self):
+
+        try:
+
+            self._release_memory_map()
+
+        except Exception:
+
+            pass
+
     # utility methods
     @staticmethod
-    def _is_grayscale(img):
+    def _is_grayscale(img,sampling_step=1):
         """
-        Core function. Check if a 2D image is grayscale or not.
+        Core function. Check if a 2D image is grayscale or not, i.e. if its (first three) color channels are equal.
+        The check is vectorized and done on the pixels of a regular grid with the sampling step specified.
 
         :param img: 2D numpy array to check.
+        :param sampling_step: (int) distance (in pixels) between two pixels checked along the x and y directions. For
+                              1 all the pixels of the image are checked.
         :return: True if the image is a grayscale image.
         """
-        test0 = img[0, 0]
-        if type(test0) == int:
-
-            test_result = True
+        if len(img.shape) < 3:
 
-        else:
-
-            n_pixels = img.shape[0] * img.shape[1]
-            n_px_to_check = np.minimum(int(n_pixels * 0.1),n_pixels)  # for each test 1% of the image pixels are
-                                                                      # randomly selected to verify the color type.
-            all_pixels = list(itertools.product(range(0, img.shape[0]), range(0, img.shape[1])))
-            random.shuffle(all_pixels)
-            pool = all_pixels[:n_px_to_check]
-            test_result = True
-            for px in pool:
+            return True
 
-                vals = img[px[0], px[1]]
-                test_result = test_result and (vals[0] == vals[1] == vals[2])
-
-        return test_result
+        sampled_img = img[::sampling_step,::sampling_step,:3]
+        return bool(np.all(sampled_img == sampled_img[...,:1]))
 
     @staticmethod
     def _estimate_n_channels(data):
@@ -392,59 +599,126 @@ class Stack(CoreBasic):
             return 1
 
     # statistics methods
+    @property
+    def data(self):
+
+        return self._data
+
+    @data.setter
+    def data(self,value):
+
+        self._data = value
+        self._statistics = None
+        self._slice_digests = None
+
     def _update_statistics(self):
         """
-        Core function. Compute basic useful statistics on the stack.
-        """
-        if self.n_channels > 1:
-
-            stack_mean = []
-            stack_std = []
-            slices_means = []
-            slices_stds = []
-            max_stack = []
-            min_stack = []
-            max_slices = []
-            min_slices = []
-            for C in range(self.n_channels):
-
-                stack_mean.append( self.data[...,C].mean() )
-                stack_std.append( self.data[...,C].std() )
-                slices_means.append( np.mean(self.data[...,C],axis=tuple(range(1,len(self.data[...,C].shape[1:])+1))) )
-                slices_stds.append( np.std(self.data[...,C],axis=tuple(range(1,len(self.data[...,C].shape[1:])+1))) )
-                max_stack.append( np.max(self.data[...,C]) )
-                min_stack.append( np.min(self.data[...,C]) )
-                max_slices.append( np.max(self.data[...,C],axis=tuple(range(1,len(self.data[...,C].shape[1:])+1))) )
-                min_slices.append( np.min(self.data[...,C],axis=tuple(range(1,len(self.data[...,C].shape[1:])+1))) )
-
-            stack_mean = np.array(stack_mean)
-            stack_std = np.array(stack_std)
-            slices_means = np.array(slices_means)
-            slices_stds = np.array(slices_stds)
-            max_stack = np.array(max_stack)
-            min_stack = np.array(min_stack)
-            max_slices = np.array(max_slices)
-            min_slices = np.array(min_slices)
+        Core function. Mark the statistics (and the fingerprint) of the stack as outdated. They are recomputed (see
+        '_compute_statistics' and 'fingerprint') only when they are accessed for the first time, and then cached until
+        the stack data change. Assigning a new 'data' attribute marks the statistics as outdated automatically, while
+        this function has to be called after in-place modifications of the data.
+        """
+        self._statistics = None
+        self._slice_digests = None
+
+    def _compute_statistics(self):
+        """
+        Core function. Compute basic useful statistics on the stack in a single blockwise pass over the slices: mean,
+        variance, minimum and maximum of each slice (and channel) are computed while the slice is in cache, and the
+        statistics of the whole stack are obtained combining them. No temporary array having the size of the whole
+        stack is created. When multiprocessing is enabled the slices are processed in parallel by a pool of threads.
+
+        :return: (dict) the statistics of the stack (see 'statistics').
+        """
+        if self.data is None:
+
+            return {'stack_mean': 0,'stack_std': 0,'slices_means': 0,'slices_stds': 0,
+                    'min_stack': 0,'max_stack': 0,'min_slices': 0,'max_slices': 0}
+
+        axis = (0,1)                                    # y and x axis of a slice (channels are kept separated)
+        def slices_statistics(z_list):
+
+            block_statistics = []
+            for z in z_list:
+
+                slice = np.asarray(self.data[z,...])
+                block_statistics.append( (np.mean(slice,axis=axis),np.var(slice,axis=axis),
+                                          np.max(slice,axis=axis),np.min(slice,axis=axis)) )
+
+            return block_statistics
+
+        n_blocks = 1
+        if self._use_multiprocessing:
+
+            n_blocks = max(1,min(self._n_available_cpu,self.data.shape[0]))
+
+        blocks = np.array_split(np.arange(self.data.shape[0]),n_blocks)
+        if n_blocks > 1:
+
+            results = Parallel(n_jobs=n_blocks,prefer='threads')(delayed(slices_statistics)(block) for block in blocks)
 
         else:
 
-            stack_mean = self.data.mean()
-            stack_std = self.data.std()
-            slices_means = np.mean(self.data,axis=tuple(range(1,len(self.data.shape[1:])+1)))
-            slices_stds = np.std(self.data,axis=tuple(range(1,len(self.data.shape[1:])+1)))
-            max_stack = np.max(self.data)
-            min_stack = np.min(self.data)
-            max_slices = np.max(self.data,axis=tuple(range(1,len(self.data.shape[1:])+1)))
-            min_slices = np.min(self.data,axis=tuple(range(1,len(self.data.shape[1:])+1)))
-
-        self.stack_mean = stack_mean
-        self.stack_std = stack_std
-        self.slices_means = slices_means
-        self.slices_stds = slices_stds
-        self.max_stack = max_stack
-        self.min_stack = min_stack
-        self.max_slices = max_slices
-        self.min_slices = min_slices
+            results = [slices_statistics(block) for block in blocks]
+
+        slices_means,slices_vars,max_slices,min_slices = [np.array(stat) for stat in
+                                                          zip(*[stat for block in results for stat in block])]
+
+        # the slices have all the same size: the stack variance is the mean of the slice variances plus the variance
+        # of the slice means
+        return {'stack_mean': np.mean(slices_means,axis=0),
+                'stack_std': np.sqrt(np.mean(slices_vars,axis=0)+np.var(slices_means,axis=0)),
+                'slices_means': slices_means.T,
+                'slices_stds': np.sqrt(slices_vars).T,
+                'min_stack': np.min(min_slices,axis=0),
+                'max_stack': np.max(max_slices,axis=0),
+                'min_slices': min_slices.T,
+                'max_slices': max_slices.T}
+
+    @staticmethod
+    def _combine_statistics(statistics_list):
+        """
+        Core function. Combine the statistics of consecutive parts of a stack (e.g. of its slabs) in the statistics of
+        the whole stack, in the same way the statistics of the slices are combined in '_compute_statistics'.
+
+        :param statistics_list: (list of dict) statistics of the parts of the stack, ordered along the z axis (see
+                                'statistics').
+        :return: (dict) the statistics of the whole stack.
+        """
+        slices_means,slices_stds,min_slices,max_slices = [np.concatenate([np.asarray(statistics[name]) for statistics
+                                                                          in statistics_list],axis=-1)
+                                                          for name in ['slices_means','slices_stds','min_slices',
+                                                                       'max_slices']]
+        return {'stack_mean': np.mean(slices_means,axis=-1),
+                'stack_std': np.sqrt(np.mean(slices_stds**2,axis=-1)+np.var(slices_means,axis=-1)),
+                'slices_means': slices_means,
+                'slices_stds': slices_stds,
+                'min_stack': np.min(min_slices,axis=-1),
+                'max_stack': np.max(max_slices,axis=-1),
+                'min_slices': min_slices,
+                'max_slices': max_slices}
+
+    def _get_statistic(self,name):
+        """
+        Core function. Return a statistic of the stack, computing all the statistics if they are outdated.
+
+        :param name: (str) name of the statistic (see 'statistics').
+        :return: the statistic requested.
+        """
+        if self._statistics is None:
+
+            self._statistics = self._compute_statistics()
+
+        return self._statistics[name]
+
+    stack_mean = property(lambda self: self._get_statistic('stack_mean'))
+    stack_std = property(lambda self: self._get_statistic('stack_std'))
+    slices_means = property(lambda self: self._get_statistic('slices_means'))
+    slices_stds = property(lambda self: self._get_statistic('slices_stds'))
+    min_stack = property(lambda self: self._get_statistic('min_stack'))
+    max_stack = property(lambda self: self._get_statistic('max_stack'))
+    min_slices = property(lambda self: self._get_statistic('min_slices'))
+    max_slices = property(lambda self: self._get_statistic('max_slices'))
 
     def statistics(self):
         """
@@ -461,62 +735,260 @@ class Stack(CoreBasic):
 
         :return: dictionary of basic statistics on the stack.
         """
-        return {'stack_mean': self.stack_mean,
-                'stack_std': self.stack_std,
-                'slices_means': self.slices_means,
-                'slices_stds': self.slices_stds,
-                'min_stack': self.min_stack,
-                'max_stack': self.max_stack,
-                'min_slices': self.min_slices,
-                'max_slices': self.max_slices}
+        self._get_statistic('stack_mean')
+        return dict(self._statistics)
 
-    def get_dimension_in_RAM(self):
+    def fingerprint(self,changed_slices=None):
         """
-        Compute the dimension of the stack data in RAM.
+        Compute the fingerprint of the stack content, i.e. a hash of the stack data which can be used as identity of
+        the stack content (e.g. to key caches). The data are hashed slice by slice (in parallel, using a pool of threads,
+        when multiprocessing is enabled) and the digests of the slices are combined in the fingerprint (see
+        'bmiptools.core.io_utils.combine_digests'). The digests of the slices are cached until the data change, so that
+        after the modification of few slices only the digests of the slices modified have to be recomputed.
+
+        :param changed_slices: (list of int or None) slices modified in-place since the last time the fingerprint was
+                               computed, whose digests are recomputed.
+        :return: (str or None) the fingerprint of the stack (None for empty stacks).
+        """
+        if self.data is None:
+
+            return None
+
+        n_slices = self.data.shape[0]
+        if self._slice_digests is None or len(self._slice_digests) != n_slices:
+
+            self._slice_digests = [None]*n_slices
 
-        :return: stack data dimension in RAM
+        if changed_slices is not None:
+
+            for n in changed_slices:
+
+                self._slice_digests[n] = None
+
+        slices_to_hash = [n for n in range(n_slices) if self._slice_digests[n] is None]
+        if self._use_multiprocessing and len(slices_to_hash) > 1:
+
+            digests = Parallel(n_jobs=self._n_available_cpu,prefer='threads')(delayed(iout.slice_digest)(self.data[n])
+                                                                             for n in slices_to_hash)
+
+        else:
+
+            digests = [iout.slice_digest(self.data[n]) for n in slices_to_hash]
+
+        for n,digest in zip(slices_to_hash,digests):
+
+            self._slice_digests[n] = digest
+
+        return iout.combine_digests(self.data.shape,self.data.dtype,self._slice_digests)
+
+    def get_dimension_in_RAM(self):
         """
-        order_list = np.array([0, 3, 6, 9, 12])
-        order_name = ['B', 'kB', 'MB', 'GB', 'TB']
+        Compute the dimension of the stack data in RAM. To estimate the memory needed to process the stack with a
+        pipeline, use the 'plan_memory' method of the Pipeline class.
 
+        :return: (int) stack data dimension in RAM (in bytes).
+        """
         if self.data is not None:
 
             size_in_RAM_bytes = self.data.size * self.data.itemsize
-            order = np.floor(np.log10(size_in_RAM_bytes))
-            pos = np.where(order - order_list > 0)
-            pos = pos[0][-1]
-            uom = order_name[pos]
-            val = np.around(size_in_RAM_bytes /10 ** order_list[pos], 2)
-            printable_size_in_RAM = '{} {}'.format(val,uom)
-            print(printable_size_in_RAM)
+            print(ut.printable_size(size_in_RAM_bytes))
+            return size_in_RAM_bytes
+
+    # memory-map methods
+    def _new_memory_map(self,shape,dtype):
+        """
+        Core function. Create a new temporary memory-mapped file in the bmiptools temporary folder.
+
+        :param shape: (tuple) shape of the memory-mapped array.
+        :param dtype: data type of the memory-mapped array.
+        :return: (str, numpy.memmap) path of the temporary file and the memory-mapped array.
+        """
+        memmap_path = bmiptools.__temporary_files_folder_path__+os.sep+'stack__{}.npy'.format(uuid.uuid4().hex)
+        memmap = np.lib.format.open_memmap(memmap_path,mode='w+',dtype=dtype,shape=tuple(shape))
+        return memmap_path,memmap
+
+    def _to_memory_map(self,arr,slice_list=None):
+        """
+        Core function. Copy an array in a new temporary memory-mapped file, which replace the one currently owned by
+        the stack (if any). The copy is done slice by slice, so that 'arr' can be itself a memory-mapped array (or a
+        view of it) without loading it completely in RAM.
+
+        :param arr: (ndarray) array to store in the memory-mapped file.
+        :param slice_list: (optional) list of the slices of 'arr' to copy. If nothing is specified all the slices are
+                           copied.
+        :return: (numpy.memmap) the memory-mapped array.
+        """
+        if slice_list is None:
+
+            slice_list = range(arr.shape[0])
+
+        memmap_path,memmap = self._new_memory_map((len(slice_list),)+arr.shape[1:],arr.dtype)
+        for z,i in enumerate(slice_list):
+
+            memmap[z,...] = arr[i,...]
+
+        memmap.flush()
+        self._release_memory_map()
+        self._memmap_path = memmap_path
+        return memmap
+
+    def _release_memory_map(self):
+        """
+        Core function. Delete the temporary memory-mapped file owned by the stack (if any).
+        """
+        if self._memmap_path is not None:
+
+            memmap_path = self._memmap_path
+            self._memmap_path = None
+            try:
+
+                os.remove(memmap_path)
+
+            except OSError:
+
+                warnings.warn('The temporary memory-mapped file {} could not be deleted. It can be removed manually '
+                              'from the bmiptools temporary folder.'.format(memmap_path))
+
+    @staticmethod
+    def _map_tiff_pages(path,tif):
+        """
+        Core function. Map the pages of a TIFF file in a single ZYX(C) array without reading them. This is possible
+        only if all the pages are uncompressed, have the same shape and data type, and are equally spaced in the file
+        (which is the case for TIFF files written page by page, as done by bmiptools).
+
+        :param path: (string) path to the TIFF file.
+        :param tif: (tifffile.TiffFile) the opened TIFF file.
+        :return: (ndarray or None) the array mapping the TIFF pages (opened in copy-on-write mode), or None if the pages
+                 cannot be mapped.
+        """
+        pages = [tif.pages[i] for i in range(len(tif.pages))]
+        first_page = pages[0]
+        offsets = []
+        for page in pages:
+
+            if not page.is_memmappable or page.planarconfig != 1 or page.shape != first_page.shape or \
+                    page.dtype != first_page.dtype:
+
+                return None
+
+            offsets.append(page.dataoffsets[0])
+
+        page_stride = 0
+        if len(offsets) > 1:
+
+            page_stride = offsets[1]-offsets[0]
+            if np.any(np.diff(offsets) != page_stride):
+
+                return None
+
+        dtype = np.dtype(first_page.dtype).newbyteorder(tif.byteorder)
+        page_strides = np.empty(first_page.shape,dtype=dtype).strides
+        file_map = np.memmap(path,dtype=np.uint8,mode='c')
+        return np.ndarray(shape=(len(pages),)+first_page.shape,dtype=dtype,buffer=file_map,offset=offsets[0],
+                          strides=(page_stride,)+page_strides)
+
+    def _load_memory_mapped(self,path,slice_list=None,z_range=None,y_range=None,x_range=None,z_step=1):
+        """
+        Core loading function for memory-mapped stacks. The file is mapped directly when possible (i.e. for '.npy'
+        files and uncompressed TIFF files whose pages are contiguous on the disk), otherwise it is decoded slice by slice
+        in a temporary memory-mapped file. Direct mappings are opened in copy-on-write mode: the original file is never
+        modified. When a region (or a list of slices) is specified, only the region is copied from a direct mapping,
+        while for the other files only the selected pages are decoded, each one cropped immediately after decoding.
+
+        :param path: (string) path to the stack to open.
+        :param slice_list: (list of int or None) slices to load. If given, 'z_range' and 'z_step' are ignored.
+        :param z_range: (list of two int or None) range along the z axis of the region to load.
+        :param y_range: (list of two int or None) range along the y axis of the region to load.
+        :param x_range: (list of two int or None) range along the x axis of the region to load.
+        :param z_step: (int) only one slice every 'z_step' slices of the region is loaded.
+        :return: (numpy.memmap) the data loaded.
+        """
+        is_region = slice_list is not None or z_range is not None or y_range is not None or x_range is not None or \
+                    z_step > 1
+        if path.endswith('.npy'):
+
+            data = np.load(path,mmap_mode='c')
+            if len(data.shape) == 2:
+
+                data = np.expand_dims(data,axis=0)
+
+        else:
+
+            with tifffile.TiffFile(path) as tif:
+
+                n_pages = len(tif.pages)
+                data = self._map_tiff_pages(path,tif)
+                if data is None:                        # not memory-mappable: decode it in a temporary file
+
+                    if slice_list is None:
+
+                        z_start,z_stop = iout.range_to_slice(z_range,n_pages)
+                        slice_list = range(z_start,z_stop,z_step)
+
+                    first_slice = iout.read_tiff_page_region(path,tif.pages[slice_list[0]],y_range,x_range)
+                    memmap_path,data = self._new_memory_map((len(slice_list),)+first_slice.shape,first_slice.dtype)
+                    data[0,...] = first_slice
+                    for z,i in enumerate(slice_list[1:],1):
+
+                        data[z,...] = iout.read_tiff_page_region(path,tif.pages[i],y_range,x_range)
+
+                    data.flush()
+                    self._release_memory_map()
+                    self._memmap_path = memmap_path
+                    is_region = False                   # only the region has been decoded
+
+        if is_region:
+
+            region = iout.region_slices(data.shape,z_range,y_range,x_range)
+            if slice_list is None:
+
+                slice_list = range(region[0].start,region[0].stop,z_step)
+
+            data = self._to_memory_map(data[(slice(None),)+region[1:]],slice_list=slice_list)
+
+        self.n_slices = data.shape[0]
+        self.n_channels = self._estimate_n_channels(data[0,...])
+        if self.n_channels > 1 and self._is_grayscale(data[0,...]):
+
+            self.n_channels = 1
+            data = data[...,0]
+
+        return data
 
     # input methods
-    def _load_metadata(self,path):
+    def _load_metadata(self,path,raw=None,only_changes=False):
         """
         Load metadata of a given TIFF image.
 
         :param path: (str) path to the TIFF image from which the metadata have to be loaded.
+        :param raw: (bytes, optional) content of the TIFF image, when it has been already read. If given, the file is
+                    not read again.
+        :param only_changes: (boolean) if True only the metadata which differ from the ones of the last image loaded with
+                             'only_changes = False' (the reference image) are returned. Otherwise all the metadata are
+                             returned and the image becomes the reference image.
         :return: image metadata dictionary and experimental metadata dictionary.
         """
-        with open(path, 'rb') as f:
+        if raw is not None:
+
+            tags = exifread.process_file(io.BytesIO(raw))
+
+        else:
+
+            with open(path, 'rb') as f:
 
-            tags = exifread.process_file(f)
+                tags = exifread.process_file(f)
 
-        experimental_setting_tag_name = ['Image Tag {}'.format(hex(tag_number)) for tag_number in
-                                         Stack._experimental_setting_tag_numbers]
         image_metadata = {}
         experimental_metadata = {}
+        raw_experimental_setting = None
         for key in tags.keys():
 
             content = tags[key]
-            if not key in experimental_setting_tag_name:
+            if not key in Stack._experimental_setting_tag_names:
 
                 try:
 
-                    callback = lambda pat: pat.group(0).lower()
-                    tmp = re.sub(r'([A-Z]){4}', callback, TAGS[content.tag])
-                    callback2 = lambda pat: '_' + pat.group(1).lower()
-                    key = re.sub(r'([A-Z])', callback2, tmp)
+                    key = _image_metadata_key(TAGS[content.tag])
 
                 except:
 
@@ -527,16 +999,71 @@ class Stack(CoreBasic):
                     value = value[0]
                 else:
                     value = None
-                if key[0] == '_': key = key[1:]
                 image_metadata.update({key: value})
 
             else:
 
                 raw_experimental_setting = str(content.values, 'ascii', 'ignore').split('\n')
-                experimental_metadata = self._emi.read_metadata(raw_experimental_setting)
+                if only_changes:
+
+                    experimental_metadata = self._emi.read_metadata(raw_experimental_setting,
+                                                                    reference_index=self._reference_experimental_index)
+
+                else:
+
+                    experimental_metadata = self._emi.read_metadata(raw_experimental_setting)
+
+        if only_changes:                                # values compared as strings (exifread Ratio may lack __eq__)
+
+            reference = self._reference_image_metadata
+            image_metadata = {key: value for key,value in image_metadata.items()
+                              if not key in reference or str(value) != str(reference[key])}
+
+        else:
+
+            self._reference_experimental_index = None   # indexed once here, not in the threads comparing with it
+            if raw_experimental_setting is not None:
+
+                self._reference_experimental_index = self._emi._index_lines(raw_experimental_setting)
+
+            self._reference_image_metadata = image_metadata
 
         return image_metadata, experimental_metadata
 
+    def _load_slice_metadata(self,n,slice_path,raw=None):
+        """
+        Core function. Load the metadata of the n-th slice of a stack loaded from a folder. When 'deduplicate_metadata'
+        is True, the metadata of the first slice (n = 0) are fully parsed, while for the other slices only the
+        metadata which differ from the ones of the first slice are parsed and returned. The first slice has to be loaded
+        before the others.
+
+        :param n: (int) position of the slice in the stack.
+        :param slice_path: (str) path to the slice.
+        :param raw: (bytes, optional) content of the slice file, when it has been already read.
+        :return: image metadata dictionary and experimental metadata dictionary of the slice.
+        """
+        return self._load_metadata(slice_path,raw=raw,only_changes=self.deduplicate_metadata and n > 0)
+
+    def slice_metadata(self,n):
+        """
+        Return the full image and experimental metadata of the n-th slice of a stack loaded from a folder, also when
+        the metadata have been deduplicated during loading (see 'deduplicate_metadata').
+
+        :param n: (int) position of the slice in the stack.
+        :return: image metadata dictionary and experimental metadata dictionary of the slice.
+        """
+        metadata = []
+        for metadata_type in ['image_metadata','experimental_metadata']:
+
+            slice_metadata = dict(self.metadata[metadata_type]['slice_{}'.format(n)])
+            if self.deduplicate_metadata and n > 0:
+
+                slice_metadata = {**self.metadata[metadata_type]['slice_0'],**slice_metadata}
+
+            metadata.append(slice_metadata)
+
+        return metadata[0], metadata[1]
+
     def add_metadata(self,metadata_type,content):
         """
         Add some content to the metadata dictionary of the stack. If the stack has no metadata dictionary it is
@@ -554,105 +1081,186 @@ class Stack(CoreBasic):
 
         self.metadata.update({metadata_type: content})
 
-    def _load(self,path,slice_list = None):
+    def _load(self,path,slice_list = None,isgray = None,z_range = None,y_range = None,x_range = None,z_step = 1):
         """
         Core loading function. This function load a stack or a list of slices of it and compute/produce the first basic
-        stack attribute.
+        stack attribute. The shape and the data type of the stack are probed from the first slice loaded, the array
+        containing the whole stack is allocated once, and each slice is decoded directly in its position.
 
         :param path: (string) path to the stack to open.
         :param slice_list: (optional) list of slice of the stack to load. If nothing is specified the whole stack is
                            loaded.
+        :param isgray: (optional) if True (False) multichannel images are assumed to be (not to be) grayscale images.
+                       If nothing is specified, the first slice loaded is checked.
+        :param z_range: (optional) range along the z axis of the slices to load (numpy-like convention, e.g. [20,None]
+                        to indicate x[20:]). Used only if no slice_list is specified.
+        :param y_range: (optional) range along the y axis of the region of each slice to load.
+        :param x_range: (optional) range along the x axis of the region of each slice to load.
+        :param z_step: (optional) only one slice every 'z_step' slices of 'z_range' is loaded. Used only if no
+                       slice_list is specified.
         :return: (ndarray) the data loaded.
+
+        NOTE: when multiprocessing is enabled or a region of the slices is requested, the pages of TIFF files are
+        decoded with tifffile (see '_decode_tiff_pages'). Multiprocessing is done with a pool of threads (each one with
+        its own file handle), while for regions only the rows needed are read when the pages are uncompressed.
         """
         reader = imageio.get_reader(path,
                                     format=Stack._FILE_FORMAT,
                                     mode=Stack._LOADING_MODE)
         if slice_list is None:
 
-            self.n_slices = reader.get_length()
-            slice_list = range(self.n_slices)
+            slice_list = range(*iout.range_to_slice(z_range,reader.get_length()),z_step)
+
+        self.n_slices = len(slice_list)
+        read_region = y_range is not None or x_range is not None
+        if read_region:
+
+            with tifffile.TiffFile(path) as tif:
+
+                first_slice = iout.read_tiff_page_region(path,tif.pages[slice_list[0]],y_range,x_range)
 
         else:
 
-            self.n_slices = len(slice_list)
+            first_slice = np.array(reader.get_data(slice_list[0]))
 
-        if (slice_list is not None) and (self.n_slices == 1):
+        self.n_channels = self._estimate_n_channels(first_slice)
+        if self.n_channels == 1:
 
-            data = np.array(reader.get_data(0))
-            self.n_channels = self._estimate_n_channels(data)
             isgray = False
-            if self.n_channels > 1:
 
-                isgray = self._is_grayscale(data)
-
-            if isgray:
+        elif isgray is None:
 
-                self.n_channels = 1
-                data = data[:,:,0]
+            isgray = self._is_grayscale(first_slice)
 
-            data = np.expand_dims(data,axis=-1)
+        self._last_slice_is_grayscale = isgray
+        if isgray:
 
-        else:
+            self.n_channels = 1
+            first_slice = first_slice[:,:,0]
 
-            data = np.array(reader.get_data(slice_list[0]))
-            self.n_channels = self._estimate_n_channels(data)
-            isgray = False
-            if self.n_channels > 1:
+        data = np.empty((self.n_slices,)+first_slice.shape,dtype=first_slice.dtype)
+        data[0,...] = first_slice
+        if self._use_multiprocessing and self.n_slices > 2:
 
-                isgray = self._is_grayscale(data)
+            reader.close()
+            blocks = np.array_split(np.arange(1,self.n_slices),min(self._n_available_cpu,self.n_slices-1))
+            Parallel(n_jobs=len(blocks),prefer='threads')(
+                delayed(self._decode_tiff_pages)(path,[slice_list[n] for n in block],data[block[0]:block[-1]+1],isgray,
+                                                 y_range,x_range)
+                for block in blocks)
+            return data
 
-            if isgray:
+        if read_region:
 
-                self.n_channels = 1
-                data = data[:,:,0]
+            reader.close()
+            self._decode_tiff_pages(path,slice_list[1:],data[1:],isgray,y_range,x_range)
+            return data
 
-            data = np.expand_dims(data,axis=-1)
-            for i in slice_list[1:]:
+        for n,i in enumerate(slice_list[1:]):
 
-                slice = np.array(reader.get_data(i))
-                if isgray:
+            slice = reader.get_data(i)
+            if isgray:
 
-                    slice = slice[:,:,0]
+                slice = slice[:,:,0]
 
-                slice = np.expand_dims(slice, axis=-1)
-                data = np.concatenate([data, slice], axis=-1)
+            data[n+1,...] = slice
 
-        data = data.transpose(tuple([len(data.shape)-1]+[i for i in range(len(data.shape)-1)]))
+        reader.close()
         return data
 
-    def load_stack(self,path):
+    @staticmethod
+    def _decode_tiff_pages(path,page_list,out,isgray,y_range=None,x_range=None):
         """
-        Load a stack (all), compute/produce basic stack attributes, compute stack statistics and eventually load the
-        stack metadata.
+        Core function. Decode some pages of a multipage TIFF file (or a region of them) directly in a preallocated
+        array. The file is opened with its own file handle, so that different pages of the same file can be decoded
+        concurrently by different threads.
+
+        :param path: (string) path to the TIFF file.
+        :param page_list: (list of int) list of the pages to decode.
+        :param out: (ndarray) array in which the pages are decoded (the n-th page of the list goes in out[n]).
+        :param isgray: (boolean) if True only the first channel of the pages is kept.
+        :param y_range: (optional) range along the y axis of the region of each page to decode (numpy-like convention).
+        :param x_range: (optional) range along the x axis of the region of each page to decode.
+        """
+        with tifffile.TiffFile(path) as tif:
+
+            for n,i in enumerate(page_list):
+
+                page = iout.read_tiff_page_region(path,tif.pages[i],y_range,x_range)
+                if isgray:
+
+                    page = page[...,0]
+
+                out[n,...] = page
 
-        :param path: (string) path to the stack to load.
+    def load_stack(self,path,z_range=None,y_range=None,x_range=None,z_step=1):
         """
-        self.data = self._load(path)
+        Load a stack (all, or a region of it), compute/produce basic stack attributes, compute stack statistics and
+        eventually load the stack metadata. When a region is specified, only the region is kept in memory: where the
+        file format allows it only the region is read, otherwise each slice is cropped immediately after decoding.
+        With 'z_step' > 1 only one slice every 'z_step' slices is read (e.g. to get a light stack to fit a pipeline).
+
+        :param path: (string) path to the stack to load. HDF5 files (see 'load_hdf5') can be loaded too, while for
+                     memory-mapped stacks also '.npy' files can be loaded.
+        :param z_range: (list of two int or None) range along the z axis of the region to load. Numpy-like instructions
+                        can be used (e.g. [20,None] to indicate x[20:]). If None, the whole axis is loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region to load.
+        :param x_range: (list of two int or None) range along the x axis of the region to load.
+        :param z_step: (int) only one slice every 'z_step' slices of the region is loaded.
+        """
+        if iout.is_hdf5(path):
+
+            self.load_hdf5(path,z_range=z_range,y_range=y_range,x_range=x_range,z_step=z_step)
+            return
+
+        if self.memory_map:
+
+            self.data = self._load_memory_mapped(path,z_range=z_range,y_range=y_range,x_range=x_range,z_step=z_step)
+
+        else:
+
+            self.data = self._load(path,z_range=z_range,y_range=y_range,x_range=x_range,z_step=z_step)
+
         self.shape = self.data.shape
         self.yx_shape = self.data.shape[1:3]
         self.data_type = self.data.dtype
         self._update_statistics()
-        if self.load_metadata:
+        if self.load_metadata and not path.endswith('.npy'):
 
             image_metadata, experimental_metadata = self._load_metadata(path)
             self.metadata = {'image_metadata': image_metadata,
                              'experimental_metadata': experimental_metadata,
                              'image_processing_metadata': None}
 
-    def load_slices(self,path,S):
+    def load_slices(self,path,S,y_range=None,x_range=None):
         """
-        Load only certain slices from a given stack, and based on what is loaded, it compute/produce basic stack
-        attributes, compute stack statistics and eventually load the stack metadata.
+        Load only certain slices (or a region of them) from a given stack, and based on what is loaded, it
+        compute/produce basic stack attributes, compute stack statistics and eventually load the stack metadata.
 
         :param path: (str) path to the stack to load;
-        :param S: (list of int) list of slices to load.
+        :param S: (list of int) list of slices to load;
+        :param y_range: (list of two int or None) range along the y axis of the region of the slices to load. Numpy-like
+                        instructions can be used (e.g. [20,None] to indicate x[20:]). If None, the whole axis is loaded.
+        :param x_range: (list of two int or None) range along the x axis of the region of the slices to load.
         """
-        self.data = self._load(path,slice_list = S)
+        if iout.is_hdf5(path):
+
+            self.load_hdf5(path,S,y_range=y_range,x_range=x_range)
+            return
+
+        if self.memory_map:
+
+            self.data = self._load_memory_mapped(path,slice_list=S,y_range=y_range,x_range=x_range)
+
+        else:
+
+            self.data = self._load(path,slice_list = S,y_range=y_range,x_range=x_range)
+
         self.shape = self.data.shape
         self.yx_shape = self.data.shape[1:3]
         self.data_type = self.data.dtype
         self._update_statistics()
-        if self.load_metadata:
+        if self.load_metadata and not path.endswith('.npy'):
 
             image_metadata, experimental_metadata = self._load_metadata(path)
             self.metadata = {'image_metadata': image_metadata,
@@ -662,162 +1270,474 @@ class Stack(CoreBasic):
     def _sorted_read_path(self,path):
         """
         Sort file paths according to a given order, based on the actual convention adopted for a given image_type.
+        The folder index is cached, so that the folder is not listed again when it is unchanged (see
+        'bmiptools.core.io_utils.index_folder').
 
         :param path: (raw str) path of the folder containing the files written as raw string (i.e. r'YOUR PATH');
         :return: (list of str) sorted path.
         """
-        slice_paths = glob.glob(path + os.sep + '*.'+self._loading_extension)
-        if self.image_type == 'FIB-SEM':            # FIB-SEM name convention used at mpikg
-
-            slice_numbers = []
-            for path in slice_paths:
-
-                idx = path.find('slice')
-                sn = path[idx + len('slice_'):-len('.'+self._loading_extension)]
-                slice_numbers.append(int(sn))
+        folder_index = self._folder_index(path)
+        return [path+os.sep+name for name,_,_ in folder_index['files']]
 
-            sorted_slice_paths = list(zip(*sorted(zip(slice_numbers,slice_paths))))[1]
-
-        else:
-
-            sorted_slice_paths = sorted(slice_paths)
+    def _folder_index(self,path):
+        """
+        Core function. Return the (cached) index of a folder containing the slices of a stack.
 
-        return sorted_slice_paths
+        :param path: (raw str) path of the folder.
+        :return: (dict) the folder index (see 'bmiptools.core.io_utils.index_folder').
+        """
+        return iout.index_folder(path,self._loading_extension,self.image_type,
+                                 cache_folder=bmiptools.__folder_index_cache_path__)
 
-    def load_slices_from_folder(self,path,S):
+    def load_slices_from_folder(self,path,S,y_range=None,x_range=None):
         """
-        Load only certain slices from a folder containing a stack (where slices are split as single 2D images),
-        and based on what is loaded, it compute/produce basic stack attributes, compute stack statistics and eventually
-        load the stack metadata (if each slice has its own metadata, all this metadata are added in the metadata
-        dictionary of the stack). The slices are read in alphabetic order and selected according to that order.
+        Load only certain slices (or a region of them) from a folder containing a stack (where slices are split as
+        single 2D images), and based on what is loaded, it compute/produce basic stack attributes, compute stack
+        statistics and eventually load the stack metadata (if each slice has its own metadata, all this metadata are
+        added in the metadata dictionary of the stack). The slices are read in alphabetic order and selected according
+        to that order.
 
         :param path: (string) path to the folder containing the stack to load;
         :param S: (list of integers) list of slices to load. Alphabetic order is assumed.
+        :param y_range: (list of two int or None) range along the y axis of the region of the slices to load. Numpy-like
+                        instructions can be used (e.g. [20,None] to indicate x[20:]). If None, the whole axis is loaded.
+        :param x_range: (list of two int or None) range along the x axis of the region of the slices to load.
         """
         all_slice_paths = self._sorted_read_path(path)
         slice_paths = [all_slice_paths[i] for i in S]
+        self._load_slice_paths(slice_paths,y_range,x_range)
+
+    def _load_slice_paths(self,slice_paths,y_range=None,x_range=None):
+        """
+        Core function. Load the slices of a stack contained in a folder (or a region of them) according to the global
+        setting of the library, and compute/produce basic stack attributes.
+
+        :param slice_paths: (list of string) list containing the path to the slices to be loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region of the slices to load.
+        :param x_range: (list of two int or None) range along the x axis of the region of the slices to load.
+        """
         self.n_slices = len(slice_paths)
         if self._use_multiprocessing:
 
-            self._load_stack_from_folder_parallel(slice_paths)
+            slice_digests = self._load_stack_from_folder_parallel(slice_paths,y_range,x_range)
+
+        elif self.memory_map:
+
+            slice_digests = self._load_stack_from_folder_memory_mapped(slice_paths,y_range,x_range)
 
         else:
 
-            self._load_stack_from_folder_serial(slice_paths)
+            slice_digests = self._load_stack_from_folder_serial(slice_paths,y_range,x_range)
 
+        self.n_slices = self.data.shape[0]
         self.shape = self.data.shape
         self.n_channels = self._estimate_n_channels(self.data[0,...])
         self.yx_shape = self.data.shape[1:3]
         self.data_type = self.data.dtype
         self._update_statistics()
+        self._slice_digests = slice_digests
 
-    def _load_stack_from_folder_serial(self,slice_paths):
+    def _load_stack_from_folder_serial(self,slice_paths,y_range=None,x_range=None):
         """
         Core function. Load the slices of a stack contained in a folder in serial way, and eventually load the metadata
         of each slice too. This core function is used based and with on the global setting of the 'bmiptools' library.
 
         :param slice_paths: (list of string) list containing the path to the slices to be loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region of the slices to load.
+        :param x_range: (list of two int or None) range along the x axis of the region of the slices to load.
+        :return: (list of bytes or None) the digests of the slices loaded, if 'fingerprint_on_loading' is True.
         """
         self.data = []
+        slice_digests = [] if self.fingerprint_on_loading else None
         if self.load_metadata:
 
             self.metadata = {'image_metadata': {},
                              'experimental_metadata': {}}
 
+        isgray = None
         for n, slice_path in enumerate(slice_paths):
 
-            slice = self._load(slice_path)
+            slice = self._load(slice_path,isgray=isgray,y_range=y_range,x_range=x_range)
             slice = np.squeeze(slice)
             self.data.append(slice)
+            if self.fingerprint_on_loading:
+
+                slice_digests.append(iout.slice_digest(slice))
+
+            if self.grayscale_check_once:
+
+                isgray = self._last_slice_is_grayscale
+
             if self.load_metadata:
 
-                slice_img_meta, slice_exp_meta = self._load_metadata(slice_path)
+                slice_img_meta, slice_exp_meta = self._load_slice_metadata(n,slice_path)
                 self.metadata['image_metadata'].update({'slice_{}'.format(n): slice_img_meta})
                 self.metadata['experimental_metadata'].update({'slice_{}'.format(n): slice_exp_meta})
 
         self.data = np.array(self.data)
+        return slice_digests
 
-    def _load_stack_from_folder_parallel(self,slice_paths):
+    def _load_stack_from_folder_memory_mapped(self,slice_paths,y_range=None,x_range=None):
         """
-        Core function. Load the slices of a stack contained in a folder in parallel way according to the global setting
-        of the library, and eventually load the metadata of each slice too. This core function is used based and with
-        on the global setting of the 'bmiptools' library.
+        Core function. Load the slices of a stack contained in a folder in a temporary memory-mapped file, and
+        eventually load the metadata of each slice too. The slices are decoded one at time directly in their position
+        of the memory-mapped file, so that the whole stack is never kept in RAM.
 
         :param slice_paths: (list of string) list containing the path to the slices to be loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region of the slices to load.
+        :param x_range: (list of two int or None) range along the x axis of the region of the slices to load.
+        :return: (list of bytes or None) the digests of the slices loaded, if 'fingerprint_on_loading' is True.
         """
-        def func_to_par(slice_path):
+        slice_digests = [] if self.fingerprint_on_loading else None
+        if self.load_metadata:
+
+            self.metadata = {'image_metadata': {},
+                             'experimental_metadata': {}}
+
+        memmap = None
+        isgray = None
+        for n, slice_path in enumerate(slice_paths):
+
+            slice = np.squeeze(self._load(slice_path,isgray=isgray,y_range=y_range,x_range=x_range))
+            if memmap is None:
+
+                memmap_path,memmap = self._new_memory_map((len(slice_paths),)+slice.shape,slice.dtype)
+                if self.grayscale_check_once:
+
+                    isgray = self._last_slice_is_grayscale
+
+            memmap[n,...] = slice
+            if self.fingerprint_on_loading:
+
+                slice_digests.append(iout.slice_digest(slice))
 
-            slice = self._load(slice_path)
-            slice = np.squeeze(slice)
             if self.load_metadata:
 
-                slice_img_meta, slice_exp_meta = self._load_metadata(slice_path)
-                slice_metadata_dict = {'image_metadata': slice_img_meta,
-                                       'experimental_metadata': slice_exp_meta}
-                return [slice, slice_metadata_dict]
+                slice_img_meta, slice_exp_meta = self._load_slice_metadata(n,slice_path)
+                self.metadata['image_metadata'].update({'slice_{}'.format(n): slice_img_meta})
+                self.metadata['experimental_metadata'].update({'slice_{}'.format(n): slice_exp_meta})
+
+        memmap.flush()
+        self._release_memory_map()
+        self._memmap_path = memmap_path
+        self.data = memmap
+        return slice_digests
+
+    @staticmethod
+    def _decode_slice(raw,isgray=None,y_range=None,x_range=None):
+        """
+        Core function. Decode a single 2D image from the content of its file, and eventually crop it.
+
+        :param raw: (bytes) content of the image file.
+        :param isgray: (optional) if True (False) multichannel images are assumed to be (not to be) grayscale images.
+                       If nothing is specified, the image is checked.
+        :param y_range: (optional) range along the y axis of the region to keep (numpy-like convention).
+        :param x_range: (optional) range along the x axis of the region to keep.
+        :return: (ndarray) the decoded image.
+        """
+        reader = imageio.get_reader(raw,format=Stack._FILE_FORMAT,mode=Stack._LOADING_MODE)
+        slice = np.squeeze(np.array(reader.get_data(0)))
+        reader.close()
+        slice = slice[iout.region_slices((1,)+slice.shape,None,y_range,x_range)[1:]]
+        if Stack._estimate_n_channels(slice) > 1:
+
+            if isgray is None:
+
+                isgray = Stack._is_grayscale(slice)
+
+            if isgray:
+
+                slice = slice[:,:,0]
+
+        return slice
+
+    def _load_stack_from_folder_parallel(self,slice_paths,y_range=None,x_range=None):
+        """
+        Core function. Load the slices of a stack contained in a folder in parallel way according to the global setting
+        of the library, and eventually load the metadata of each slice too. The first slice is decoded to know shape and
+        data type of the stack, so that the array containing the whole stack is allocated once (in a temporary
+        memory-mapped file for memory-mapped stacks). Then a reading thread reads the files ahead (at most
+        '_FOLDER_READ_AHEAD' files per decoding thread are kept waiting), while a pool of decoding threads decodes them
+        directly in their position of the stack. In this way the file reading latency overlaps with the decoding.
+
+        :param slice_paths: (list of string) list containing the path to the slices to be loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region of the slices to load.
+        :param x_range: (list of two int or None) range along the x axis of the region of the slices to load.
+        :return: (list of bytes or None) the digests of the slices loaded, if 'fingerprint_on_loading' is True.
+        """
+        first_slice = np.squeeze(self._load(slice_paths[0],y_range=y_range,x_range=x_range))
+        isgray = None
+        if self.grayscale_check_once:
+
+            isgray = self._last_slice_is_grayscale
+
+        if self.memory_map:
+
+            memmap_path,data = self._new_memory_map((len(slice_paths),)+first_slice.shape,first_slice.dtype)
+
+        else:
+
+            data = np.empty((len(slice_paths),)+first_slice.shape,dtype=first_slice.dtype)
+
+        data[0,...] = first_slice
+        slice_digests = None
+        if self.fingerprint_on_loading:
+
+            slice_digests = [None]*len(slice_paths)
+            slice_digests[0] = iout.slice_digest(data[0,...])
+
+        slices_metadata = [None]*len(slice_paths)
+        if self.load_metadata:
+
+            slices_metadata[0] = self._load_slice_metadata(0,slice_paths[0])
+
+        n_decoders = max(1,min(self._n_available_cpu,len(slice_paths)-1))
+        read_files = queue.Queue(maxsize=Stack._FOLDER_READ_AHEAD*n_decoders)
+        errors = []
+
+        def read():
+
+            try:
+
+                for n in range(1,len(slice_paths)):
+
+                    if len(errors) > 0:
+
+                        break
+
+                    with open(slice_paths[n],'rb') as file:
+
+                        read_files.put((n,file.read()))
+
+            except Exception as e:
+
+                errors.append(e)
+
+            finally:
+
+                for _ in range(n_decoders):
+
+                    read_files.put(None)
+
+        def decode():
+
+            while True:
+
+                item = read_files.get()
+                if item is None:
+
+                    return
+
+                if len(errors) > 0:                     # keep emptying the queue, so that the reader never blocks
+
+                    continue
+
+                n,raw = item
+                try:
+
+                    data[n,...] = self._decode_slice(raw,isgray,y_range,x_range)
+                    if self.fingerprint_on_loading:
+
+                        slice_digests[n] = iout.slice_digest(data[n,...])
+
+                    if self.load_metadata:
+
+                        slices_metadata[n] = self._load_slice_metadata(n,slice_paths[n],raw=raw)
+
+                except Exception as e:
+
+                    errors.append(e)
+
+        threads = [threading.Thread(target=read)]+[threading.Thread(target=decode) for _ in range(n_decoders)]
+        for thread in threads:
+
+            thread.start()
+
+        for thread in threads:
+
+            thread.join()
+
+        if self.memory_map:
+
+            data.flush()
+            if len(errors) == 0:
+
+                self._release_memory_map()
+                self._memmap_path = memmap_path
 
             else:
 
-                return slice
+                os.remove(memmap_path)
+
+        if len(errors) > 0:
 
-        result = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(path) for path in slice_paths)
+            raise errors[0]
+
+        self.data = data
         if self.load_metadata:
 
-            self.data = np.array([result_line[0] for result_line in result])
             self.metadata = {'image_metadata': {},
                              'experimental_metadata': {}}
-            for n, result_line in enumerate(result):
-
-                self.metadata['image_metadata'].update({'slice_{}'.format(n): result_line[1]['image_metadata']})
-                self.metadata['experimental_metadata'].update({'slice_{}'.format(n): result_line[1]['experimental_metadata']})
+            for n,(slice_img_meta,slice_exp_meta) in enumerate(slices_metadata):
 
-        else:
+                self.metadata['image_metadata'].update({'slice_{}'.format(n): slice_img_meta})
+                self.metadata['experimental_metadata'].update({'slice_{}'.format(n): slice_exp_meta})
 
-            self.data = np.array(result)
+        return slice_digests
 
-    def load_stack_from_folder(self,path):
+    def load_stack_from_folder(self,path,z_range=None,y_range=None,x_range=None,z_step=1):
         """
-        Load a stack from a folder (i.e. a folder where slices of the stack are split as single 2D images),
-        compute/produce basic stack attributes, compute stack statistics and eventually load the stack metadata
-        (if each slice has its own metadata, all this metadata are added in the metadata dictionary of the stack).
-        The slices are read according to the image_type convention.
+        Load a stack (or a region of it) from a folder (i.e. a folder where slices of the stack are split as single 2D
+        images), compute/produce basic stack attributes, compute stack statistics and eventually load the stack
+        metadata (if each slice has its own metadata, all this metadata are added in the metadata dictionary of the
+        stack). The slices are read according to the image_type convention. When a region is specified, only the files
+        of the slices in the region are read, and only the region of each slice is kept in memory (see '_load').
 
         :param path: (string) path to the folder containing the stack to load;
+        :param z_range: (list of two int or None) range along the z axis of the region to load. Numpy-like instructions
+                        can be used (e.g. [20,None] to indicate x[20:]). If None, the whole axis is loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region to load.
+        :param x_range: (list of two int or None) range along the x axis of the region to load.
+        :param z_step: (int) only one slice every 'z_step' slices of the region is loaded (e.g. to get a light stack to
+                       fit a pipeline).
         """
         slice_paths = self._sorted_read_path(path)
-        self.n_slices = len(slice_paths)
+        z_start,z_stop = iout.range_to_slice(z_range,len(slice_paths))
+        self._load_slice_paths(slice_paths[z_start:z_stop:z_step],y_range,x_range)
+
+    def load_chunked_store(self,path,z_range=None,y_range=None,x_range=None,z_step=1):
+        """
+        Load a stack (or a region of it) from a chunked store (see 'save'), compute/produce basic stack attributes,
+        compute stack statistics and eventually load the stack metadata saved in the header of the store. Only the
+        chunks intersecting the region loaded are read, and they are decompressed in parallel according to the global
+        setting of the 'bmiptools' library.
+
+        :param path: (string) path to the folder of the chunked store;
+        :param z_range: (list of two int or None) range along the z axis of the region to load. Numpy-like instructions
+                        can be used (e.g. [20,None] to indicate x[20:]). If None, the whole axis is loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region to load.
+        :param x_range: (list of two int or None) range along the x axis of the region to load.
+        :param z_step: (int) only one slice every 'z_step' slices of the region is loaded.
+        """
+        n_jobs = 1
         if self._use_multiprocessing:
 
-            self._load_stack_from_folder_parallel(slice_paths)
+            n_jobs = self._n_available_cpu
 
-        else:
+        out = None
+        if self.memory_map:
 
-            self._load_stack_from_folder_serial(slice_paths)
+            header = iout.read_chunked_store_header(path)
+            memmap_path,out = self._new_memory_map(iout.region_shape(header['shape'],z_range,y_range,x_range,z_step),
+                                                   np.dtype(header['dtype']))
 
+        data,header = iout.read_chunked_store(path,z_range,y_range,x_range,out=out,n_jobs=n_jobs,z_step=z_step)
+        if self.memory_map:
+
+            data.flush()
+            self._release_memory_map()
+            self._memmap_path = memmap_path
+
+        self.data = data
+        self.n_slices = self.data.shape[0]
         self.shape = self.data.shape
         self.n_channels = self._estimate_n_channels(self.data[0,...])
         self.yx_shape = self.data.shape[1:3]
         self.data_type = self.data.dtype
         self._update_statistics()
+        if self.load_metadata and header['metadata'] is not None:
+
+            self.metadata = header['metadata']
 
-    def from_array(self,arr,with_channel=False,image_metadata=None,experimental_metadata=None,image_processing_metadata=None):
+    def load_hdf5(self,path,S=None,z_range=None,y_range=None,x_range=None,z_step=1):
+        """
+        Load a stack (or only certain slices of it, or a region of them) from a HDF5 file (see 'save'),
+        compute/produce basic stack attributes, compute stack statistics and eventually load the stack metadata saved
+        as attributes of the HDF5 dataset. Only the chunks intersecting the slices and the region loaded are read.
+
+        :param path: (string) path to the HDF5 file;
+        :param S: (list of int or None) list of slices to load. If None, all the slices in 'z_range' are loaded.
+        :param z_range: (list of two int or None) range along the z axis of the region to load, used only if S is None.
+                        Numpy-like instructions can be used (e.g. [20,None] to indicate x[20:]). If None, the whole axis
+                        is loaded.
+        :param y_range: (list of two int or None) range along the y axis of the region to load.
+        :param x_range: (list of two int or None) range along the x axis of the region to load.
+        :param z_step: (int) only one slice every 'z_step' slices of 'z_range' is loaded, used only if S is None.
+        """
+        header = iout.read_hdf5_header(path)
+        if S is None:
+
+            S = range(*iout.range_to_slice(z_range,header['shape'][0]),z_step)
+
+        out = None
+        if self.memory_map:
+
+            region_shape = iout.region_shape(header['shape'],None,y_range,x_range)
+            memmap_path,out = self._new_memory_map((len(S),)+region_shape[1:],np.dtype(header['dtype']))
+
+        data,header = iout.read_hdf5(path,slice_list=S,y_range=y_range,x_range=x_range,out=out)
+        if self.memory_map:
+
+            data.flush()
+            self._release_memory_map()
+            self._memmap_path = memmap_path
+
+        self.data = data
+        self.n_slices = self.data.shape[0]
+        self.shape = self.data.shape
+        self.n_channels = self._estimate_n_channels(self.data[0,...])
+        self.yx_shape = self.data.shape[1:3]
+        self.data_type = self.data.dtype
+        self._update_statistics()
+        if self.load_metadata and header['metadata'] is not None:
+
+            self.metadata = {'image_metadata': None,
+                             'experimental_metadata': None,
+                             'image_processing_metadata': None}
+            self.metadata.update(header['metadata'])
+
+    def from_array(self,arr,with_channel=False,image_metadata=None,experimental_metadata=None,image_processing_metadata=None,
+                   copy=True):
         """
         Fill a stack with the data coming from a numpy array, compute/produce the basic stack attributes and statistic,
         eventually produce the metadata dictionary of the stack. The array is interpreted according the scheme specified
         in the _CHANNEL_INTERPRETATION global attribute.
 
-        :param arr: (ndarray) numpy array containing the data;
+        :param arr: (ndarray) numpy array containing the data. For memory-mapped stacks the array is copied in a new
+                    temporary memory-mapped file;
         :param with_channel: (boolean) if True it specify that the last dimension of the array contains the channel's
                              information;
         :param image_metadata: (optional) dictionary containing the image metadata;
         :param experimental_metadata: (optional) dictionary containing the experimental metadata;
-        :param image_processing_metadata: (optional) dictionary containing the image processing metadata.
+        :param image_processing_metadata: (optional) dictionary containing the image processing metadata;
+        :param copy: (boolean) if False the array is adopted by the stack without copying it (e.g. when a plugin hands
+                     its output to the stack), so that any later modification of the array is visible in the stack and
+                     vice versa. Ignored for memory-mapped stacks.
+
+        When the floating point precision of the library is 'float32' (see the 'precision' global setting), double
+        precision arrays are converted to single precision.
         """
         if (len(arr.shape) < 3 and not with_channel) or (len(arr.shape) == 3 and with_channel):
 
             arr = np.expand_dims(arr,axis=0)
 
-        self.data = np.array(arr)
+        if self._precision == np.float32 and arr.dtype == np.float64:
+
+            arr = arr.astype(np.float32)
+            copy = False                                # the conversion already made a copy
+
+        if self.memory_map:
+
+            self.data = self._to_memory_map(arr)
+
+        elif copy:
+
+            self.data = np.array(arr)
+
+        else:
+
+            self.data = np.asarray(arr)
+
         self.n_channels = self._estimate_n_channels(self.data[0,...])
         self.n_slices = self.data.shape[0]
         self.shape = self.data.shape
@@ -830,24 +1750,231 @@ class Stack(CoreBasic):
                              'experimental_metadata': experimental_metadata,
                              'image_processing_metadata': image_processing_metadata}
 
+    def view(self,z_range=None,y_range=None,x_range=None):
+        """
+        Return a stack containing a region of this stack, without copying the data: the data of the new stack are a
+        view of the data of this stack, so that any modification of the data made in place in one stack is visible in
+        the other one (until the data of one of the two stacks are replaced, e.g. with 'from_array'). Metadata and
+        settings are copied from this stack.
+
+        :param z_range: (list of two int or None) range along the z axis of the region. Numpy-like instructions can be
+                        used (e.g. [20,None] to indicate x[20:]). If None, the whole axis is considered.
+        :param y_range: (list of two int or None) range along the y axis of the region.
+        :param x_range: (list of two int or None) range along the x axis of the region.
+        :return: (bmiptools.stack.Stack) the stack containing the region.
+        """
+        stack_view = copy.copy(self)                    # the copy does not own the temporary memory-mapped file
+        stack_view.temporary_library_metadata = dict(self.temporary_library_metadata)
+        if self.metadata is not None:
+
+            stack_view.metadata = dict(self.metadata)
+
+        stack_view.data = self.data[iout.region_slices(self.data.shape,z_range,y_range,x_range)]
+        stack_view.n_slices = stack_view.data.shape[0]
+        stack_view.shape = stack_view.data.shape
+        stack_view.yx_shape = stack_view.data.shape[1:3]
+        return stack_view
+
+    def _file_shape(self):
+        """
+        Core function. Compute the (ZYX) shape of the stack at the path of the stack, without loading it.
+
+        :return: (tuple of 3 int) the shape of the stack on the disk.
+        """
+        if iout.is_chunked_store(self.path):
+
+            return tuple(iout.read_chunked_store_header(self.path)['shape'][:3])
+
+        if iout.is_hdf5(self.path):
+
+            return tuple(iout.read_hdf5_header(self.path)['shape'][:3])
+
+        if self._from_folder:
+
+            folder_index = self._folder_index(self.path)
+            if folder_index['first_slice'] is not None:
+
+                return (len(folder_index['files']),)+tuple(folder_index['first_slice']['shape'][:2])
+
+            first_slice = imageio.imread(self.path+os.sep+folder_index['files'][0][0])
+            return (len(folder_index['files']),)+first_slice.shape[:2]
+
+        reader = imageio.get_reader(self.path,format=Stack._FILE_FORMAT,mode=Stack._LOADING_MODE)
+        n_slices = reader.get_length()
+        reader.close()
+        with tifffile.TiffFile(self.path) as tif:
+
+            return (n_slices,)+tuple(tif.pages[0].shape[:2])
+
+    def _load_region(self,z_range,y_range,x_range):
+        """
+        Core function. Load a region of the stack at the path of the stack in a new stack, having the same setting of
+        this stack.
+
+        :param z_range: (list of two int) range along the z axis of the region to load.
+        :param y_range: (list of two int) range along the y axis of the region to load.
+        :param x_range: (list of two int) range along the x axis of the region to load.
+        :return: (bmiptools.stack.Stack) the stack containing the region.
+        """
+        region_stack = copy.copy(self)
+        region_stack.temporary_library_metadata = {}
+        region_stack.load_metadata = False
+        if iout.is_chunked_store(self.path):
+
+            region_stack.load_chunked_store(self.path,z_range,y_range,x_range)
+
+        elif self._from_folder and not iout.is_hdf5(self.path):
+
+            region_stack.load_stack_from_folder(self.path,z_range,y_range,x_range)
+
+        else:
+
+            region_stack.load_stack(self.path,z_range,y_range,x_range)
+
+        return region_stack
+
+    def slabs(self,slab_size=16,tile_shape=None,halo=0):
+        """
+        Iterate over the z-slabs (and eventually over yx-tiles of each slab) of the stack. Each slab is returned
+        together with a halo, i.e. the slices (and pixels) around it, up to the stack boundaries. When the stack
+        contains data, each slab is a view of them (see 'view'), while when the stack has not been loaded (e.g. it has
+        been initialized with 'load_stack = False') each slab is read from the path of the stack, so that the whole
+        stack is never kept in memory. The results of the processing of each slab can be written in an output stack
+        with 'write_slab'.
+
+        :param slab_size: (int) number of slices of each slab.
+        :param tile_shape: (tuple of 2 int or None) shape of the yx-tiles in which each slab is split. If None, the
+                           slabs are not split.
+        :param halo: (int or tuple of 3 int) size of the halo along the z, y and x axis.
+        :return: (generator of bmiptools.stack.StackSlab) the slabs of the stack.
+        """
+        if self.data is not None:
+
+            full_shape = self.data.shape
+
+        else:
+
+            full_shape = self._file_shape()
+
+        if type(halo) is int:
+
+            halo = (halo,halo,halo)
+
+        if tile_shape is None:
+
+            tile_shape = full_shape[1:3]
+
+        block_shape = (slab_size,)+tuple(tile_shape)
+        for block_start in itertools.product(*[range(0,full_shape[ax],block_shape[ax]) for ax in range(3)]):
+
+            block_stop = [min(block_start[ax]+block_shape[ax],full_shape[ax]) for ax in range(3)]
+            halo_start = [max(0,block_start[ax]-halo[ax]) for ax in range(3)]
+            halo_stop = [min(full_shape[ax],block_stop[ax]+halo[ax]) for ax in range(3)]
+            ranges = [[halo_start[ax],halo_stop[ax]] for ax in range(3)]
+            if self.data is not None:
+
+                slab_stack = self.view(*ranges)
+
+            else:
+
+                slab_stack = self._load_region(*ranges)
+
+            region = tuple(slice(block_start[ax],block_stop[ax]) for ax in range(3))
+            inner_region = tuple(slice(block_start[ax]-halo_start[ax],block_stop[ax]-halo_start[ax]) for ax in range(3))
+            yield StackSlab(slab_stack,region,inner_region,full_shape)
+
+    def write_slab(self,slab,data):
+        """
+        Write the result of the processing of a slab (see 'slabs') in the corresponding region of this stack, removing
+        the halo. If this stack does not contain data with the (ZYX) shape of the stack from which the slab comes, the
+        data are allocated (in a temporary memory-mapped file for memory-mapped stacks) using the data type and the
+        number of channels of the first result written. When slabs with halo are processed, the output stack has to be
+        different from the stack from which the slabs come. Slabs not split in yx-tiles and without halo in the
+        yx-plane can change the yx-shape of the slices (e.g. when they are cropped): in this case the output stack has
+        the yx-shape of the results.
+
+        :param slab: (bmiptools.stack.StackSlab) the slab processed.
+        :param data: (ndarray or bmiptools.stack.Stack) result of the processing of the slab, having the shape of the
+                     slab plus its halo.
+        """
+        if isinstance(data,Stack):
+
+            data = data.data
+
+        slab_data = slab.trim(np.asarray(data))
+        region = slab.region
+        full_shape = slab.full_shape[:3]
+        if slab_data.shape[1:3] != tuple([r.stop-r.start for r in region[1:3]]):
+
+            assert tuple([r.stop-r.start for r in region[1:3]]) == full_shape[1:3], 'The yx-shape of the result can ' \
+                   'change only for slabs not split in yx-tiles.'
+            region = (region[0],slice(None),slice(None))
+            full_shape = full_shape[:1]+slab_data.shape[1:3]
+
+        if self.data is None or self.data.shape[:3] != full_shape:
+
+            shape = full_shape+slab_data.shape[3:]
+            if self.memory_map:
+
+                memmap_path,self.data = self._new_memory_map(shape,slab_data.dtype)
+                self._release_memory_map()
+                self._memmap_path = memmap_path
+
+            else:
+
+                self.data = np.empty(shape,dtype=slab_data.dtype)
+
+            self.n_slices = self.data.shape[0]
+            self.shape = self.data.shape
+            self.n_channels = self._estimate_n_channels(slab_data[0,...])
+            self.yx_shape = self.data.shape[1:3]
+            self.data_type = self.data.dtype
+
+        self.data[region] = slab_data
+        self._update_statistics()
+
     # output methods
     def save(self,saving_path,saving_name,mode='all_stack',data_type=None,extension='tiff',standard_saving=False,
-             save_metadata=True):
+             save_metadata=True,chunk_shape=None,compression='default',pyramid_levels=0,pyramid_z_binning=False):
         """
         Save the stack.
 
         :param saving_path: (string) path where the stack have to be saved.
         :param saving_name: (string) name of the stack.
-        :param mode: (string) it can be 'all_stack' or 'slice_by_slice'. If 'all_stack', the whole stack is saved in a
-                     single tiff, if 'slice_by_slice' the stack is saved slice by slice in a folder (eventually created)
-                     having the same name of the stack.
+        :param mode: (string) it can be 'all_stack', 'bigtiff', 'slice_by_slice', 'chunked' or 'hdf5'. If 'all_stack',
+                     the whole stack is saved in a single tiff, if 'bigtiff' the whole stack is saved in a single
+                     compressed BigTIFF (suitable for stacks larger than 4 GB), if 'slice_by_slice' the stack is saved
+                     slice by slice in a folder (eventually created) having the same name of the stack (TIFF slices are
+                     compressed only if a compression is given). If 'chunked' the stack is saved as chunked
+                     store, i.e. in a folder having the same name of the stack containing the compressed ZYX chunks of
+                     the stack and a json header with the stack metadata. Chunked stores allow fast partial reading
+                     (see 'load_chunked_store'). If 'hdf5' the stack is saved in a chunked HDF5 file (extension '.h5'),
+                     with the stack metadata stored as attributes of the dataset (see 'load_hdf5').
         :param data_type: data type in which the data are saved (for good compatibility with generic image reader it is
                           recommended to use 'uint8' or 'float32' depending on the kind of image).
         :param extension: (optional) file extension of the saved image(s).
         :param standard_saving: (boolean) if True the data are suitably scaled in order to be compatible with a generic
                                 image reader. When false the data is saved as it is: it can be read with this library
                                 recovery the exact content saved, but may not be visible with a generic image reader.
-        :param save_metadata: (boolean) if True also the metadata dictionary will be saved in json file.
+        :param save_metadata: (boolean) if True also the metadata dictionary will be saved in json file (in the header
+                              file for chunked stores, as dataset attributes for HDF5 files).
+        :param chunk_shape: (tuple of 3 int or None) shape of the chunks along the z, y and x axis. Used only in
+                            'chunked' and 'hdf5' mode. If None, (16,256,256) is used in 'chunked' mode, while in 'hdf5'
+                            mode each slice is a chunk.
+        :param compression: (str or None) compression used for the chunks. It can be 'zlib', 'bz2', 'lzma' or None in
+                            'chunked' mode, and 'zlib' (i.e. gzip), 'lzf' or None in 'hdf5' mode. In 'bigtiff' and
+                            'slice_by_slice' mode (for TIFF files) it is the lossless compression of the pages, and it
+                            can be 'zlib' (i.e. deflate), 'zstd', 'lzw' or None. With 'default', 'zlib' is used in
+                            'bigtiff', 'chunked' and 'hdf5' mode, while in 'slice_by_slice' mode the slices are not
+                            compressed (as in the previous versions of the library).
+        :param pyramid_levels: (int) number of downsampled levels (2x, 4x, 8x... binning in yx) of the multi-resolution
+                               pyramid saved together with the stack. Each level is computed from the previous one
+                               while saving, without reading back the saved stack. Used only in 'bigtiff' mode, where
+                               the levels of each slice are stored as reduced-resolution sub-pages of the slice, and in
+                               'chunked' mode, where each level is stored as a chunked store in the folder 'level_<n>'
+                               of the chunked store of the stack.
+        :param pyramid_z_binning: (boolean) if True the pyramid levels are binned also along the z axis. Used only in
+                                  'chunked' mode.
         """
         # prepare data for saving
         if data_type is None:
@@ -862,11 +1989,20 @@ class Stack(CoreBasic):
         else:
 
             data_type = np.dtype(data_type)
-            data_to_save = self.data.astype(data_type)
+            data_to_save = _ConvertedStackData(self.data,data_type)
 
         # save result
+        if compression == 'default':
+
+            compression = None if mode == 'slice_by_slice' else 'zlib'
+
+        if pyramid_levels > 0 and mode not in ['bigtiff','chunked']:
+
+            warnings.warn('Multi-resolution pyramids can be saved only in \'bigtiff\' and \'chunked\' mode: no '
+                          'pyramid will be saved.')
+
         path_to_saved_file = saving_path+os.sep+saving_name
-        if save_metadata and hasattr(self, 'metadata'):
+        if save_metadata and hasattr(self, 'metadata') and mode not in ['chunked','hdf5']:
 
             if self.metadata is not None:
 
@@ -882,14 +2018,63 @@ class Stack(CoreBasic):
 
             if self._use_multiprocessing:
 
-                self._save_stack_slice_by_slice_parallel(path_to_saved_file,data_to_save,extension)
+                self._save_stack_slice_by_slice_parallel(path_to_saved_file,data_to_save,extension,compression)
 
             else:
 
-                self._save_stack_slice_by_slice_serial(path_to_saved_file,data_to_save,extension)
+                self._save_stack_slice_by_slice_serial(path_to_saved_file,data_to_save,extension,compression)
 
             self.write('Stack saved!')
 
+        elif mode == 'chunked':
+
+            n_jobs = 1
+            if self._use_multiprocessing:
+
+                n_jobs = self._n_available_cpu
+
+            metadata = None
+            if save_metadata and hasattr(self, 'metadata'):
+
+                metadata = self.metadata
+
+            if chunk_shape is None:
+
+                chunk_shape = (16,256,256)
+
+            iout.write_chunked_store(path_to_saved_file,data_to_save,chunk_shape=chunk_shape,compression=compression,
+                                     metadata=metadata,n_jobs=n_jobs,pyramid_levels=pyramid_levels,
+                                     pyramid_z_binning=pyramid_z_binning)
+
+            self.write('Stack saved!')
+
+        elif mode == 'bigtiff':
+
+            n_jobs = 1
+            if self._use_multiprocessing:
+
+                n_jobs = self._n_available_cpu
+
+            if pyramid_z_binning:
+
+                warnings.warn('Pyramid binning along the z axis is not supported in \'bigtiff\' mode: only the yx '
+                              'plane is binned.')
+
+            self._save_stack_in_single_BigTIFF(path_to_saved_file+'.'+extension,data_to_save,compression,n_jobs,
+                                               pyramid_levels)
+            self.write('Stack saved!')
+
+        elif mode == 'hdf5':
+
+            metadata = None
+            if save_metadata and hasattr(self, 'metadata'):
+
+                metadata = self.metadata
+
+            iout.write_hdf5(path_to_saved_file+'.h5',data_to_save,chunk_shape=chunk_shape,compression=compression,
+                            metadata=metadata)
+            self.write('Stack saved!')
+
         else:
 
             self.write('Saving mode not supported')
@@ -923,7 +2108,7 @@ class Stack(CoreBasic):
 
         else:
 
-            data_to_save = self.data.astype(data_type)
+            data_to_save = _ConvertedStackData(self.data,data_type)
 
         # save result
         path_to_saved_file = saving_path+os.sep+saving_name
@@ -939,10 +2124,12 @@ class Stack(CoreBasic):
 
     def _standardize_data_for_saving(self,data_type):
         """
-        Core function. Standardize a stack according to a given datatype.
+        Core function. Standardize a stack according to a given datatype. The minimum and the maximum of the stack are
+        taken from the (cached) statistics, and the data are converted only when the writer reads them, slice by slice
+        or chunk by chunk (see '_ConvertedStackData').
 
         :param data_type: data type.
-        :return: standardized data.
+        :return: (_ConvertedStackData) standardized data.
         """
         # find scaling factor
         scaling_factor = 1
@@ -955,11 +2142,8 @@ class Stack(CoreBasic):
             scaling_factor = 65536
 
         # standardize
-        stand_data = self.data
-        stand_data = (stand_data-stand_data.min())/(stand_data.max()-stand_data.min())
-        stand_data = stand_data*scaling_factor
-        stand_data = stand_data.astype(data_type)
-        return stand_data
+        return _ConvertedStackData(self.data,data_type,minimum=np.min(self.min_stack),maximum=np.max(self.max_stack),
+                                   scaling_factor=scaling_factor)
 
     def _save_stack_in_single_TIFF(self,path,data_to_save,extension):
         """
@@ -978,42 +2162,80 @@ class Stack(CoreBasic):
 
         writer.close()
 
-    def _save_stack_slice_by_slice_serial(self,path,data_to_save,extension):
+    def _save_stack_in_single_BigTIFF(self,path,data_to_save,compression,n_jobs,pyramid_levels=0):
+        """
+        Core function. Save the whole stack as a single compressed BigTIFF. The pages are written in order, and each
+        page is compressed by a pool of threads (see 'bmiptools.core.io_utils.write_tiff').
+
+        :param path: (string) full path of the file in which the stack will be saved.
+        :param data_to_save: (ndarray) numpy array containing the data to save.
+        :param compression: (str or None) lossless compression used ('zlib', 'zstd', 'lzw' or None).
+        :param n_jobs: (int) number of threads used to compress each page.
+        :param pyramid_levels: (int) number of reduced-resolution levels saved for each page.
+        """
+        n_slices = len(data_to_save)
+        iout.write_tiff(path,data_to_save,compression=compression,bigtiff=True,n_jobs=n_jobs,
+                        progress_callback=lambda i: self.progress_bar(i,n_slices,15,text_after='slices {}/{} '
+                                                                      'saved'.format(i+1,n_slices)),
+                        pyramid_levels=pyramid_levels)
+
+    @staticmethod
+    def _save_slice(slice_path,slice,extension,compression):
+        """
+        Core function. Save a single slice. Compressed TIFF slices are written with the same encoder used for BigTIFF
+        stacks (see 'bmiptools.core.io_utils.write_tiff'), uncompressed slices and other formats with imageio.
+
+        :param slice_path: (string) full path of the file in which the slice will be saved.
+        :param slice: (ndarray) the slice to save.
+        :param extension: (string) file extension of the saved image.
+        :param compression: (str or None) lossless compression used for TIFF slices ('zlib', 'zstd', 'lzw' or None).
+        """
+        if extension.lower() in ['tif','tiff'] and compression is not None:
+
+            iout.write_tiff(slice_path,np.expand_dims(slice,axis=0),compression=compression,bigtiff=False)
+
+        else:
+
+            writer = imageio.get_writer(slice_path, format=extension.upper(), mode='I')
+            writer.append_data(slice)
+            writer.close()
+
+    def _save_stack_slice_by_slice_serial(self,path,data_to_save,extension,compression=None):
         """
         Core function. Save the whole stack slice by slice in a folder in serial wat.
 
         :param path: (string) full path of the file in which the stack will be saved.
         :param data_to_save: (ndarray) numpy array containing the data to save.
         :param extension: (optional) file extension of the saved image(s).
+        :param compression: (str or None) lossless compression used for TIFF slices (see '_save_slice').
         """
         path_to_stack_folder = ut.manage_path(path)
         for n,slice in enumerate(data_to_save):
 
             self.progress_bar(n, self.n_slices, 15, text_after='slices {}/{} saved'.format(n+1,self.n_slices))
             slice_path = path_to_stack_folder+os.sep+'name__slice_{}.{}'.format(ut.standard_number(n),extension)
-            writer = imageio.get_writer(slice_path, format=extension.upper(), mode='I')
-            writer.append_data(slice)
-            writer.close()
+            self._save_slice(slice_path,slice,extension,compression)
 
-    def _save_stack_slice_by_slice_parallel(self,path,data_to_save,extension):
+    def _save_stack_slice_by_slice_parallel(self,path,data_to_save,extension,compression=None):
         """
-        Core function. Save the whole stack slice by slice in a folder in parallel way.
+        Core function. Save the whole stack slice by slice in a folder in parallel way. The slices are encoded and
+        written by a pool of threads, so that they are not copied to other processes.
 
         :param path: (string) full path of the file in which the stack will be saved.
         :param data_to_save: (ndarray) numpy array containing the data to save.
         :param extension: (optional) file extension of the saved image(s).
+        :param compression: (str or None) lossless compression used for TIFF slices (see '_save_slice').
         """
         path_to_stack_folder = ut.manage_path(path)
 
         def func_to_par(n,slice):
 
             slice_path = path_to_stack_folder+os.sep+'name__slice_{}.{}'.format(ut.standard_number(n),extension)
-            writer = imageio.get_writer(slice_path, format=extension.upper(), mode='I')
-            writer.append_data(slice)
-            writer.close()
+            self._save_slice(slice_path,slice,extension,compression)
 
         self.write('saving the stack in parallel mode...')
-        Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(n,slice) for n,slice in enumerate(data_to_save))
+        Parallel(n_jobs=self._n_available_cpu,prefer='threads')(delayed(func_to_par)(n,slice)
+                                                                for n,slice in enumerate(data_to_save))
 
     def _save_metadata(self,saving_path):
         """
@@ -16,14 +16,14 @@ Plugin used to apply registration algorithms to a given stack object.
 import numpy as np
 import cv2
 import os
-from joblib import Parallel,delayed
+from joblib import delayed
 from skimage.registration import optical_flow_tvl1
 from skimage.transform import warp
 
 import bmiptools.core.math_utils as mut
 from bmiptools.core.ip_utils import standardizer
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 ###############
@@ -38,6 +38,7 @@ class Registrator(TransformationBasic):
     """
 
     __version__ = '0.4'
+    _memory_padding_fraction = 0.1                  # expected YX-expansion of the slices before the fit (memory planning)
     empty_transformation_dictionary = {'load_existing_registration': False,
                                        'loading_path': ' ',
                                        'registration_algorithm':'ECC',
@@ -526,8 +527,8 @@ class Registrator(TransformationBasic):
         self.write('Estimating warping matrices...')
         self.write('Method: {}'.format(self.registration_algorithm))
         self.write('Slice | Correlation with previous')
-        self.warp_matrices_list = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(N,x)
-                                                                    for N in self.vtqdm(range(1, len(x))))
+        self.warp_matrices_list = self.parallel(delayed(func_to_par)(N,x)
+                                                for N in self.vtqdm(range(1, len(x))))
         warp_matrices_list = self.warp_matrices_list
 
         # compute the total transformation matrix for each given slice (i.e. the transformation cumulated for all the
@@ -679,8 +680,8 @@ class Registrator(TransformationBasic):
         self.write('Estimating warping matrices...')
         self.write('Method: {}'.format(self.registration_algorithm))
         self.write('Slice | Correlation with previous')
-        warp_matrices_list = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(N)
-                                                                    for N in self.vtqdm(range(1, len(x))))
+        warp_matrices_list = self.parallel(delayed(func_to_par)(N)
+                                           for N in self.vtqdm(range(1, len(x))))
 
         # compute the total transformation matrix for each given slice (i.e. the transformation cumulated for all the
         # previous slices).
@@ -848,8 +849,8 @@ class Registrator(TransformationBasic):
 
         post_reg_slice0 = self._expand_image(x0,dsize_y,dsize_x,self.padding_val, dtype='float32',inverse_warp=True)
         post_reg_shape = post_reg_slice0.shape
-        registered_vol = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(i,wmat)
-                                  for i, wmat in self.vtqdm(enumerate(self.cumulated_warp_matrices_list[1:])))
+        registered_vol = self.parallel(delayed(func_to_par)(i,wmat)
+                                       for i, wmat in self.vtqdm(enumerate(self.cumulated_warp_matrices_list[1:])))
         return np.array([post_reg_slice0]+registered_vol)
 
     def _warp_serial(self,x,dsize_y,dsize_x):
@@ -925,8 +926,8 @@ class Registrator(TransformationBasic):
         post_reg_shape = post_reg_slice0.shape
         ny,nx = post_reg_shape
         row_coords, col_coords = np.meshgrid(np.arange(ny), np.arange(nx), indexing='ij')
-        registered_vol = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(i,wmat)
-                                  for i, wmat in self.vtqdm(enumerate(self.cumulated_warp_matrices_list[1:])))
+        registered_vol = self.parallel(delayed(func_to_par)(i,wmat)
+                                       for i, wmat in self.vtqdm(enumerate(self.cumulated_warp_matrices_list[1:])))
         registered_vol = [post_reg_slice0]+registered_vol
         for i in range(1,len(registered_vol)):
 
@@ -1035,6 +1036,38 @@ class Registrator(TransformationBasic):
         self.write('-------------------------------------')
         return registred_vol
 
+    @classmethod
+    def _memory_footprint(cls,shape,dtype,precision,plugin=None):
+        """
+        Estimate the memory needed to register a stack of given shape and data type. The registered slices are
+        expanded (in single precision) to contain the cumulated shifts of the whole stack, collected in a list and then
+        stacked in a new array. When the plugin is fitted, the expansion is computed from the cumulated transformations
+        found, otherwise each of the YX-dimensions is assumed to grow of a fraction '_memory_padding_fraction' of its
+        size.
+
+        :param shape: (tuple) shape of the input stack, in the ZYX convention.
+        :param dtype: data type of the input stack.
+        :param precision: (numpy dtype) floating point precision of the library (not used by this plugin).
+        :param plugin: (Registrator or None) initialized plugin, used to compute the expansion of the slices.
+        :return: (tuple, numpy dtype, int) shape and data type of the registered stack, and peak memory (in bytes)
+                 needed during the transformation, input stack included.
+        """
+        if plugin is not None and hasattr(plugin,'cumulated_warp_matrices_list'):
+
+            warp_matrices = np.array(plugin.cumulated_warp_matrices_list)
+            dsize_y = np.abs(np.floor(np.min(warp_matrices[:,1,2]))) + np.abs(np.ceil(np.max(warp_matrices[:,1,2])))
+            dsize_x = np.abs(np.floor(np.min(warp_matrices[:,0,2]))) + np.abs(np.ceil(np.max(warp_matrices[:,0,2])))
+
+        else:
+
+            dsize_y = np.ceil(cls._memory_padding_fraction*shape[1])
+            dsize_x = np.ceil(cls._memory_padding_fraction*shape[2])
+
+        output_shape = (shape[0],int(shape[1]+dsize_y),int(shape[2]+dsize_x)) + tuple(shape[3:])
+        input_bytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        output_bytes = int(np.prod(output_shape))*np.dtype(np.float32).itemsize
+        return output_shape, np.dtype(np.float32), input_bytes + 2*output_bytes
+
     def transform(self,x,inplace=True):
         """
         Apply the initialized transformation.
@@ -1059,4 +1092,4 @@ class Registrator(TransformationBasic):
 
                 return registered_vol
 
-            x.from_array(registered_vol)
\ No newline at end of file
+            x.from_array(registered_vol,copy=False)
\ No newline at end of file
@@ -37,6 +37,7 @@ class.
 #################
 
 
+import numpy as np
 from copy import copy
 import bmiptools.core.utils as ut
 from bmiptools.core.base import CoreBasic
@@ -91,6 +92,42 @@ class TransformationBasic(CoreBasic):
         """
         return None
 
+    def _is_slice_local(self):
+        """
+        Tell if, with the current parameters, the transformation of each slice depends only on the slice itself (and on
+        the plugin parameters), so that the plugin can be applied slab by slab (see the 'slab_size' option of the
+        'apply' method of the Pipeline class). Plugins needing the whole stack (e.g. to fit themselves during the
+        transformation) have to return False, which is the default.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return False
+
+    @classmethod
+    def _memory_footprint(cls,shape,dtype,precision,plugin=None):
+        """
+        Estimate the memory needed to apply the transformation to a stack of given shape and data type. The default
+        estimate holds for the plugins working slice by slice: the transformed slices are collected in a list which is
+        then stacked in a new array, so that two copies of the output coexist with the input. For multichannel stacks,
+        the channel-last transposition of the result is copied once more when it is given back to the stack. Plugins
+        with different temporaries should overwrite this method.
+
+        :param shape: (tuple) shape of the input stack, in the ZYX(C) convention.
+        :param dtype: data type of the input stack.
+        :param precision: (numpy dtype) floating point precision of the library (see the 'precision' global setting).
+        :param plugin: (TransformationBasic or None) initialized plugin, used to refine the estimate when available.
+        :return: (tuple, numpy dtype, int) shape and data type of the transformed stack, and peak memory (in bytes)
+                 needed during the transformation, input stack included.
+        """
+        input_bytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        output_bytes = int(np.prod(shape))*np.dtype(precision).itemsize
+        peak_bytes = input_bytes + 2*output_bytes
+        if len(shape) == 4:
+
+            peak_bytes = peak_bytes + output_bytes
+
+        return tuple(shape), np.dtype(precision), peak_bytes
+
     def inverse_transform(self,x,inplace=True,*args,**kwargs):
         """
         Apply the inverse transformation (if possible) on the stack
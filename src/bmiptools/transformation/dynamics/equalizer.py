@@ -15,10 +15,10 @@ Plugin performing the equalization of the slices of a stack.
 
 import numpy as np
 from skimage.exposure import equalize_adapthist
-from joblib import Parallel,delayed
+from joblib import delayed
 
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 #############
@@ -75,21 +75,30 @@ class Equalizer(TransformationBasic):
 
             def func_to_par(x):
 
-                return equalize_adapthist(x,self.kernel_size,self.clip_limit,self.nbins)
+                return self._to_precision(equalize_adapthist(x,self.kernel_size,self.clip_limit,self.nbins))
 
-            eq_x = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(x[i,...])
-                                                          for i in self.vtqdm(range(len(x))))
+            eq_x = self.parallel(delayed(func_to_par)(x[i,...])
+                                 for i in self.vtqdm(range(len(x))))
 
         else:
 
             eq_x = []
             for i in range(len(x)):
 
-                eq_x.append(equalize_adapthist(x[i,...],self.kernel_size,self.clip_limit,self.nbins))
+                eq_x.append(self._to_precision(equalize_adapthist(x[i,...],self.kernel_size,self.clip_limit,
+                                                                  self.nbins)))
                 self.progress_bar(i,len(x),15,'{}/{}'.format(i+1,len(x)))
 
         return np.array(eq_x)
 
+    def _is_slice_local(self):
+        """
+        The equalization (CLAHE) is always slice-local.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return True
+
     def transform(self,x,inplace=True):
         """
         Apply the initialized transformation.
@@ -110,7 +119,7 @@ class Equalizer(TransformationBasic):
 
                 return np.array(hm_x).transpose((1,2,3,0))
 
-            x.from_array(np.array(hm_x).transpose((1,2,3,0)))
+            x.from_array(np.array(hm_x).transpose((1,2,3,0)),copy=False)
 
         else:
 
@@ -118,4 +127,4 @@ class Equalizer(TransformationBasic):
 
                 return self._equalize(x.data)
 
-            x.from_array( self._equalize(x.data) )
\ No newline at end of file
+            x.from_array( self._equalize(x.data),copy=False )
\ No newline at end of file
@@ -20,7 +20,7 @@ import numpy as np
 from skimage.exposure import match_histograms
 
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 #############
@@ -63,14 +63,14 @@ class HistogramMatcher(TransformationBasic):
         hm_x = [ x[self.reference_slice,...] ]
         for i in range(1,self.reference_slice):
 
-            hm_x.append(match_histograms(x[self.reference_slice-i,...],hm_x[i-1]))
+            hm_x.append(self._to_precision(match_histograms(x[self.reference_slice-i,...],hm_x[i-1])))
             self.progress_bar(len(hm_x)-1,len(x),15,'{}/{}'.format(len(hm_x)-1,len(x)))
 
         hm_x = list(reversed(hm_x))
         self.progress_bar(len(hm_x),len(x),15,'{}/{}'.format(len(hm_x),len(x)))
         for i in range(self.reference_slice+1,len(x)):
 
-            hm_x.append( match_histograms(x[i,...],hm_x[i-1]) )
+            hm_x.append( self._to_precision(match_histograms(x[i,...],hm_x[i-1])) )
             self.progress_bar(len(hm_x),len(x),15,'{}/{}'.format(len(hm_x),len(x)))
 
         return np.array(hm_x)
@@ -95,7 +95,7 @@ class HistogramMatcher(TransformationBasic):
 
                 return np.array(hm_x).transpose((1,2,3,0))
 
-            x.from_array(np.array(hm_x).transpose((1,2,3,0)))
+            x.from_array(np.array(hm_x).transpose((1,2,3,0)),copy=False)
 
         else:
 
@@ -103,4 +103,4 @@ class HistogramMatcher(TransformationBasic):
 
                 return self._match_histogram(x.data)
 
-            x.from_array( self._match_histogram(x.data) )
\ No newline at end of file
+            x.from_array( self._match_histogram(x.data),copy=False )
\ No newline at end of file
@@ -18,7 +18,7 @@ import numpy as np
 import bmiptools.core.ip_utils as iput
 import bmiptools.core.utils as ut
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 #############
@@ -86,6 +86,14 @@ class Standardizer(TransformationBasic):
             self._mode = 'z'
 
 
+    def _is_slice_local(self):
+        """
+        The standardization is slice-local in 'slice-by-slice' mode.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return self.standardization_mode == 'slice-by-slice'
+
     def transform(self,x,inplace=True):
         """
         Apply the initialized transformation.
@@ -100,7 +108,7 @@ class Standardizer(TransformationBasic):
             standardized_x = []
             for C in range(x.n_channels):
 
-                standardized_x.append( iput.standardizer(x.data[...,C],
+                standardized_x.append( iput.standardizer(self._to_precision(x.data[...,C]),
                                                          type=self.standardization_type,
                                                          mode=self._mode) )
 
@@ -111,17 +119,17 @@ class Standardizer(TransformationBasic):
             x.temporary_library_metadata.update({'Standardizer':{'standardization_type': self.standardization_type,
                                                                  'standardization_mode': self.standardization_mode,
                                                                  'pre_standardization_statistics': x.statistics()}})
-            x.from_array( np.array(standardized_x).transpose((1,2,3,0)) )
+            x.from_array( np.array(standardized_x).transpose((1,2,3,0)),copy=False )
 
         else:
 
             if not inplace:
 
-                return iput.standardizer(x.data,
+                return iput.standardizer(self._to_precision(x.data),
                                          type=self.standardization_type,
                                          mode=self._mode)
 
             x.temporary_library_metadata.update({'Standardizer':{'standardization_type': self.standardization_type,
                                                                  'standardization_mode': self.standardization_mode,
                                                                  'pre_standardization_statistics': x.statistics()}})
-            x.from_array( iput.standardizer(x,type=self.standardization_type) )
\ No newline at end of file
+            x.from_array( iput.standardizer(self._to_precision(x.data),type=self.standardization_type),copy=False )
\ No newline at end of file
@@ -24,7 +24,7 @@ import scipy.ndimage as spnd
 
 from bmiptools.core import math_utils as mut
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 ###############
@@ -140,6 +140,7 @@ class Affine(TransformationBasic):
 
         :param transformation_dictionary: dictionary containing all the transformation options.
         """
+        super(Affine,self).__init__()
         self.transformation_dictionary = transformation_dictionary
         self.reference_frame_origin = transformation_dictionary['reference_frame_origin']
         if transformation_dictionary['apply'] == 'translation':
@@ -407,6 +408,57 @@ class Affine(TransformationBasic):
                      transformed_z_max-transformed_z_min)
         return new_shape
 
+    @classmethod
+    def _memory_footprint(cls,shape,dtype,precision,plugin=None):
+        """
+        Estimate the memory needed to apply the affine transformation to a stack of given shape and data type. Beside
+        the (eventually padded) volume to transform, the transformation keeps in memory the three integer coordinate
+        arrays of the mesh, the homogeneous coordinates (built in double precision and then converted) and their
+        transformed copy, i.e. about 11 numbers per voxel of the final volume.
+
+        :param shape: (tuple) shape of the input stack, in the ZYX convention.
+        :param dtype: data type of the input stack.
+        :param precision: (numpy dtype) floating point precision of the library (see the 'precision' global setting).
+        :param plugin: (Affine or None) initialized plugin, used to compute the final shape of the transformed stack.
+                       If None, the transformation is assumed to leave the stack shape unchanged.
+        :return: (tuple, numpy dtype, int) shape and data type of the transformed stack, and peak memory (in bytes)
+                 needed during the transformation, input stack included.
+        """
+        volume_shape = tuple(shape[:3])[::-1]                           # xyz-convention used in the transformation
+        final_shape = volume_shape
+        if plugin is not None:
+
+            try:
+
+                dir_affine_transformation_matrix = np.linalg.inv(plugin.inv_affine_transformation_matrix)
+                inferred_final_shape = plugin._infer_final_shape(np.broadcast_to(np.uint8(0),volume_shape),
+                                                                 dir_affine_transformation_matrix)
+                final_shape = tuple(np.max([list(volume_shape),list(inferred_final_shape)],axis=0))
+
+            except np.linalg.LinAlgError:
+
+                final_shape = volume_shape
+
+        n_voxels = int(np.prod(final_shape))
+        precision_size = np.dtype(precision).itemsize
+        input_bytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        padded_bytes = 0
+        output_dtype = np.dtype(dtype)
+        if final_shape != volume_shape:
+
+            padded_bytes = n_voxels*precision_size
+            output_dtype = np.dtype(precision)
+
+        mesh_bytes = 3*n_voxels*8
+        vstack_bytes = 4*n_voxels*8 + n_voxels*8                        # double precision stack + column of ones
+        if precision_size != 8:
+
+            vstack_bytes = vstack_bytes + 4*n_voxels*precision_size
+
+        mapping_bytes = 2*4*n_voxels*precision_size + n_voxels*output_dtype.itemsize
+        peak_bytes = input_bytes + padded_bytes + mesh_bytes + max(vstack_bytes,mapping_bytes)
+        return tuple(final_shape)[::-1], output_dtype, peak_bytes
+
     # apply transformation
     def transform(self,x,inplace=True):
         """
@@ -442,7 +494,7 @@ class Affine(TransformationBasic):
 
         else:
 
-            to_transform = np.zeros(final_shape)
+            to_transform = np.zeros(final_shape,dtype=self._precision)
             delta_x, delta_y, delta_z = np.abs(np.array(final_shape) - np.array(volume.shape)) // 2
             to_transform[delta_x:delta_x + volume.shape[0],
                          delta_y:delta_y + volume.shape[1],
@@ -458,17 +510,18 @@ class Affine(TransformationBasic):
 
         M = np.dot(self.To_inv,np.dot(self.inv_affine_transformation_matrix,self.To))
 
-        # get the mesh of coordinates to transform
-        Xs, Ys, Zs = np.meshgrid(np.arange(final_shape[0]),
-                                 np.arange(final_shape[1]),
-                                 np.arange(final_shape[2]), indexing='ij')
-
-        Xs, Ys, Zs = Xs.reshape(-1), Ys.reshape(-1), Zs.reshape(-1)
-        hom_coords = np.vstack((Xs, Ys, Zs, np.ones(len(Xs))))
+        # get the mesh of homogeneous coordinates to transform (filled directly in the chosen precision)
+        hom_coords = np.empty((4,int(np.prod(final_shape))),dtype=self._precision)
+        coords_mesh = hom_coords[:3].reshape((3,)+tuple(final_shape))
+        coords_mesh[0] = np.arange(final_shape[0],dtype=self._precision)[:,np.newaxis,np.newaxis]
+        coords_mesh[1] = np.arange(final_shape[1],dtype=self._precision)[np.newaxis,:,np.newaxis]
+        coords_mesh[2] = np.arange(final_shape[2],dtype=self._precision)[np.newaxis,np.newaxis,:]
+        hom_coords[3] = 1
+        coords_mesh = None
 
         # compute the transformed coordinates (with respect to the coordinates of the input)
-        transformed_hom_coords = np.dot(M, hom_coords)
-        transformed_coords = transformed_hom_coords[:3, :]
+        transformed_coords = np.dot(M[:3].astype(self._precision), hom_coords)
+        hom_coords = None                           # free RAM
 
         # compute the transformed volume
         transformed_volume = spnd.map_coordinates(to_transform, transformed_coords)
@@ -478,4 +531,4 @@ class Affine(TransformationBasic):
 
             return transformed_volume.transpose(2,1,0)
 
-        x.from_array( transformed_volume.transpose(2,1,0) )
\ No newline at end of file
+        x.from_array( transformed_volume.transpose(2,1,0),copy=False )
\ No newline at end of file
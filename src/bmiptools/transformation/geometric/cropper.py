@@ -16,7 +16,7 @@ Plugin performing the cropping of a stack.
 import numpy as np
 
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 #############
@@ -69,6 +69,52 @@ class Cropper(TransformationBasic):
         self.y_range = transfomation_dictionary['y_range']
         self.x_range = transfomation_dictionary['x_range']
 
+    def _is_slice_local(self):
+        """
+        The crop is slice-local when the stack is cropped only in the yx-plane.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return list(self.z_range) in [[None,None],[0,None]]
+
+    @classmethod
+    def _memory_footprint(cls,shape,dtype,precision,plugin=None):
+        """
+        Estimate the memory needed to crop a stack of given shape and data type. For single channel stacks the cropped
+        stack is a view of the input, while for multichannel stacks the channels are stacked in a new array, which is
+        then copied by the channel-last transposition.
+
+        :param shape: (tuple) shape of the input stack, in the ZYX(C) convention.
+        :param dtype: data type of the input stack.
+        :param precision: (numpy dtype) floating point precision of the library (not used by this plugin).
+        :param plugin: (Cropper or None) initialized plugin, used to compute the shape of the cropped stack. If None,
+                       the crop is assumed to leave the stack shape unchanged.
+        :return: (tuple, numpy dtype, int) shape and data type of the cropped stack, and peak memory (in bytes) needed
+                 during the transformation, input stack included.
+        """
+        output_shape = tuple(shape)
+        if plugin is not None:
+
+            try:
+
+                output_shape = tuple([len(range(n)[slice(*r)]) for n,r in zip(shape[:3],[plugin.z_range,
+                                                                                         plugin.y_range,
+                                                                                         plugin.x_range])])
+                output_shape = output_shape + tuple(shape[3:])
+
+            except (TypeError,ValueError):
+
+                output_shape = tuple(shape)
+
+        input_bytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        output_bytes = int(np.prod(output_shape))*np.dtype(dtype).itemsize
+        peak_bytes = input_bytes
+        if len(shape) == 4:
+
+            peak_bytes = peak_bytes + 2*output_bytes
+
+        return output_shape, np.dtype(dtype), peak_bytes
+
     def transform(self,x,inplace=True):
         """
         Apply the initialized transformation.
@@ -91,7 +137,7 @@ class Cropper(TransformationBasic):
 
                 return np.array(cropped_x).transpose((1,2,3,0))
 
-            x.from_array( np.array(cropped_x).transpose((1,2,3,0)) )
+            x.from_array( np.array(cropped_x).transpose((1,2,3,0)),copy=False )
 
         else:
 
@@ -19,13 +19,13 @@ from skimage.morphology import reconstruction
 from scipy.ndimage.morphology import binary_fill_holes,binary_dilation
 from skimage.measure import label,regionprops
 from skimage.restoration import rolling_ball
-from joblib import Parallel,delayed
+from joblib import delayed
 
 from bmiptools.transformation.basic.filters import gaussian_filter2d
 from bmiptools.core.ip_utils import standardizer
 from bmiptools.transformation.base import TransformationBasic
 from bmiptools.transformation.restoration._restoration_shared import generate_parameter_space
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 
 ###############
@@ -456,7 +456,7 @@ class Decharger(TransformationBasic):
 
                 return fmask
 
-            Parallel(n_jobs=self._n_available_cpu,require='sharedmem')(delayed(func_to_par)(p,fmask) for p in props)
+            self.parallel((delayed(func_to_par)(p,fmask) for p in props),require='sharedmem')
 
         else:
 
@@ -556,6 +556,14 @@ class Decharger(TransformationBasic):
             self.write('Error: unrecognized decharger. The available decharger are listed '
                        'below \n{}'.format(self.available_decharger))
 
+    def _is_slice_local(self):
+        """
+        The decharging is slice-local when the plugin is not fitted during the transformation.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return not (self.fit_enable and self.auto_optimize)
+
     def transform(self,x,inplace=True,*args,**kwargs):
         """
         Apply the initialized transformation.
@@ -578,25 +586,25 @@ class Decharger(TransformationBasic):
                 x_transformed_C = []
                 for z in range(x.n_slices):
 
-                    x_transformed_C.append(decharger(x.data[z,:,:,C]))
+                    x_transformed_C.append(self._to_precision(decharger(x.data[z,:,:,C])))
 
                 x_transformed.append(np.array(x_transformed_C))
 
             if not inplace:
 
-                return np.array(x_transformed).traspose((1,2,3,0))
+                return np.array(x_transformed).transpose((1,2,3,0))
 
-            x.from_array(np.array(x_transformed).traspose((1,2,3,0)))
+            x.from_array(np.array(x_transformed).transpose((1,2,3,0)),copy=False)
 
         else:
 
             x_transformed = []
             for z in range(x.n_slices):
 
-                x_transformed.append(decharger(x.data[z,...]))
+                x_transformed.append(self._to_precision(decharger(x.data[z,...])))
 
             if not inplace:
 
                 return np.array(x_transformed)
 
-            x.from_array(np.array(x_transformed))
\ No newline at end of file
+            x.from_array(np.array(x_transformed),copy=False)
\ No newline at end of file
@@ -58,17 +58,15 @@ import warnings
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '1'    # suppress INFO messages from tensorflow
 
-from skimage import img_as_float
+from skimage import img_as_float,img_as_float32
 from skimage.restoration import denoise_wavelet,estimate_sigma,calibrate_denoiser,denoise_tv_bregman,\
     denoise_nl_means,denoise_bilateral,denoise_tv_chambolle
-from joblib import Parallel,delayed
-from n2v.models import N2VConfig, N2V
-from n2v.internals.N2V_DataGenerator import N2V_DataGenerator
+from joblib import delayed
 
 import bmiptools
 import bmiptools.core.utils as ut
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 
 ####
 
@@ -565,7 +563,7 @@ class Denoiser(TransformationBasic):
                 for C in range(x.n_channels):
 
                     tmp = self._available_denoiser[self.filter_to_use](x.data[i,...,C],**self.filter_params)
-                    transformed_x_per_C.append(tmp)
+                    transformed_x_per_C.append(self._to_precision(tmp))
 
                 transformed_x.append(transformed_x_per_C)
 
@@ -576,8 +574,8 @@ class Denoiser(TransformationBasic):
             for i in range(len(x)):
 
                 tmp = self._available_denoiser[self.filter_to_use](x.data[i,...],**self.filter_params)
+                transformed_x.append(self._to_precision(tmp))
 
-            transformed_x.append(tmp)
             return np.array(transformed_x)
 
     def _filter_stack_parallel(self, x):
@@ -593,21 +591,30 @@ class Denoiser(TransformationBasic):
             function to parallelize
             """
             denoised_slice = self._available_denoiser[self.filter_to_use](slice,**self.filter_params)
-            return denoised_slice
+            return self._to_precision(denoised_slice)
 
         if x.n_channels > 1:
 
             transformed_volume = []
             for C in range(x.n_channels):
 
-                transformed_volume_C = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(slice) for slice in x.data[...,C])
+                transformed_volume_C = self.parallel(delayed(func_to_par)(slice) for slice in x.data[...,C])
                 transformed_volume.append(transformed_volume_C)
 
             return np.array(transformed_volume).transpose((1,2,3,0))
 
-        transformed_volume = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(slice) for slice in x.data)
+        transformed_volume = self.parallel(delayed(func_to_par)(slice) for slice in x.data)
         return np.array(transformed_volume)
 
+    def _is_slice_local(self):
+        """
+        The denoising is slice-local when the plugin is not fitted during the transformation and a 2D filter
+        (i.e. not a Noise2Void model) is used.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return not (self.fit_enable and self.auto_optimize) and not self.filter_to_use in ['n2v_2d','n2v_3d']
+
     def transform(self,x,inplace=True):
         """
         Apply the initialized transformation.
@@ -630,7 +637,7 @@ class Denoiser(TransformationBasic):
 
                     return self._filter_stack_parallel(x)
 
-                x.from_array(self._filter_stack_parallel(x))
+                x.from_array(self._filter_stack_parallel(x),copy=False)
 
             else:
 
@@ -638,7 +645,7 @@ class Denoiser(TransformationBasic):
 
                     return self._filter_stack_serial(x)
 
-                x.from_array(self._filter_stack_serial(x))
+                x.from_array(self._filter_stack_serial(x),copy=False)
 
         else:
 
@@ -648,7 +655,7 @@ class Denoiser(TransformationBasic):
 
                     return self._filter_n2v_2d_stack(x)
 
-                x.from_array(self._filter_n2v_2d_stack(x))
+                x.from_array(self._filter_n2v_2d_stack(x),copy=False)
 
             else:
 
@@ -656,7 +663,7 @@ class Denoiser(TransformationBasic):
 
                     return self._filter_n2v_3d_stack(x)
 
-                x.from_array(self._filter_n2v_3d_stack(x))
+                x.from_array(self._filter_n2v_3d_stack(x),copy=False)
 
 
 class DenoiserDNN(TransformationBasic):
@@ -1020,6 +1027,8 @@ class DenoiserDNN(TransformationBasic):
 
                 self.filter_params = {item[0]: item[1] for item in self.filter_params}
 
+            # n2v (hence tensorflow) is imported only when a n2v model is actually used
+            from n2v.models import N2V
             if self.filter_to_use == 'n2v_2d':
 
                 self._n2v_Ndims = 2
@@ -1128,6 +1137,20 @@ class DenoiserDNN(TransformationBasic):
 
                     warnings.warn('Failed to delete folder {}. Reason: {}'.format(dir_path, e))
 
+    def _img_as_float(self,x):
+        """
+        Convert an image to floating point format, with the floating point precision of the library (see the
+        'precision' global setting).
+
+        :param x: (ndarray) image to convert.
+        :return: (ndarray) the converted image.
+        """
+        if self._precision == np.float32:
+
+            return img_as_float32(x)
+
+        return img_as_float(x)
+
     def _Jinvariance_n2v_optimization(self,x,parameter_space,vol_for_Jinv_fit):
         """
         J-invariant optimization routine for the n2v models.
@@ -1136,6 +1159,9 @@ class DenoiserDNN(TransformationBasic):
         :param parameter_space: (dict) dictionary containing the parameter space;
         :param vol_for_Jinv_fit: (ndarray) data used for J-invariant loss evaluation.
         """
+        # n2v (hence tensorflow) is imported only when a n2v model is actually used
+        from n2v.models import N2VConfig,N2V
+        from n2v.internals.N2V_DataGenerator import N2V_DataGenerator
         datagen = N2V_DataGenerator()
         params_space,params_name = generate_parameter_space(parameter_space)
         self.write('Number of parameter combination tested: {}'.format(len(params_space)))
@@ -1143,12 +1169,12 @@ class DenoiserDNN(TransformationBasic):
 
         if self._n2v_Ndims == 2:
 
-            slices_train = img_as_float(np.expand_dims(x[1::self.fit_step],axis=-1))
-            slices_test = img_as_float(np.expand_dims(x[::4*self.fit_step],axis=-1))
+            slices_train = self._img_as_float(np.expand_dims(x[1::self.fit_step],axis=-1))
+            slices_test = self._img_as_float(np.expand_dims(x[::4*self.fit_step],axis=-1))
 
         else:
 
-            slices_train = img_as_float(np.expand_dims(x,axis=(0,-1)))
+            slices_train = self._img_as_float(np.expand_dims(x,axis=(0,-1)))
             slices_test = slices_train
 
         n2v_models = []
@@ -1295,6 +1321,9 @@ class DenoiserDNN(TransformationBasic):
         :param x: (ndarray) data on which the model is fitted.
         :param filter_param: (dict) dictionary model parameters for the initialization of n2v models.
         """
+        # n2v (hence tensorflow) is imported only when a n2v model is actually used
+        from n2v.models import N2VConfig,N2V
+        from n2v.internals.N2V_DataGenerator import N2V_DataGenerator
         fit_step = int(len(x)*0.1)
         if fit_step == 0:
 
@@ -1325,7 +1354,7 @@ class DenoiserDNN(TransformationBasic):
         transformed_vol = []
         for slice in x:
 
-            transformed_vol.append(self.n2v_model.predict(img_as_float(slice),axes=self._n2v_axes))
+            transformed_vol.append(self.n2v_model.predict(self._img_as_float(slice),axes=self._n2v_axes))
 
         return np.array(transformed_vol)
 
@@ -1336,10 +1365,13 @@ class DenoiserDNN(TransformationBasic):
         :param x: (ndarray) data on which the model is fitted.
         :param filter_param: (dict) dictionary model parameters for the initialization of n2v models.
         """
+        # n2v (hence tensorflow) is imported only when a n2v model is actually used
+        from n2v.models import N2VConfig,N2V
+        from n2v.internals.N2V_DataGenerator import N2V_DataGenerator
         test_fraction = (x.shape[0]//self.fit_step)/x.shape[0]
         z_split = np.maximum(1,int(x.shape[0]*(1-test_fraction)))
-        vol_train = img_as_float(np.expand_dims(x[:z_split,...],axis=(0,-1)))
-        vol_test = img_as_float(np.expand_dims(x[z_split:,...],axis=(0,-1)))
+        vol_train = self._img_as_float(np.expand_dims(x[:z_split,...],axis=(0,-1)))
+        vol_test = self._img_as_float(np.expand_dims(x[z_split:,...],axis=(0,-1)))
 
         patch_shape = filter_param['n2v_patch_shape']
         datagen = N2V_DataGenerator()
@@ -1361,7 +1393,7 @@ class DenoiserDNN(TransformationBasic):
             self.n2v_model = self._fit_n2v_3d_model(x,self.filter_params)
             self._fitted_n2v = True
 
-        transformed_vol = self.n2v_model.predict(img_as_float(x.data),axes=self._n2v_axes)
+        transformed_vol = self.n2v_model.predict(self._img_as_float(x.data),axes=self._n2v_axes)
         return np.array(transformed_vol)
 
     def transform(self,x,inplace=True):
@@ -1387,7 +1419,7 @@ class DenoiserDNN(TransformationBasic):
 
                 return self._filter_n2v_2d_stack(x)
 
-            x.from_array(self._filter_n2v_2d_stack(x))
+            x.from_array(self._filter_n2v_2d_stack(x),copy=False)
 
         else:
 
@@ -1395,7 +1427,7 @@ class DenoiserDNN(TransformationBasic):
 
                 return self._filter_n2v_3d_stack(x)
 
-            x.from_array(self._filter_n2v_3d_stack(x))
+            x.from_array(self._filter_n2v_3d_stack(x),copy=False)
 
     def save(self,path = None):
         """
@@ -36,11 +36,11 @@ Plugin for the removal of the stripe artifacts, typical of FIB-SEM images.
 import numpy as np
 from scipy import fftpack
 import pywt
-from joblib import Parallel,delayed
+from joblib import delayed
 from skimage.exposure import match_histograms
 
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 from bmiptools.transformation.restoration._restoration_shared import SUPPORTED_WAVELET,SUPPORTED_WAVELET_FAMILIES
 
 
@@ -494,7 +494,7 @@ class Destriper(TransformationBasic):
         self.write('Optimization method: grid search')
         self.write('Total number of parameters combinations: {}'.format(len(parameter_space)))
         self.write('Optimization mode: parallel')
-        Ls = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(el) for el in self.vtqdm(parameter_space))
+        Ls = self.parallel(delayed(func_to_par)(el) for el in self.vtqdm(parameter_space))
         return parameter_space,Ls
 
     def fit(self,x):
@@ -592,7 +592,7 @@ class Destriper(TransformationBasic):
 
                         corrected_slice = match_histograms(corrected_slice,slice)
 
-                    transformed_volume_C.append(corrected_slice)
+                    transformed_volume_C.append(self._to_precision(corrected_slice))
 
                 transformed_volume.append(transformed_volume_C)
 
@@ -606,7 +606,7 @@ class Destriper(TransformationBasic):
 
                 corrected_slice = match_histograms(corrected_slice,slice)
 
-            transformed_volume.append(corrected_slice)
+            transformed_volume.append(self._to_precision(corrected_slice))
 
         return np.array(transformed_volume)
 
@@ -627,21 +627,29 @@ class Destriper(TransformationBasic):
 
                 corrected_slice = match_histograms(corrected_slice,slice)
 
-            return corrected_slice
+            return self._to_precision(corrected_slice)
 
         if x.n_channels > 1:
 
             transformed_volume = []
             for C in self.vtqdm(range(x.n_channels)):
 
-                transformed_volume_C = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(slice) for slice in self.vtqdm(x.data[...,C]))
+                transformed_volume_C = self.parallel(delayed(func_to_par)(slice) for slice in self.vtqdm(x.data[...,C]))
                 transformed_volume.append(transformed_volume_C)
 
             return np.array(transformed_volume).transpose((1,2,3,0))
 
-        transformed_volume = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(slice) for slice in self.vtqdm(x.data))
+        transformed_volume = self.parallel(delayed(func_to_par)(slice) for slice in self.vtqdm(x.data))
         return np.array(transformed_volume)
 
+    def _is_slice_local(self):
+        """
+        The destriping is slice-local when the plugin is not fitted during the transformation.
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return not (self.auto_optimize and self.fit_enable)
+
     def transform(self,x,inplace=True):
         """
         Apply the initialized transformation.
@@ -666,7 +674,7 @@ class Destriper(TransformationBasic):
 
                 return self._transform_parallel(x)
 
-            x.from_array(self._transform_parallel(x))
+            x.from_array(self._transform_parallel(x),copy=False)
 
         else:
 
@@ -674,4 +682,4 @@ class Destriper(TransformationBasic):
 
                 return self._transform_serial(x)
 
-            x.from_array(self._transform_serial(x))
+            x.from_array(self._transform_serial(x),copy=False)
@@ -27,11 +27,11 @@ import numpy as np
 import os
 import gc
 import warnings
-from joblib import Parallel,delayed
+from joblib import delayed
 
 import bmiptools
 from bmiptools.transformation.base import TransformationBasic
-from bmiptools.gui.gui_basic import GuiPI
+from bmiptools.gui.guipi import GuiPI
 from bmiptools.transformation.basic.filters import gaussian_filter2d
 
 
@@ -313,8 +313,8 @@ class Flatter(TransformationBasic):
 
                 try:
 
-                    Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(idx2,mp)
-                                                           for idx2 in range(1,len(sigmas)))
+                    self.parallel(delayed(func_to_par)(idx2,mp)
+                                  for idx2 in range(1,len(sigmas)))
 
                 except ValueError:
 
@@ -521,21 +521,24 @@ class Flatter(TransformationBasic):
                               'channels of the stack.'.format(x.n_channels,len(self.sigma_low_pass)))
                 self.sigma_low_pass = x.n_channels*[self.sigma_low_pass[0]]
 
+            slices_means = x.slices_means               # read before x.data is modified in place
             for C in range(x.n_channels):
 
                 # x.data[...,C] = x.data[...,C]-skfilt.gaussian(x.data[...,C],(0,self.sigma_low_pass[C],self.sigma_low_pass[C]),preserve_range=True)
                 x.data[...,C] = x.data[...,C]-gaussian_filter2d(x.data[...,C],self.sigma_low_pass[C])
 
-            return x.data+np.expand_dims(x.slices_means,axis=tuple(np.arange(-(len(x.shape)-1),0)))
+            return x.data+np.expand_dims(self._to_precision(slices_means),axis=tuple(np.arange(-(len(x.shape)-1),0)))
 
         else:
 
             x_transformed = []
             for z in range(x.shape[0]):
 
-                x_transformed.append( x.data[z,...]-gaussian_filter2d(x.data[z,...],self.sigma_low_pass) )
+                x_transformed.append( self._to_precision(x.data[z,...])-gaussian_filter2d(x.data[z,...],
+                                                                                          self.sigma_low_pass) )
 
-        return np.array(x_transformed)+np.expand_dims(x.slices_means,axis=tuple(np.arange(-(len(x.shape)-1),0)))
+        return np.array(x_transformed)+np.expand_dims(self._to_precision(x.slices_means),
+                                                      axis=tuple(np.arange(-(len(x.shape)-1),0)))
 
     def _transform_parallel(self,x):
         """
@@ -566,21 +569,32 @@ class Flatter(TransformationBasic):
                 def func_to_par(z):
 
                     # return x.data[z,:,:,C]-skfilt.gaussian(x.data[z,:,:,C],self.sigma_low_pass[C],preserve_range=True)
-                    return x.data[z,:,:,C]-gaussian_filter2d(x.data[z,:,:,C],self.sigma_low_pass[C])
+                    return self._to_precision(x.data[z,:,:,C])-gaussian_filter2d(x.data[z,:,:,C],self.sigma_low_pass[C])
 
-                x_transformed_C = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(z) for z in range(x.n_slices))
+                x_transformed_C = self.parallel(delayed(func_to_par)(z) for z in range(x.n_slices))
                 x_transformed.append(np.array(x_transformed_C))
 
-            return x_transformed.traspose((1,2,3,0))+np.expand_dims(x.slices_means,axis=tuple(np.arange(-(len(x.shape)),0)))
+            return x_transformed.traspose((1,2,3,0))+np.expand_dims(self._to_precision(x.slices_means),
+                                                                    axis=tuple(np.arange(-(len(x.shape)),0)))
 
         # parallelization on the slices
         def func_to_par(z):
 
             # return x.data[z,...]-skfilt.gaussian(x.data[z,...],self.sigma_low_pass,preserve_range=True)
-            return x.data[z,...]-gaussian_filter2d(x.data[z,...],self.sigma_low_pass)
+            return self._to_precision(x.data[z,...])-gaussian_filter2d(x.data[z,...],self.sigma_low_pass)
 
-        x_transformed = Parallel(n_jobs=self._n_available_cpu)(delayed(func_to_par)(z) for z in range(x.n_slices))
-        return np.array(x_transformed)+np.expand_dims(x.slices_means,axis=tuple(np.arange(-(len(x.shape)-1),0)))
+        x_transformed = self.parallel(delayed(func_to_par)(z) for z in range(x.n_slices))
+        return np.array(x_transformed)+np.expand_dims(self._to_precision(x.slices_means),
+                                                      axis=tuple(np.arange(-(len(x.shape)-1),0)))
+
+    def _is_slice_local(self):
+        """
+        The flattening is slice-local when the plugin is not auto-optimized (otherwise it is fitted during the
+        transformation).
+
+        :return: (bool) True if the plugin can be applied slab by slab.
+        """
+        return not self.auto_optimize
 
     def transform(self,x,inplace=True):
         """
@@ -607,7 +621,7 @@ class Flatter(TransformationBasic):
 
                 return self._transform_parallel(x)
 
-            x.from_array(self._transform_parallel(x))
+            x.from_array(self._transform_parallel(x),copy=False)
 
         else:       # serial transform
 
@@ -615,4 +629,4 @@ class Flatter(TransformationBasic):
 
                 return self._transform_serial(x)
 
-            x.from_array(self._transform_serial(x))
\ No newline at end of file
+            x.from_array(self._transform_serial(x),copy=False)
\ No newline at end of file
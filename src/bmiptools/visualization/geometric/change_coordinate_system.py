@@ -129,4 +129,4 @@ class ChangeCoordinateSystem(TransformationBasic):
         # otherwise save the volume in the stack
         volume = None # free RAM
         x.data = None # free RAM and empty stack
-        x.from_array( volume_in_new_coordinates )
\ No newline at end of file
+        x.from_array( volume_in_new_coordinates,copy=False )
\ No newline at end of file
@@ -16,6 +16,7 @@ import os
 import json
 import sys
 import pickle
+import shutil
 import numpy as np
 
 # random seed
@@ -154,6 +155,599 @@ class BmiptoolsTest(unittest.TestCase):
 
         print('...DONE!')
 
+    def test_stack_region_loading(self):
+
+        print('\nRunning region loading test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load a region of the stack
+        stack = Stack(load_metadata=False)
+        stack.load_stack_from_folder(test_data_path+os.sep+r'test_data/test_stack/stack',
+                                     z_range=[3,15],y_range=[5,-7],x_range=[None,30])
+
+        # tests
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        self.assertEqual(np.all(stack.data == stack_reference[3:15,5:-7,:30]),True,'Region loading failed!')
+
+        # load one slice every three
+        stack = Stack(path=test_data_path+os.sep+r'test_data/test_stack/stack',load_metadata=False,z_step=3)
+        self.assertEqual(np.all(stack.data == stack_reference[::3]),True,'Strided loading failed!')
+
+        print('...DONE!')
+
+    def test_stack_parallel_tiff_decoding(self):
+
+        print('\nRunning parallel multipage TIFF decoding test...')
+
+        # import necessary modules
+        import tifffile
+        from bmiptools.stack import Stack
+
+        # save multipage TIFF files (uncompressed, compressed and with grayscale RGB pages)
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        stack_paths = [test_data_path+os.sep+r'test_data/test_stack/multipage.tiff',
+                       test_data_path+os.sep+r'test_data/test_stack/multipage_zlib.tiff',
+                       test_data_path+os.sep+r'test_data/test_stack/multipage_rgb.tiff']
+        def save_multipage(path,data,**kwargs):
+
+            with tifffile.TiffWriter(path) as tif:
+
+                for page in data:
+
+                    tif.write(page,contiguous=False,**kwargs)
+
+        save_multipage(stack_paths[0],stack_reference)
+        save_multipage(stack_paths[1],stack_reference,compression='zlib')
+        save_multipage(stack_paths[2],np.repeat(stack_reference[...,np.newaxis],3,axis=-1),photometric='rgb')
+
+        # load them (all, a region and a list of slices) serially and with the pages decoded by several threads
+        def load_stack(path,use_multiprocessing,**kwargs):
+
+            stack = Stack(load_stack=False,load_metadata=False)
+            stack._use_multiprocessing = use_multiprocessing
+            stack._n_available_cpu = 3
+            if 'S' in kwargs:
+
+                stack.load_slices(path,**kwargs)
+
+            else:
+
+                stack.load_stack(path,**kwargs)
+
+            return stack.data
+
+        loading_settings = [({},stack_reference),
+                            ({'z_range': [2,17],'y_range': [5,-7],'x_range': [None,30]},stack_reference[2:17,5:-7,:30]),
+                            ({'S': [0,3,4,11,19]},stack_reference[[0,3,4,11,19]])]
+
+        # tests
+        for stack_path in stack_paths:
+
+            for loading_setting,expected_data in loading_settings:
+
+                serial_data = load_stack(stack_path,False,**loading_setting)
+                parallel_data = load_stack(stack_path,True,**loading_setting)
+                self.assertEqual(np.array_equal(parallel_data,serial_data),True,'Parallel TIFF decoding failed: '
+                                                                                'results differ from serial decoding!')
+                self.assertEqual(np.array_equal(parallel_data,expected_data),True,'Parallel TIFF decoding failed!')
+
+        # remove files created for the test
+        for stack_path in stack_paths:
+
+            os.remove(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_parallel_statistics(self):
+
+        print('\nRunning parallel blockwise statistics test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # compute the statistics of a grayscale and of a multichannel stack serially and with several threads
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        multichannel_reference = np.random.default_rng(0).normal(size=(11,30,40,3)).astype(np.float32)
+        def compute_statistics(arr,with_channel,use_multiprocessing):
+
+            stack = Stack()
+            stack._use_multiprocessing = use_multiprocessing
+            stack._n_available_cpu = 3
+            stack.from_array(arr,with_channel=with_channel)
+            return stack.statistics()
+
+        # tests
+        slices_axis = (1,2)                     # y and x axis of the slices
+        for arr,with_channel in [(stack_reference,False),(multichannel_reference,True)]:
+
+            serial_stats = compute_statistics(arr,with_channel,False)
+            parallel_stats = compute_statistics(arr,with_channel,True)
+            reference_stats = {'stack_mean': np.mean(arr,axis=(0,1,2)),
+                               'stack_std': np.std(arr,axis=(0,1,2),dtype=np.float64),
+                               'slices_means': np.mean(arr,axis=slices_axis).T,
+                               'slices_stds': np.std(arr,axis=slices_axis,dtype=np.float64).T,
+                               'min_stack': np.min(arr,axis=(0,1,2)),
+                               'max_stack': np.max(arr,axis=(0,1,2)),
+                               'min_slices': np.min(arr,axis=slices_axis).T,
+                               'max_slices': np.max(arr,axis=slices_axis).T}
+            for k in reference_stats.keys():
+
+                self.assertEqual(np.allclose(parallel_stats[k],serial_stats[k]),True,'Parallel blockwise statistics '
+                                                                                     'failed: results differ from '
+                                                                                     'serial computation!')
+                self.assertEqual(np.allclose(parallel_stats[k],reference_stats[k],rtol=1e-4,atol=1e-5),True,
+                                 'Parallel blockwise statistics failed!')
+
+        print('...DONE!')
+
+    def test_stack_parallel_folder_loading(self):
+
+        print('\nRunning parallel folder loading test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load the stack folder (all, a region, memory-mapped and fingerprinting the slices) serially and with the
+        # read-ahead thread and the pool of decoding threads
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/stack'
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        def load_stack(use_multiprocessing,loading_kwargs,**kwargs):
+
+            stack = Stack(load_stack=False,**kwargs)
+            stack._use_multiprocessing = use_multiprocessing
+            stack._n_available_cpu = 3
+            stack.load_stack_from_folder(stack_path,**loading_kwargs)
+            return stack
+
+        loading_settings = [({},{},stack_reference),
+                            ({'z_range': [3,15],'y_range': [5,-7],'x_range': [None,30]},{},
+                             stack_reference[3:15,5:-7,:30]),
+                            ({'z_step': 3},{'load_metadata': False},stack_reference[::3]),
+                            ({},{'load_metadata': False,'memory_map': True},stack_reference),
+                            ({},{'load_metadata': False,'fingerprint_on_loading': True},stack_reference),
+                            ({},{'load_metadata': False,'grayscale_check_once': True},stack_reference)]
+
+        # tests
+        for loading_kwargs,kwargs,expected_data in loading_settings:
+
+            serial_stack = load_stack(False,loading_kwargs,**kwargs)
+            parallel_stack = load_stack(True,loading_kwargs,**kwargs)
+            self.assertEqual(np.array_equal(parallel_stack.data,serial_stack.data),True,'Parallel folder loading '
+                                                                                        'failed: results differ from '
+                                                                                        'serial loading!')
+            self.assertEqual(np.array_equal(parallel_stack.data,expected_data),True,'Parallel folder loading failed!')
+            self.assertEqual(parallel_stack.metadata,serial_stack.metadata,'Parallel folder metadata loading failed!')
+            self.assertEqual(parallel_stack.fingerprint(),serial_stack.fingerprint(),'Parallel folder loading failed: '
+                                                                                     'fingerprints differ from serial '
+                                                                                     'loading!')
+            if kwargs.get('memory_map',False):
+
+                self.assertEqual(isinstance(parallel_stack.data,np.memmap),True,'Parallel memory-mapped folder '
+                                                                                 'loading failed!')
+
+        print('...DONE!')
+
+    def test_stack_views(self):
+
+        print('\nRunning stack views test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # adopt an array and take a view of the stack
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        arr = stack_reference.copy()
+        stack = Stack()
+        stack.from_array(arr,copy=False)
+        stack_view = stack.view(z_range=[2,10],y_range=[5,None])
+
+        # tests
+        self.assertEqual(np.shares_memory(stack.data,arr),True,'Array adoption failed!')
+        self.assertEqual(np.shares_memory(stack_view.data,arr),True,'Stack view creation failed!')
+        self.assertEqual(np.all(stack_view.data == stack_reference[2:10,5:]),True,'Stack view creation failed!')
+        self.assertEqual(stack_view.slices_means.tolist(),stack_reference[2:10,5:].mean(axis=(1,2)).tolist(),
+                         'Stack view statistics failed!')
+
+        print('...DONE!')
+
+    def test_stack_slabs(self):
+
+        print('\nRunning stack slabs test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # iterate over the slabs of an in-memory and of a file-backed stack and write them back
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        stack = Stack()
+        stack.from_array(stack_reference)
+        output_stack = Stack()
+        for slab in stack.slabs(slab_size=4,tile_shape=(20,30),halo=2):
+
+            output_stack.write_slab(slab,slab.stack.data+1)
+
+        file_stack = Stack(path=test_data_path+os.sep+r'test_data/test_stack/stack',load_stack=False,
+                           load_metadata=False)
+        file_output_stack = Stack()
+        for slab in file_stack.slabs(slab_size=7,halo=(1,0,0)):
+
+            file_output_stack.write_slab(slab,slab.stack)
+
+        # tests
+        self.assertEqual(np.all(output_stack.data == stack_reference+1),True,'Slab iteration failed!')
+        self.assertEqual(np.all(file_output_stack.data == stack_reference),True,'File-backed slab iteration failed!')
+
+        print('...DONE!')
+
+    def test_stack_fingerprint(self):
+
+        print('\nRunning stack fingerprint test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # compute the fingerprint during and after loading
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/stack'
+        stack = Stack(path=stack_path,load_metadata=False,fingerprint_on_loading=True)
+        stack_reference = Stack()
+        stack_reference.from_array(np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy'))
+        fingerprint = stack.fingerprint()
+
+        # modify one slice in-place
+        stack.data[4,0,0] += 1
+        modified_fingerprint = stack.fingerprint(changed_slices=[4])
+
+        # tests
+        self.assertEqual(fingerprint,stack_reference.fingerprint(),'Stack fingerprint computation failed!')
+        self.assertNotEqual(modified_fingerprint,fingerprint,'Stack fingerprint update failed!')
+        stack_reference.data[4,0,0] += 1
+        stack_reference._update_statistics()
+        self.assertEqual(modified_fingerprint,stack_reference.fingerprint(),'Stack fingerprint update failed!')
+
+        print('...DONE!')
+
+    def test_folder_index(self):
+
+        print('\nRunning folder index test...')
+
+        # import necessary modules
+        import bmiptools
+        import bmiptools.core.io_utils as iout
+
+        # index a copy of the test stack folder, then add a slice to it
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/indexed_stack'
+        shutil.copytree(test_data_path+os.sep+r'test_data/test_stack/stack',stack_path)
+        index = iout.index_folder(stack_path,'tiff',cache_folder=bmiptools.__folder_index_cache_path__)
+        cached_index = iout.index_folder(stack_path,'tiff',cache_folder=bmiptools.__folder_index_cache_path__)
+        shutil.copy(stack_path+os.sep+'name__slice_0000.tiff',stack_path+os.sep+'name__slice_100.tiff')
+        updated_index = iout.index_folder(stack_path,'tiff',cache_folder=bmiptools.__folder_index_cache_path__)
+
+        # tests
+        self.assertEqual([name for name,_,_ in index['files']],['name__slice_{:04d}.tiff'.format(n) for n in range(20)],
+                         'Folder indexing failed!')
+        self.assertEqual(index['first_slice'],{'shape': [50,50],'dtype': '|u1'},'Folder indexing failed!')
+        self.assertEqual(cached_index,index,'Folder index caching failed!')
+        self.assertEqual(updated_index['files'][-1][0],'name__slice_100.tiff','Folder index update failed!')
+
+        # remove files created for the test
+        shutil.rmtree(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_memory_map(self):
+
+        print('\nRunning memory-mapped stack test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load stack from folder and from npy file
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        stack = Stack(path=test_data_path+os.sep+r'test_data/test_stack/stack',
+                      from_folder=True,
+                      load_metadata=False,
+                      memory_map=True)
+        stack_npy = Stack(path=test_data_path+os.sep+r'test_data/test_stack/data.npy',
+                          from_folder=False,
+                          load_metadata=False,
+                          memory_map=True)
+
+        # tests
+        self.assertEqual(isinstance(stack.data,np.memmap),True,'Memory-mapped stack loading failed!')
+        self.assertEqual(np.all(stack.data == stack_reference),True,'Memory-mapped stack loading failed!')
+        self.assertEqual(np.all(stack_npy.data == stack_reference),True,'Memory-mapped stack loading from npy failed!')
+        with open(test_data_path+os.sep+r'test_data/test_stack/stats.json', 'r') as file:
+
+            stats_reference = json.load(file)
+
+        stats = stack.statistics()
+        for k in stats.keys():
+
+            self.assertEqual(np.allclose(stats[k],stats_reference[k]),True,'Memory-mapped stack statistics '
+                                                                              'computation failed!')
+
+        stack.from_array(stack.data[:,20:40,20:40])
+        self.assertEqual(isinstance(stack.data,np.memmap),True,'Memory-mapped stack update failed!')
+        self.assertEqual(np.all(stack.data == stack_reference[:,20:40,20:40]),True,'Memory-mapped stack update failed!')
+
+        # region of a compressed (i.e. not memory-mappable) TIFF
+        stack.from_array(stack_reference)
+        stack.save(saving_path=test_data_path,saving_name='mmap_region',mode='bigtiff',save_metadata=False)
+        stack_region = Stack(load_metadata=False,memory_map=True)
+        stack_region.load_stack(test_data_path+os.sep+'mmap_region.tiff',z_range=[2,18],y_range=[10,30],z_step=3)
+        self.assertEqual(np.all(stack_region.data == stack_reference[2:18:3,10:30,:]),True,'Memory-mapped region '
+                                                                                          'loading failed!')
+        os.remove(test_data_path+os.sep+'mmap_region.tiff')
+
+        print('...DONE!')
+
+    def test_stack_chunked_store(self):
+
+        print('\nRunning chunked store test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load stack and save it as chunked store
+        stack = Stack(path=test_data_path+os.sep+r'test_data/test_stack/stack',
+                      from_folder=True,
+                      load_metadata=False)
+        stack.save(saving_path=test_data_path+os.sep+r'test_data/test_stack',
+                   saving_name='chunked_stack',
+                   mode='chunked',
+                   chunk_shape=(8,16,16))
+
+        # load the whole chunked store and a region of it
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/chunked_stack'
+        loaded_stack = Stack(path=stack_path,load_metadata=False)
+        loaded_region = Stack()
+        loaded_region.load_chunked_store(stack_path,z_range=[5,-3],y_range=[10,40],x_range=[None,17])
+
+        # tests
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        self.assertEqual(np.all(loaded_stack.data == stack_reference),True,'Chunked store loading failed!')
+        self.assertEqual(np.all(loaded_region.data == stack_reference[5:-3,10:40,:17]),True,'Chunked store region '
+                                                                                            'loading failed!')
+
+        # remove files created for the test
+        shutil.rmtree(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_hdf5(self):
+
+        print('\nRunning HDF5 test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load stack and save it as HDF5 file
+        stack = Stack(path=test_data_path+os.sep+r'test_data/test_stack/stack',
+                      from_folder=True,
+                      load_metadata=False)
+        stack.save(saving_path=test_data_path+os.sep+r'test_data/test_stack',
+                   saving_name='hdf5_stack',
+                   mode='hdf5')
+
+        # load the whole HDF5 file and some slices of it
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/hdf5_stack.h5'
+        loaded_stack = Stack(path=stack_path,from_folder=False,load_metadata=False)
+        loaded_slices = Stack()
+        loaded_slices.load_slices(stack_path,[3,1])
+
+        # tests
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        self.assertEqual(np.all(loaded_stack.data == stack_reference),True,'HDF5 loading failed!')
+        self.assertEqual(np.all(loaded_slices.data == stack_reference[[3,1]]),True,'HDF5 slices loading failed!')
+
+        # remove files created for the test
+        os.remove(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_bigtiff(self):
+
+        print('\nRunning BigTIFF test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load stack and save it as compressed BigTIFF
+        stack = Stack(path=test_data_path+os.sep+r'test_data/test_stack/stack',
+                      from_folder=True,
+                      load_metadata=False)
+        stack.save(saving_path=test_data_path+os.sep+r'test_data/test_stack',
+                   saving_name='bigtiff_stack',
+                   mode='bigtiff',
+                   save_metadata=False)
+
+        # load the BigTIFF
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/bigtiff_stack.tiff'
+        loaded_stack = Stack(path=stack_path,from_folder=False,load_metadata=False)
+
+        # tests
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        self.assertEqual(np.all(loaded_stack.data == stack_reference),True,'BigTIFF saving/loading failed!')
+
+        # remove files created for the test
+        os.remove(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_pyramid(self):
+
+        print('\nRunning pyramid saving test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+        import bmiptools.core.io_utils as iout
+
+        # save the stack as chunked store with a multi-resolution pyramid
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        stack = Stack()
+        stack.from_array(stack_reference)
+        stack.save(saving_path=test_data_path+os.sep+r'test_data/test_stack',
+                   saving_name='pyramid_stack',
+                   mode='chunked',
+                   save_metadata=False,
+                   chunk_shape=(4,32,32),
+                   pyramid_levels=2,
+                   pyramid_z_binning=True)
+
+        # load the levels of the pyramid
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/pyramid_stack'
+        level_1 = Stack(path=stack_path+os.sep+'level_1',load_metadata=False)
+        level_2 = Stack(path=stack_path+os.sep+'level_2',load_metadata=False)
+
+        # tests
+        self.assertEqual(level_1.data.shape,(10,25,25),'Pyramid saving failed!')
+        self.assertEqual(np.all(level_1.data == iout.bin_array(stack_reference,(2,2,2))),True,'Pyramid saving failed!')
+        self.assertEqual(np.all(level_2.data == iout.bin_array(level_1.data,(2,2,2))),True,'Pyramid saving failed!')
+
+        # remove files created for the test
+        shutil.rmtree(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_standard_saving(self):
+
+        print('\nRunning standard saving test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # save a float stack as uint8 with standard saving
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        float_data = stack_reference.astype(np.float32)*0.5-3
+        stack = Stack()
+        stack.from_array(float_data)
+        stack.save(saving_path=test_data_path+os.sep+r'test_data/test_stack',
+                   saving_name='standard_stack',
+                   mode='hdf5',
+                   data_type=np.uint8,
+                   standard_saving=True,
+                   save_metadata=False)
+
+        # load the saved stack
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/standard_stack.h5'
+        loaded_stack = Stack(path=stack_path,from_folder=False,load_metadata=False)
+
+        # tests
+        expected_data = ((float_data-float_data.min())/(float_data.max()-float_data.min())*256).astype(np.uint8)
+        self.assertEqual(loaded_stack.data.dtype,np.uint8,'Standard saving failed!')
+        self.assertEqual(np.all(loaded_stack.data == expected_data),True,'Standard saving failed!')
+
+        # remove files created for the test
+        os.remove(stack_path)
+
+        print('...DONE!')
+
+    def test_stack_metadata_deduplication(self):
+
+        print('\nRunning metadata deduplication test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+
+        # load stack with full and deduplicated metadata
+        stack_path = test_data_path+os.sep+r'test_data/test_stack/stack'
+        stack = Stack(path=stack_path,from_folder=True)
+        deduplicated_stack = Stack(path=stack_path,from_folder=True,deduplicate_metadata=True)
+
+        # tests
+        for n in range(stack.n_slices):
+
+            slice_metadata = (stack.metadata['image_metadata']['slice_{}'.format(n)],
+                              stack.metadata['experimental_metadata']['slice_{}'.format(n)])
+            self.assertEqual(deduplicated_stack.slice_metadata(n),slice_metadata,'Metadata deduplication failed!')
+
+        # save slices with experimental metadata partially changing from slice to slice (written as the FIB-SEM
+        # microscopes do, i.e. many lines with non-ascii units of measure)
+        import tifffile
+        filler_lines = [line for k in range(300) for line in [b'AP_UNKNOWN_%d' % k,b'Unknown %d = 1 \xb5m' % k]]
+        metadata_folder = test_data_path+os.sep+r'test_data/test_stack/stack_with_metadata'
+        os.makedirs(metadata_folder,exist_ok=True)
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        for n in range(stack_reference.shape[0]):
+
+            experimental_setting = b'\r\n'.join([b'DP_OPTIMODE',b'Optimode = Analytic',
+                                                  b'DP_TRACK_Z','Track Z = {} \xb5m'.format(n % 3).encode('latin-1'),
+                                                  b'DP_FIXED_APERTURE',b'Fixed Aperture = Yes']+filler_lines+[b''])
+            tifffile.imwrite(metadata_folder+os.sep+'slice_{:03d}.tiff'.format(n),stack_reference[n],
+                             extratags=[(34118,'s',0,experimental_setting,False)])
+
+        # load them serially and with the threaded loader, with full and deduplicated metadata
+        stack = Stack(path=metadata_folder,from_folder=True)
+        threaded_stacks = []
+        for _ in range(5):
+
+            threaded_stack = Stack(load_stack=False,deduplicate_metadata=True)
+            threaded_stack._use_multiprocessing = True
+            threaded_stack._n_available_cpu = 4
+            threaded_stack.load_stack_from_folder(metadata_folder)
+            threaded_stacks.append(threaded_stack)
+
+        # compare the metadata of several slices with the same reference from several threads at once
+        import threading
+        import bmiptools
+        from bmiptools.stack import ExperimentalMetadataInspector
+        raw_experimental_settings = [[line.decode('latin-1') for line in experimental_setting.split(b'\n')]
+                                     for experimental_setting in [experimental_setting.replace(b'Yes',b'No'),
+                                                                  experimental_setting]]
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(10**-6)
+        threads_errors = []
+        for _ in range(30):
+
+            emi = ExperimentalMetadataInspector(bmiptools.__bmiptools_files_folder_path__+os.sep+
+                                                Stack._path_experimental_metadata_list)
+            barrier = threading.Barrier(4)
+            def compare_with_reference():
+
+                barrier.wait()
+                try:
+
+                    emi.read_metadata(raw_experimental_settings[1],raw_experimental_settings[0])
+
+                except Exception as e:
+
+                    threads_errors.append(e)
+
+            threads = [threading.Thread(target=compare_with_reference) for _ in range(4)]
+            for thread in threads:
+
+                thread.start()
+
+            for thread in threads:
+
+                thread.join()
+
+        sys.setswitchinterval(switch_interval)
+
+        # tests
+        self.assertEqual(threads_errors,[],'Metadata deduplication failed: reference not usable from several threads!')
+        self.assertEqual(stack.metadata['experimental_metadata']['slice_1']['DP_TRACK_Z']['value'],1.0,
+                         'Metadata deduplication failed: experimental metadata not loaded!')
+        for threaded_stack in threaded_stacks:
+
+            self.assertEqual(np.all(threaded_stack.data == stack.data),True,'Metadata deduplication failed: wrong '
+                                                                            'threaded loading!')
+            self.assertEqual(threaded_stack.metadata['experimental_metadata']['slice_1'].keys(),{'DP_TRACK_Z'},
+                             'Metadata deduplication failed: unchanged metadata not removed!')
+            for n in range(stack.n_slices):
+
+                slice_metadata = (stack.metadata['image_metadata']['slice_{}'.format(n)],
+                                  stack.metadata['experimental_metadata']['slice_{}'.format(n)])
+                self.assertEqual(threaded_stack.slice_metadata(n),slice_metadata,'Metadata deduplication failed with '
+                                                                                 'the threaded loader!')
+
+        # remove files created for the test
+        shutil.rmtree(metadata_folder)
+
+        print('...DONE!')
+
     def test_pipeline_create_initialize_save_load_compare(self):
 
         print('\nRunning pipeline test...')
@@ -210,6 +804,392 @@ class BmiptoolsTest(unittest.TestCase):
 
         print('...DONE!')
 
+    def test_pipeline_batch(self):
+
+        print('\nRunning pipeline batch test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+        from bmiptools.pipeline import Pipeline
+
+        # save two stacks to process
+        batch_folder = test_data_path+os.sep+r'test_data/test_pipeline/batch'
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        os.makedirs(batch_folder,exist_ok=True)
+        stack_paths = []
+        for n in range(2):
+
+            stack = Stack()
+            stack.from_array(stack_reference+n)
+            stack.save(saving_path=batch_folder,saving_name='stack_{}'.format(n),mode='hdf5',save_metadata=False)
+            stack_paths.append(batch_folder+os.sep+'stack_{}.h5'.format(n))
+
+        # create and initialize a pipeline cropping the stacks
+        pip = Pipeline(operations_list=['Cropper'],
+                       pipeline_folder_path=test_data_path+os.sep+r'test_data/test_pipeline',
+                       pipeline_name='test_batch',
+                       gui_mode=True)
+        pip.initialize()
+        pip.pipeline['Cropper_0'].z_range = [None,None]
+        pip.pipeline['Cropper_0'].y_range = [20,40]
+        pip.pipeline['Cropper_0'].x_range = [None,None]
+
+        # apply the pipeline serially and with the 'parallelize_pipeline' mode
+        loading_setting = {'from_folder': False,'load_metadata': False}
+        saving_setting = {'mode': 'hdf5','save_metadata': False}
+        serial_names = pip.apply_batch(stack_paths,batch_folder+os.sep+'serial',loading_setting,saving_setting)
+        pip._use_multiprocessing = True
+        pip._use_multiprocessing_type = 'parallelize_pipeline'
+        pip._n_available_cpu = 2
+        parallel_names = pip.apply_batch(stack_paths,batch_folder+os.sep+'parallel',loading_setting,saving_setting)
+
+        # apply the pipeline to two stacks having the same name
+        os.makedirs(batch_folder+os.sep+'duplicate',exist_ok=True)
+        shutil.copy(stack_paths[1],batch_folder+os.sep+'duplicate'+os.sep+'stack_0.h5')
+        pip._use_multiprocessing = False
+        duplicate_names = pip.apply_batch([stack_paths[0],batch_folder+os.sep+'duplicate'+os.sep+'stack_0.h5'],
+                                          batch_folder+os.sep+'duplicate_output',loading_setting,saving_setting)
+
+        # tests
+        self.assertEqual(serial_names,['stack_0','stack_1'],'Pipeline batch test failed: wrong saved stacks!')
+        self.assertEqual(parallel_names,serial_names,'Pipeline batch test failed: wrong saved stacks!')
+        self.assertEqual(duplicate_names,['stack_0__0','stack_0__1'],'Pipeline batch test failed: stacks with the '
+                                                                     'same name not disambiguated!')
+        for n,name in enumerate(duplicate_names):
+
+            result = Stack(path=batch_folder+os.sep+'duplicate_output'+os.sep+name+'.h5',from_folder=False,
+                           load_metadata=False)
+            self.assertEqual(np.all(result.data == (stack_reference+n)[:,20:40,:]),True,'Pipeline batch test failed: '
+                             'wrong result for stacks with the same name!')
+
+        for n,name in enumerate(serial_names):
+
+            for mode in ['serial','parallel']:
+
+                result = Stack(path=batch_folder+os.sep+mode+os.sep+name+'.h5',from_folder=False,load_metadata=False)
+                self.assertEqual(np.all(result.data == (stack_reference+n)[:,20:40,:]),True,'Pipeline batch test '
+                                 'failed: wrong result in {} mode!'.format(mode))
+
+        # remove files created for the test
+        shutil.rmtree(batch_folder)
+        shutil.rmtree(test_data_path+os.sep+r'test_data/test_pipeline/test_batch')
+
+        print('...DONE!')
+
+    def test_pipeline_streaming(self):
+
+        print('\nRunning pipeline streaming test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+        from bmiptools.pipeline import Pipeline
+
+        # apply the same pipeline to the whole stack and slab by slab
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        results = []
+        for slab_size in [None,3]:
+
+            pip = Pipeline(operations_list=['Standardizer','Flatter','Cropper','Standardizer'],
+                           pipeline_folder_path=test_data_path+os.sep+r'test_data/test_pipeline',
+                           pipeline_name='test_streaming',
+                           gui_mode=True)
+            pip.initialize()
+            pip.pipeline['Standardizer_0'].standardization_mode = 'slice-by-slice'
+            pip.pipeline['Flatter_1'].auto_optimize = False
+            pip.pipeline['Flatter_1'].sigma_low_pass = 10
+            pip.pipeline['Cropper_2'].z_range = [None,None]
+            pip.pipeline['Cropper_2'].y_range = [5,45]
+            pip.pipeline['Cropper_2'].x_range = [None,None]
+            pip.pipeline['Standardizer_3'].standardization_mode = 'stack'
+            stack = Stack()
+            stack.from_array(stack_reference)
+            pip.apply(stack,slab_size=slab_size)
+            results.append(stack)
+
+        # tests
+        self.assertEqual(results[1].shape,results[0].shape,'Pipeline streaming test failed: wrong shape!')
+        self.assertEqual(np.allclose(results[1].data,results[0].data),True,'Pipeline streaming test failed: results '
+                                                                            'differ from the standard application!')
+
+        # remove files created for the test
+        shutil.rmtree(test_data_path+os.sep+r'test_data/test_pipeline/test_streaming')
+
+        print('...DONE!')
+
+    def test_pipeline_cache(self):
+
+        print('\nRunning pipeline cache test...')
+
+        # import necessary modules
+        from bmiptools.stack import Stack
+        from bmiptools.pipeline import Pipeline
+
+        def apply_pipeline(sigma_low_pass,max_cache_size):
+
+            pip = Pipeline(operations_list=['Standardizer','Flatter'],
+                           pipeline_folder_path=test_data_path+os.sep+r'test_data/test_pipeline',
+                           pipeline_name='test_cache',
+                           gui_mode=True)
+            pip.initialize()
+            pip.pipeline['Flatter_1'].auto_optimize = False
+            pip.pipeline['Flatter_1'].sigma_low_pass = sigma_low_pass
+            pip.setup_cache(max_cache_size)
+            stack = Stack()
+            stack.from_array(np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy'))
+            pip.apply(stack)
+            return stack
+
+        # apply the pipeline with and without cache, changing the parameters of the last plugin
+        cache_folder = test_data_path+os.sep+r'test_data/test_pipeline/test_cache/cache'
+        apply_pipeline(10,10**9)
+        n_cached_steps = len(os.listdir(cache_folder))
+        cached_result = apply_pipeline(20,10**9)
+        n_cached_steps_after_change = len(os.listdir(cache_folder))
+        reference_result = apply_pipeline(20,None)
+        apply_pipeline(20,1)
+
+        # tests
+        self.assertEqual(n_cached_steps,4,'Pipeline cache test failed: wrong number of steps cached!')
+        self.assertEqual(n_cached_steps_after_change,6,'Pipeline cache test failed: unchanged steps cached again!')
+        self.assertEqual(np.allclose(cached_result.data,reference_result.data),True,'Pipeline cache test failed: '
+                         'results differ from the ones obtained without cache!')
+        self.assertEqual(len(os.listdir(cache_folder)),0,'Pipeline cache test failed: cache size cap not respected!')
+
+        # apply twice the same pipeline (with a plugin optimized during the fit), changing the parameters of the last
+        # plugin
+        pip = Pipeline(operations_list=['Standardizer','Flatter','Cropper'],
+                       pipeline_folder_path=test_data_path+os.sep+r'test_data/test_pipeline',
+                       pipeline_name='test_cache',
+                       gui_mode=True)
+        pip.initialize()
+        pip.pipeline['Flatter_1'].auto_optimize = True
+        pip.pipeline['Cropper_2'].z_range = [None,None]
+        pip.pipeline['Cropper_2'].y_range = [5,45]
+        pip.pipeline['Cropper_2'].x_range = [None,None]
+        pip.setup_cache(10**9)
+        stack = Stack()
+        stack.from_array(np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy'))
+        pip.apply(stack)
+        n_cached_steps_first_run = len(os.listdir(cache_folder))
+        pip.pipeline['Cropper_2'].y_range = [10,40]
+        stack = Stack()
+        stack.from_array(np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy'))
+        pip.apply(stack)
+
+        # tests
+        self.assertEqual(len(os.listdir(cache_folder))-n_cached_steps_first_run,2,'Pipeline cache test failed: steps '
+                         'before the changed plugin not found in the cache when the same pipeline is applied again!')
+        self.assertEqual(stack.data.shape[1],30,'Pipeline cache test failed: changed plugin not applied!')
+
+        # remove files created for the test
+        shutil.rmtree(test_data_path+os.sep+r'test_data/test_pipeline/test_cache')
+
+        print('...DONE!')
+
+    def test_pipeline_performance_report(self):
+
+        print('\nRunning pipeline performance report test...')
+
+        # import necessary modules
+        import time
+        from bmiptools.stack import Stack
+        from bmiptools.pipeline import Pipeline
+        from bmiptools.core.base import CoreBasic
+        from bmiptools.core.perf_utils import PerformanceRecorder,current_rss
+
+        # apply a pipeline saving performance report and timeline
+        pip = Pipeline(operations_list=['Standardizer','Flatter'],
+                       pipeline_folder_path=test_data_path+os.sep+r'test_data/test_pipeline',
+                       pipeline_name='test_performance',
+                       gui_mode=True)
+        pip.initialize()
+        pip.pipeline['Flatter_1'].auto_optimize = False
+        pip.pipeline['Flatter_1'].sigma_low_pass = 10
+        pip.pipeline['Flatter_1']._use_multiprocessing = True             # record the tasks of the workers
+        pip.pipeline['Flatter_1']._use_multiprocessing_type = 'parallelize_plugin'
+        pip.pipeline['Flatter_1']._n_available_cpu = 2
+        pip.setup_performance_report(save_report=True,save_trace=True)
+        stack = Stack()
+        stack.from_array(np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy'))
+        pip.apply(stack)
+
+        # tests
+        pipeline_folder = test_data_path+os.sep+r'test_data/test_pipeline/test_performance'
+        with open(pipeline_folder+os.sep+'pipeline_report__test_performance.json','r') as jfile:
+
+            report = json.load(jfile)
+
+        with open(pipeline_folder+os.sep+'pipeline_trace__test_performance.json','r') as jfile:
+
+            trace = json.load(jfile)
+
+        self.assertEqual([step['name'] for step in report['steps']],pip.true_operations_list,'Pipeline performance '
+                         'report test failed: wrong steps recorded!')
+        self.assertEqual(report['steps'][1]['n_slices'],stack.n_slices,'Pipeline performance report test failed: '
+                                                                        'wrong number of slices!')
+        self.assertEqual(set(pip.true_operations_list) <= set([event['name'] for event in trace['traceEvents']]),True,
+                         'Pipeline performance report test failed: steps missing in the timeline!')
+        self.assertEqual(len([event for event in trace['traceEvents'] if event.get('cat') == 'joblib_task']) >=
+                         stack.n_slices,True,'Pipeline performance report test failed: tasks of the plugins missing in '
+                                             'the timeline!')
+        self.assertEqual(CoreBasic._task_recorder,None,'Pipeline performance report test failed: tasks still recorded '
+                                                       'after the pipeline application!')
+
+        # record two steps allocating the same temporary array (the second one does not increase the all-time peak)
+        recorder = PerformanceRecorder()
+        for name in ['first','second']:
+
+            step_start = recorder.start_step(stack)
+            temporary_array = np.ones((50,10**6))
+            time.sleep(0.1)
+            del temporary_array
+            recorder.end_step(step_start,name,'transform')
+
+        # tests
+        if current_rss() is not None:
+
+            self.assertEqual(min([step['peak_rss_increase_bytes'] for step in recorder.steps]) > 2*10**8,True,
+                             'Pipeline performance report test failed: peak RAM usage of the steps not measured!')
+
+        # remove files created for the test
+        shutil.rmtree(pipeline_folder)
+
+        print('...DONE!')
+
+    def test_pipeline_memory_plan(self):
+
+        print('\nRunning pipeline memory plan test...')
+
+        # import necessary modules
+        from bmiptools.pipeline import Pipeline
+
+        # plan the memory of a pipeline on an 8-bit stack
+        pip = Pipeline(gui_mode=True)
+        shape = (20,100,120)
+        memory_plan = pip.plan_memory(shape,np.uint8,['Standardizer','Registrator','Affine'],ram_budget=10**8)
+
+        # plan the memory of a pipeline with a z-crop followed by a plugin working slice by slice
+        pip_crop = Pipeline(operations_list=['Cropper','Equalizer'],
+                            pipeline_folder_path=test_data_path+os.sep+r'test_data/test_pipeline',
+                            pipeline_name='test_memory_plan',
+                            gui_mode=True)
+        pip_crop.initialize()
+        pip_crop.pipeline['Cropper_0'].z_range = [0,10]
+        pip_crop.pipeline['Cropper_0'].y_range = [None,None]
+        pip_crop.pipeline['Cropper_0'].x_range = [None,None]
+        ram_budget = 2*10**6
+        crop_plan = pip_crop.plan_memory(shape,np.uint8,ram_budget=ram_budget)
+        with warnings.catch_warnings():
+
+            warnings.simplefilter('ignore')
+            whole_stack_plan = pip.plan_memory((500,2000,2000),np.uint16,['Registrator'],ram_budget=8*2**30)
+
+        # tests
+        self.assertEqual([step['operation'] for step in memory_plan['steps']],
+                         ['Standardizer_0','Registrator_1','Affine_2'],'Pipeline memory plan test failed: wrong steps!')
+        self.assertEqual(memory_plan['largest_peak_step'],'Affine_2','Pipeline memory plan test failed: wrong '
+                                                                     'largest peak step!')
+        self.assertGreater(memory_plan['steps'][1]['output_shape'][1],shape[1],'Pipeline memory plan test failed: '
+                                                                              'registration padding not taken into '
+                                                                              'account!')
+        self.assertEqual(memory_plan['feasible'],True,'Pipeline memory plan test failed: feasible plan rejected!')
+        self.assertEqual(whole_stack_plan['feasible'],False,'Pipeline memory plan test failed: whole stack step '
+                                                            'exceeding the budget accepted!')
+        equalizer_step = crop_plan['steps'][1]
+        self.assertEqual(equalizer_step['slice_local'],True,'Pipeline memory plan test failed: wrong slice-local '
+                                                            'step!')
+        self.assertEqual(equalizer_step['input_shape'][0],10,'Pipeline memory plan test failed: z-crop not taken into '
+                                                             'account!')
+        self.assertGreater(crop_plan['slab_size'],0,'Pipeline memory plan test failed: no slab recommended!')
+        self.assertLessEqual(equalizer_step['resident_bytes']+crop_plan['slab_size']*crop_plan['n_workers']*
+                             equalizer_step['peak_bytes_per_slice'],ram_budget,'Pipeline memory plan test failed: '
+                             'recommended slabs exceed the RAM budget!')
+
+        # remove files created for the test
+        shutil.rmtree(test_data_path+os.sep+r'test_data/test_pipeline/test_memory_plan')
+
+        print('...DONE!')
+
+    def test_run_pipeline(self):
+
+        print('\nRunning command-line pipeline runner test...')
+
+        # import necessary modules
+        import subprocess
+        from bmiptools.stack import Stack
+        from bmiptools.pipeline import Pipeline
+        from bmiptools.run_pipeline import main
+
+        # the runner must not import the gui (nor matplotlib)
+        code = 'import sys, bmiptools.run_pipeline; print(\'bmiptools.gui.gui_basic\' in sys.modules, ' \
+               'any([module.split(\'.\')[0] == \'matplotlib\' for module in sys.modules]))'
+        output = subprocess.run([sys.executable,'-c',code],capture_output=True,text=True,
+                                env=dict(os.environ,PYTHONPATH=os.pathsep.join(sys.path)))
+
+        # save a stack and a pipeline cropping it
+        runner_folder = test_data_path+os.sep+r'test_data/test_pipeline/runner'
+        stack_reference = np.load(test_data_path+os.sep+r'test_data/test_stack/data.npy')
+        os.makedirs(runner_folder,exist_ok=True)
+        stack = Stack()
+        stack.from_array(stack_reference)
+        stack.save(saving_path=runner_folder,saving_name='stack',mode='hdf5',save_metadata=False)
+        pip = Pipeline(operations_list=['Cropper'],pipeline_folder_path=runner_folder,pipeline_name='test_runner',
+                       gui_mode=True)
+        pip.initialize()
+        pip.pipeline['Cropper_0'].z_range = [None,None]
+        pip.pipeline['Cropper_0'].y_range = [20,40]
+        pip.pipeline['Cropper_0'].x_range = [None,None]
+        pip.save()
+
+        # run the pipeline on the stack and on a missing stack
+        exit_code = main([runner_folder+os.sep+'test_runner'+os.sep+'pipeline__test_runner.dill',
+                          runner_folder+os.sep+'stack.h5',runner_folder+os.sep+'missing.h5',
+                          '-o',runner_folder+os.sep+'output','--saving-mode','hdf5','--workers','1',
+                          '--slab-size','5','--summary',runner_folder+os.sep+'summary.json','--quiet'])
+        with open(runner_folder+os.sep+'summary.json','r') as jfile:
+
+            summary = json.load(jfile)
+
+        result = Stack(path=runner_folder+os.sep+'output'+os.sep+'stack.h5',from_folder=False,load_metadata=False)
+
+        # save a pipeline with an auto-optimized plugin whose fit is disabled, and run it with and without refitting
+        pip_fit = Pipeline(operations_list=['Flatter'],pipeline_folder_path=runner_folder,
+                           pipeline_name='test_runner_fit',gui_mode=True)
+        pip_fit.initialize()
+        reference = Stack()
+        reference.from_array(stack_reference)
+        pip_fit.apply(reference)
+        pip_fit.pipeline['Flatter_0'].sigma_low_pass = 1
+        pip_fit.save()
+        fit_results = []
+        for fit_option in [[],['--fit-each-stack']]:
+
+            main([runner_folder+os.sep+'test_runner_fit'+os.sep+'pipeline__test_runner_fit.dill',
+                  runner_folder+os.sep+'stack.h5','-o',runner_folder+os.sep+'output_fit','--saving-mode','hdf5',
+                  '--workers','1','--quiet']+fit_option)
+            fit_results.append(Stack(path=runner_folder+os.sep+'output_fit'+os.sep+'stack.h5',from_folder=False,
+                                     load_metadata=False).data)
+
+        # tests
+        self.assertEqual(output.stdout.strip(),'False False','Command-line runner test failed: gui or matplotlib '
+                                                             'imported!')
+        self.assertEqual(exit_code,1,'Command-line runner test failed: wrong exit code!')
+        self.assertEqual([stack_status['status'] for stack_status in summary['stacks']],['OK','FAILED'],
+                         'Command-line runner test failed: wrong stack status!')
+        self.assertEqual(np.all(result.data == stack_reference[:,20:40,:]),True,'Command-line runner test failed: '
+                                                                                'wrong result!')
+        self.assertEqual(main(['missing.dill',runner_folder+os.sep+'stack.h5','-o',runner_folder]),2,
+                         'Command-line runner test failed: wrong exit code for a missing pipeline!')
+        self.assertEqual(np.allclose(fit_results[0],reference.data),False,'Command-line runner test failed: plugin '
+                                                                          'fitted without \'--fit-each-stack\'!')
+        self.assertEqual(np.allclose(fit_results[1],reference.data),True,'Command-line runner test failed: plugin not '
+                                                                         'fitted with \'--fit-each-stack\'!')
+
+        # remove files created for the test
+        shutil.rmtree(runner_folder)
+
+        print('...DONE!')
+
     def test_plugins_get_dictionary(self):
 
         print('\nRunning plugins dictionaries tests...')
@@ -528,6 +1508,66 @@ class BmiptoolsTest(unittest.TestCase):
         self.assertEqual(test_result, True, 'Affine plugin test failed!')
         print('...DONE!')
 
+    def test_float32_precision(self):
+
+        print('\nRunning float32 precision test...')
+
+        # import the necessary modules
+        from bmiptools.stack import Stack
+        from bmiptools.transformation.dynamics.standardizer import Standardizer
+        from bmiptools.transformation.dynamics.equalizer import Equalizer
+        from bmiptools.transformation.restoration.flatter import Flatter
+        from bmiptools.transformation.geometric.affine import Affine
+        from bmiptools.transformation.dynamics.histogram_matcher import HistogramMatcher
+        from bmiptools.transformation.restoration.denoiser import Denoiser
+        from bmiptools.transformation.restoration.decharger import Decharger
+        from bmiptools.transformation.restoration.destriper import Destriper
+
+        # plugins to test
+        flatter_td = copy.deepcopy(Flatter.empty_transformation_dictionary)
+        flatter_td['auto_optimize'] = False
+        flatter_td['sigma_low_pass'] = 10
+        affine_td = copy.deepcopy(Affine.empty_transformation_dictionary)
+        affine_td['apply'] = 'rotation'                         # the volume is padded (in the chosen precision)
+        affine_td['rotation']['rotation_angle'] = 30
+        denoiser_td = copy.deepcopy(Denoiser.empty_transformation_dictionary)
+        denoiser_td['auto_optimize'] = False
+        decharger_td = copy.deepcopy(Decharger.empty_transformation_dictionary)
+        decharger_td['auto_optimize'] = False
+        decharger_td['decharger_type'] = 'global_GF2RBGF'
+        destriper_td = copy.deepcopy(Destriper.empty_transformation_dictionary)
+        destriper_td['auto_optimize'] = False
+        destriper_td['decomposition_level'] = 2
+        plugins = [(Standardizer,Standardizer.empty_transformation_dictionary),
+                   (Equalizer,Equalizer.empty_transformation_dictionary),
+                   (Flatter,flatter_td),
+                   (Affine,affine_td),
+                   (HistogramMatcher,HistogramMatcher.empty_transformation_dictionary),
+                   (Denoiser,denoiser_td),
+                   (Decharger,decharger_td),
+                   (Destriper,destriper_td)]
+
+        # apply each plugin with double and single precision
+        for plugin_class,td in plugins:
+
+            results = []
+            for precision in [np.float64,np.float32]:
+
+                stack = Stack()
+                stack.load_slices_from_folder(path=test_data_path+os.sep+r'test_data/test_stack/stack',S=[0,1])
+                stack._precision = np.dtype(precision)
+                plugin = plugin_class(copy.deepcopy(td))
+                plugin._precision = np.dtype(precision)
+                plugin.transform(stack)
+                results.append(stack.data)
+
+            # tests
+            self.assertEqual(results[1].dtype,np.float32,'{} float32 precision failed!'.format(plugin_class.__name__))
+            self.assertEqual(np.allclose(results[1],results[0],rtol=1e-4,atol=1e-4*np.max(np.abs(results[0]))),True,
+                             '{} float32 precision failed!'.format(plugin_class.__name__))
+
+        print('...DONE!')
+
 
 ############
 #####   MAIN